@@ -1,49 +1,107 @@
 from __future__ import annotations
 
-import json
-from typing import Any, AsyncIterator
+import asyncio
+from contextlib import suppress
+from typing import Any, AsyncIterator, Optional
 
 from langchain_core.messages.human import HumanMessage
-from ai.graph import ai_app
+from ai.cassette import cassette
+from ai.graph import get_ai_app
+from ai.sse import COALESCE_MS, coalesce_tokens, dumps, encode_event_offloaded
 from ai.state import AgentState
+from ai.trace import TRACE_OUTPUT, Trace, current_trace
+from ai.usage import TokenBudgetExceeded, TurnUsage, current_turn, usage_ledger
 
 
-def _serialize(event: dict[str, Any]) -> dict[str, Any]:
-    """Normalize LangGraph astream_events payloads for SSE.
+async def ai_model(
+    session_id: str, user_input: str, *, trace: Optional[Trace] = None
+) -> AsyncIterator[dict[str, Any]]:
+    """Stream LangGraph events as SSE-friendly dicts.
 
-    Returns a dict with keys accepted by EventSourceResponse: {"event", "data"}.
+    - Uses astream_events to surface model/tool events (on_chat_model_stream, on_tool_*).
+    - Each yielded item is a dict(event=..., data=str) that SSE layer understands.
+    - With `SSE_COALESCE_MS` set, token chunks are merged per flush window.
+    - Ends with a `usage` event (`{"turn", "session"}` token counts). A session over its
+      token budget gets `budget_exceeded` instead of the remaining nodes.
+    - With `trace`, spans are recorded for the turn and a `trace` event comes last
+      (and/or a Chrome trace file, per `TRACE_OUTPUT`).
     """
-    name = event.get("event") or "message"
-    # Keep the payload compact and JSON-serializable
-    payload = event.get("data")
+    turn = TurnUsage(session_id)
+    token = current_turn.set(turn)
+    trace_token = current_trace.set(trace) if trace is not None else None
+    if cassette is not None:
+        cassette.note_turn(session_id, user_input)
     try:
-        data = json.dumps(payload, default=str, ensure_ascii=False)
-    except Exception:
-        data = json.dumps({"repr": repr(payload)}, ensure_ascii=False)
-    return {"event": name, "data": data}
+        if trace is not None:
+            # 본문이 시작된 뒤에만 샘플링: 그 전에 연결이 끊기면 finally 가 실행되지 않음
+            trace.start()
+        try:
+            usage_ledger.check(session_id)
+            events = get_ai_app().astream_events(
+                AgentState(messages=[HumanMessage(user_input)]),
+                config={"configurable": {"thread_id": session_id}},
+            )
+            if COALESCE_MS > 0:
+                events = coalesce_tokens(events, COALESCE_MS / 1000)
+            async for ev in events:
+                if trace is not None:
+                    trace.observe(ev)
+                yield await encode_event_offloaded(ev)
+        except TokenBudgetExceeded as e:
+            yield {"event": "budget_exceeded", "data": dumps(e.as_dict())}
+        yield usage_event(turn)
+        if trace is not None:
+            yield await trace_event(trace)
+    finally:
+        if trace is not None:
+            trace.finish()
+        # 제너레이터가 다른 context 에서 정리될 수 있음(GC finalizer)
+        with suppress(ValueError):
+            current_turn.reset(token)
+        if trace_token is not None:
+            with suppress(ValueError):
+                current_trace.reset(trace_token)
 
 
-async def ai_model(session_id: str, user_input: str) -> AsyncIterator[dict[str, Any]]:
-    """Stream LangGraph events as SSE-friendly dicts.
+async def trace_event(trace: Trace) -> dict[str, str]:
+    trace.finish()
+    data: dict[str, Any] = {"trace_id": trace.id}
+    if TRACE_OUTPUT in ("file", "both"):
+        data["file"] = await asyncio.to_thread(trace.write_chrome)
+    if TRACE_OUTPUT in ("sse", "both"):
+        data.update(trace.summary())
+    return {"event": "trace", "data": dumps(data)}
 
-    - Uses astream_events to surface model/tool events (on_chat_model_stream, on_tool_*).
-    - Each yielded item is a dict(event=..., data=str) that SSE layer understands.
-    """
-    async for ev in ai_app.astream_events(
-        AgentState(messages=[HumanMessage(user_input)]),
-        config={"configurable": {"thread_id": session_id}},
-    ):
-        yield _serialize(ev)
+
+def usage_event(turn: TurnUsage) -> dict[str, str]:
+    session = usage_ledger.usage(turn.session_id)["total"]
+    return {"event": "usage", "data": dumps({"turn": turn.as_dict(), "session": session})}
 
 
 async def ai_model_sync(session_id: str, user_input: str) -> Any:
     """Non-streaming single-shot invoke for debugging or tests."""
-    return await ai_app.ainvoke(
-        AgentState(messages=[HumanMessage(user_input)]),
-        config={"configurable": {"thread_id": session_id}},
-    )
+    token = current_turn.set(TurnUsage(session_id))
+    try:
+        usage_ledger.check(session_id)
+        return await get_ai_app().ainvoke(
+            AgentState(messages=[HumanMessage(user_input)]),
+            config={"configurable": {"thread_id": session_id}},
+        )
+    finally:
+        current_turn.reset(token)
+
 
+def get_session_history(session_id: str, *, limit: int | None = None, before: str | None = None):
+    """Return async iterator of state history snapshots for a session (newest first).
 
-def get_session_history(session_id: str):
-    """Return async iterator of state history snapshots for a session."""
-    return ai_app.aget_state_history(config={"configurable": {"thread_id": session_id}})
+    - limit: maximum number of snapshots to yield
+    - before: checkpoint_id cursor; only snapshots older than it are yielded
+    """
+    before_config = (
+        {"configurable": {"thread_id": session_id, "checkpoint_id": before}} if before else None
+    )
+    return get_ai_app().aget_state_history(
+        config={"configurable": {"thread_id": session_id}},
+        before=before_config,
+        limit=limit,
+    )
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Sequence
+
+from ai.agent import ai_model
+from ai.scheduler import MODEL_BATCH_WEIGHT, current_weight
+
+# 배치/WebSocket 전체에서 동시에 실행되는 그래프 턴 수 상한
+MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+
+_admission = asyncio.Semaphore(MAX_CONCURRENCY)
+
+
+class _SessionLocks:
+    """One lock per session id, dropped once nobody holds or waits for it."""
+
+    def __init__(self) -> None:
+        self._locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        lock, users = self._locks.get(session_id, (asyncio.Lock(), 0))
+        self._locks[session_id] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[session_id]
+            if users == 1:
+                del self._locks[session_id]
+            else:
+                self._locks[session_id] = (lock, users - 1)
+
+
+_session_locks = _SessionLocks()
+
+
+class SharedScope:
+    """Single-flight table shared by the turns of one batch / WebSocket connection.
+
+    Nodes look it up through `current_scope` to share feed fetches and router decisions
+    for identical inputs. Entries older than `ttl` (if set) are recomputed and pruned;
+    a failed call is forgotten so the next turn retries it.
+    """
+
+    def __init__(
+        self, ttl: Optional[float] = None, *, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._ttl = ttl
+        self._clock = clock
+        # 삽입 순서 = 생성 시각 순서(재생성 시 pop 후 다시 넣음)
+        self._entries: dict[tuple[str, str], tuple[float, asyncio.Task]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def shared(self, kind: str, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        now = self._clock()
+        entry = self._entries.get((kind, key))
+        if entry is None or self._expired(entry, now):
+            self._entries.pop((kind, key), None)
+            self._prune(now)
+            entry = (now, asyncio.ensure_future(factory()))
+            self._entries[(kind, key)] = entry
+            entry[1].add_done_callback(functools.partial(self._forget_failed, (kind, key)))
+        # 한 턴이 취소되어도 같은 결과를 기다리는 다른 턴에는 영향이 없도록 shield
+        return await asyncio.shield(entry[1])
+
+    def _expired(self, entry: tuple[float, asyncio.Task], now: float) -> bool:
+        return self._ttl is not None and now - entry[0] > self._ttl
+
+    def _prune(self, now: float) -> None:
+        # 오래 열린 WebSocket 에서 키마다 끝난 결과(피드 목록 등)가 쌓이지 않도록 정리
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if not self._expired(entry, now):
+                return
+            del self._entries[key]
+
+    def _forget_failed(self, key: tuple[str, str], task: asyncio.Task) -> None:
+        # 일시적인 오류를 TTL 동안 같은 키의 모든 턴에 돌려주지 않도록 실패한 결과는 버림
+        if not task.cancelled() and task.exception() is None:
+            return
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is task:
+            del self._entries[key]
+
+
+current_scope: ContextVar[Optional[SharedScope]] = ContextVar("current_scope", default=None)
+
+
+async def shared(kind: str, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+    """Run `factory` through the current scope if there is one, else directly."""
+    scope = current_scope.get()
+    if scope is None:
+        return await factory()
+    return await scope.shared(kind, key, factory)
+
+
+async def run_turn(session_id: str, message: str) -> AsyncIterator[dict[str, Any]]:
+    """`ai_model` under admission control, serialized per session."""
+    async with _session_locks.hold(session_id), _admission:
+        async for ev in ai_model(session_id, message):
+            yield ev
+
+
+async def turn_events(session_id: str, message: str) -> AsyncIterator[dict[str, Any]]:
+    """`run_turn` events followed by `turn_end` with data `{"ok": bool, "error"?: str}`."""
+    status: dict[str, Any] = {"ok": True}
+    try:
+        async for ev in run_turn(session_id, message):
+            yield ev
+    except Exception as e:
+        status = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    yield {"event": "turn_end", "data": json.dumps(status, ensure_ascii=False)}
+
+
+def frame(session_id: str, event: dict[str, Any], request_id: Optional[str] = None) -> str:
+    """Multiplexed frame. `event["data"]` is already JSON text, so it is embedded as-is."""
+    head = {"session_id": session_id, "event": event["event"]}
+    if request_id is not None:
+        head["request_id"] = request_id
+    return json.dumps(head, ensure_ascii=False)[:-1] + f', "data": {event["data"]}}}'
+
+
+async def run_batch(
+    items: Sequence[tuple[str, str]], scope: Optional[SharedScope] = None
+) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+    """Run many (session_id, message) turns concurrently, yielding events as they arrive.
+
+    Turns of the same session run in order; every turn ends with a `turn_end` event.
+    """
+    queue: asyncio.Queue[tuple[str, dict[str, Any]]] = asyncio.Queue()
+
+    async def _one(session_id: str, message: str) -> None:
+        async for ev in turn_events(session_id, message):
+            await queue.put((session_id, ev))
+
+    token = current_scope.set(scope or SharedScope())
+    # 배치 턴의 모델 호출은 공정 큐에서 대화 세션보다 작은 가중치로
+    weight_token = current_weight.set(MODEL_BATCH_WEIGHT)
+    try:
+        tasks = [asyncio.create_task(_one(sid, msg)) for sid, msg in items]
+    finally:
+        current_weight.reset(weight_token)
+        current_scope.reset(token)
+
+    remaining = len(tasks)
+    try:
+        while remaining:
+            session_id, ev = await queue.get()
+            yield session_id, ev
+            if ev["event"] == "turn_end":
+                remaining -= 1
+    finally:
+        for task in tasks:
+            task.cancel()
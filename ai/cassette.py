@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Iterable, Literal, Optional
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    message_chunk_to_message,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.messages.ai import add_ai_message_chunks
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_log = logging.getLogger(__name__)
+
+# off | record | replay
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "cassettes/session.jsonl.gz")
+# replay 시 기록된 지연에 곱하는 값. 1=원래 속도, 0=지연 없음
+CASSETTE_TIME_SCALE = float(os.getenv("CASSETTE_TIME_SCALE", "1"))
+
+RECORD = "record"
+REPLAY = "replay"
+FORMAT_VERSION = 1
+
+# 본문은 디코딩된 상태로 저장하므로 원래의 인코딩/길이 헤더는 남기지 않습니다.
+_BODY_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding"})
+
+# 상호작용 종류
+MODEL = "model"
+TOOL = "tool"
+HTTP = "http"
+TURN = "turn"
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded interaction for a request."""
+
+
+class Cassette:
+    """Recorded model calls, tool calls and HTTP exchanges, in order, with their timings.
+
+    File format: gzip-compressed NDJSON; a header line, then one interaction per line
+    `{"kind", "key", "req", "d", ...}`. `key` hashes the request (model name + message
+    contents, tool name + args, method + URL); ids that differ between runs are left out.
+    Replay serves interactions per key in recorded order, sleeping `d * time_scale`.
+    Recording buffers lines and appends them off the event loop; `close()` flushes the rest.
+    """
+
+    def __init__(
+        self, path: str | Path, mode: str, *, time_scale: float = CASSETTE_TIME_SCALE
+    ) -> None:
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.time_scale = time_scale
+        self._queues: dict[tuple[str, str], deque[dict[str, Any]]] = defaultdict(deque)
+        self.turns: list[dict[str, Any]] = []
+        self._started = False
+        self._pending: list[str] = []
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        if mode == REPLAY:
+            self.rewind()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY
+
+    # -------------- Storage --------------
+    def record(self, kind: str, key: str, **fields: Any) -> None:
+        entry = {"kind": kind, "key": key, **fields}
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            self._pending.append(line)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        # 이벤트 루프에서 gzip 압축/파일 쓰기를 하지 않도록 executor 에서 모아서 씀
+        loop.run_in_executor(None, self.flush).add_done_callback(_log_flush_error)
+
+    def flush(self) -> None:
+        """Append buffered interactions to the file as one gzip member."""
+        with self._write_lock:
+            with self._lock:
+                lines, self._pending = self._pending, []
+                self._flush_scheduled = False
+            if not lines:
+                return
+            mode: Literal["wt", "at"] = "at"
+            if not self._started:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                header = {
+                    "cassette": FORMAT_VERSION,
+                    "recorded_at": datetime.now(timezone.utc).isoformat(),
+                }
+                lines.insert(0, json.dumps(header) + "\n")
+                mode = "wt"
+            # 쓸 때마다 gzip member 를 덧붙임: 중간에 프로세스가 죽어도 그때까지의 기록은 읽힘
+            with gzip.open(self.path, mode, encoding="utf-8") as f:
+                f.writelines(lines)
+            self._started = True
+
+    def take(self, kind: str, key: str, req: Any = None) -> dict[str, Any]:
+        queue = self._queues.get((kind, key))
+        if not queue:
+            raise CassetteMiss(
+                f"no recorded {kind} interaction for {req if req is not None else key}"
+            )
+        return queue.popleft()
+
+    def rewind(self) -> None:
+        """(Re)load every recorded interaction so the cassette can be replayed again."""
+        self._queues.clear()
+        self.turns = []
+        for entry in read_entries(self.path):
+            if entry["kind"] == TURN:
+                self.turns.append(entry)
+            else:
+                self._queues[(entry["kind"], entry["key"])].append(entry)
+
+    def remaining(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    async def wait(self, seconds: float) -> None:
+        if seconds > 0 and self.time_scale > 0:
+            await asyncio.sleep(seconds * self.time_scale)
+
+    def wait_sync(self, seconds: float) -> None:
+        if seconds > 0 and self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def close(self) -> None:
+        self.flush()
+        self._started = False
+
+    # -------------- Integration points --------------
+    def note_turn(self, session_id: str, text: str) -> None:
+        """Remember user turns while recording, so a replay benchmark can resend them."""
+        if self.mode == RECORD:
+            self.record(TURN, "", session_id=session_id, text=text)
+
+    def chat_model_factory(
+        self, factory: Callable[..., BaseChatModel]
+    ) -> Callable[..., BaseChatModel]:
+        """Wrap a `ModelRegistry` factory. Replay never calls `factory` (no credentials needed)."""
+
+        def _make(model: str, **options: Any) -> BaseChatModel:
+            inner = None if self.replaying else factory(model, **options)
+            return CassetteChatModel(model=model, inner=inner, cassette=self)
+
+        return _make
+
+    def transport(self, inner: Optional[httpx.AsyncBaseTransport] = None) -> "CassetteTransport":
+        return CassetteTransport(self, inner)
+
+
+def _log_flush_error(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        _log.error("writing cassette failed", exc_info=future.exception())
+
+
+def read_entries(path: str | Path) -> Iterable[dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("cassette") != FORMAT_VERSION:
+            raise ValueError(f"{path}: not a cassette (version {header.get('cassette')!r})")
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def request_key(*parts: Any) -> str:
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _message_key(m: BaseMessage) -> list[Any]:
+    # id/tool_call_id 는 실행마다 달라지므로 내용과 도구 호출만으로 비교
+    calls = [[c["name"], c["args"]] for c in getattr(m, "tool_calls", None) or []]
+    return [m.type, m.content, calls]
+
+
+# -------------- Model --------------
+class CassetteChatModel(BaseChatModel):
+    """Chat model that records `inner`'s responses (token chunks with timing) or replays them."""
+
+    model: str
+    inner: Optional[Any] = None
+    cassette: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools: Any, **kwargs: Any) -> Any:
+        # 실제 모델의 도구 변환 결과(kwargs)를 그대로 받아 이 모델에 바인딩
+        if self.inner is None:
+            return self.bind(**kwargs)
+        bound = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**getattr(bound, "kwargs", {}))
+
+    def _key(self, messages: list[BaseMessage]) -> tuple[str, str]:
+        req = f"{self.model}: {str(messages[-1].content)[:80]!r}" if messages else self.model
+        return request_key(self.model, [_message_key(m) for m in messages]), req
+
+    def _generate(
+        self, messages: list[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any
+    ) -> ChatResult:
+        key, req = self._key(messages)
+        if self.cassette.replaying:
+            entry = self.cassette.take(MODEL, key, req)
+            self.cassette.wait_sync(entry["chunks"][-1][0] if entry["chunks"] else 0.0)
+            message = _merge(messages_from_dict([data for _, data in entry["chunks"]]))
+        else:
+            assert self.inner is not None
+            started = time.perf_counter()
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            message = result.generations[0].message
+            self._record(key, req, [[time.perf_counter() - started, message_to_dict(message)]])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(
+        self, messages: list[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any
+    ) -> ChatResult:
+        key, req = self._key(messages)
+        if self.cassette.replaying:
+            chunks = await self._replay(key, req)
+            message: BaseMessage = _merge(chunks)
+        else:
+            assert self.inner is not None  # record 모드에서는 항상 실제 모델이 있음
+            started = time.perf_counter()
+            result = await self.inner._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+            message = result.generations[0].message
+            self._record(key, req, [[time.perf_counter() - started, message_to_dict(message)]])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        key, req = self._key(messages)
+        if self.cassette.replaying:
+            entry = self.cassette.take(MODEL, key, req)
+            previous = 0.0
+            for offset, data in entry["chunks"]:
+                await self.cassette.wait(offset - previous)
+                previous = offset
+                chunk = ChatGenerationChunk(message=_as_chunk(messages_from_dict([data])[0]))
+                if run_manager is not None:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        assert self.inner is not None
+        started = time.perf_counter()
+        recorded: list[list[Any]] = []
+        try:
+            async for chunk in self.inner._astream(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ):
+                recorded.append([time.perf_counter() - started, message_to_dict(chunk.message)])
+                yield chunk
+        finally:
+            if recorded:
+                self._record(key, req, recorded)
+
+    def _record(self, key: str, req: str, chunks: list[list[Any]]) -> None:
+        self.cassette.record(MODEL, key, req=req, chunks=chunks)
+
+    async def _replay(self, key: str, req: str) -> list[BaseMessage]:
+        entry = self.cassette.take(MODEL, key, req)
+        await self.cassette.wait(entry["chunks"][-1][0] if entry["chunks"] else 0.0)
+        return messages_from_dict([data for _, data in entry["chunks"]])
+
+
+def _merge(messages: list[BaseMessage]) -> BaseMessage:
+    if len(messages) == 1 and not isinstance(messages[0], AIMessageChunk):
+        return messages[0]
+    return message_chunk_to_message(add_ai_message_chunks(*[_as_chunk(m) for m in messages]))
+
+
+def _as_chunk(message: BaseMessage) -> AIMessageChunk:
+    if isinstance(message, AIMessageChunk):
+        return message
+    assert isinstance(message, AIMessage)
+    return AIMessageChunk(
+        content=message.content,
+        additional_kwargs=message.additional_kwargs,
+        response_metadata=message.response_metadata,
+        id=message.id,
+        usage_metadata=message.usage_metadata,
+        tool_call_chunks=[
+            {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+            for i, c in enumerate(message.tool_calls)
+        ],
+    )
+
+
+# -------------- HTTP --------------
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """httpx transport recording responses of `inner` (decoded body, headers, latency) or replaying them."""
+
+    def __init__(
+        self, cassette: Cassette, inner: Optional[httpx.AsyncBaseTransport] = None
+    ) -> None:
+        self._cassette = cassette
+        self._inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        key = request_key(request.method, url)
+        if self._cassette.replaying:
+            entry = self._cassette.take(HTTP, key, f"{request.method} {url}")
+            await self._cassette.wait(entry["d"])
+            headers = [(k, v) for k, v in entry["headers"] if k.lower() not in _BODY_HEADERS]
+            return httpx.Response(
+                entry["status"], headers=headers, content=base64.b64decode(entry["body"])
+            )
+        if self._inner is None:
+            self._inner = httpx.AsyncHTTPTransport()
+        started = time.perf_counter()
+        response = await self._inner.handle_async_request(request)
+        # aread() 는 Content-Encoding 을 풀어 주므로 그 헤더를 그대로 넘기면 두 번 디코딩됩니다.
+        body = await response.aread()
+        headers = [
+            (k, v) for k, v in response.headers.multi_items() if k.lower() not in _BODY_HEADERS
+        ]
+        self._cassette.record(
+            HTTP,
+            key,
+            req=f"{request.method} {url}",
+            d=time.perf_counter() - started,
+            status=response.status_code,
+            headers=headers,
+            body=base64.b64encode(body).decode(),
+        )
+        return httpx.Response(response.status_code, headers=headers, content=body)
+
+    async def aclose(self) -> None:
+        if self._inner is not None:
+            await self._inner.aclose()
+
+
+def cassette_from_env() -> Optional[Cassette]:
+    if CASSETTE_MODE not in (RECORD, REPLAY):
+        return None
+    return Cassette(CASSETTE_PATH, CASSETTE_MODE)
+
+
+cassette = cassette_from_env()
+
+
+def http_transport() -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for outbound HTTP clients; None (httpx default) unless a cassette is active."""
+    return cassette.transport() if cassette is not None else None
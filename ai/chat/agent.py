@@ -1,19 +1,30 @@
-from langchain.chat_models.base import BaseChatModel
-from langchain.agents import create_agent
+from ai.models import ModelRegistry, NodeModelConfig
 from ai.state import AgentState
+from ai.chat.tool_calls import ToolCallMiddleware, cassette_middleware, tool_policy
 from ai.chat.tools.ip_info import get_ip_info
 from ai.chat.tools.web_search import google_search_tool
 
 
 class ChatAgent:
     __tools = [get_ip_info, google_search_tool]
+    # 검색 결과는 사용자와 무관하므로 세션 간 공유, ip_info 는 현재 시각을 담으므로 세션 안에서 짧게
+    __tool_policies = {
+        "web_search": tool_policy(
+            "web_search", concurrency=4, timeout=15.0, ttl=600.0, shared=True
+        ),
+        "ip_info": tool_policy("ip_info", concurrency=8, timeout=10.0, ttl=30.0),
+    }
     __instruction = """
     You are a helpful assistant.
     """
 
-    def __init__(self, model: BaseChatModel) -> None:
-        self.__model = create_agent(
-            model=model, tools=self.__tools, system_prompt=self.__instruction
+    def __init__(self, registry: ModelRegistry, config: NodeModelConfig) -> None:
+        self.tool_calls = ToolCallMiddleware(self.__tool_policies)
+        self.__model = registry.agent(
+            config,
+            tools=self.__tools,
+            system_prompt=self.__instruction,
+            middleware=[self.tool_calls, *cassette_middleware()],
         )
 
     async def run(self, state: AgentState):
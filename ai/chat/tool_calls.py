@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import os
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain.agents.middleware.types import ToolCallRequest
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool
+
+from ai.cassette import TOOL, Cassette, cassette, request_key
+from ai.trace import span
+
+# parallel: 한 단계의 도구 호출을 동시에 실행, sequential: 세션 안에서 하나씩(기존 상류 제한 대응)
+TOOL_EXECUTION = os.getenv("TOOL_EXECUTION", "parallel").lower()
+# (도구, 인자) 결과 캐시 항목 수. 0이면 캐시를 끕니다.
+TOOL_CACHE_MAX = int(os.getenv("TOOL_CACHE_MAX", "1024"))
+
+# 세션 공유가 안전하지 않은 결과는 세션 id 로 구분
+_SHARED = "*"
+# 실행하던 호출이 취소됨: 기다리던 호출은 직접 다시 실행
+_RETRY = object()
+
+
+@dataclass(slots=True, frozen=True)
+class ToolPolicy:
+    concurrency: int = 4
+    timeout: Optional[float] = None
+    ttl: float = 0.0
+    # 다른 세션에 같은 결과를 돌려줘도 되는지(사용자별 정보가 없는 결과)
+    shared: bool = False
+
+
+def tool_policy(
+    name: str,
+    *,
+    concurrency: int = 4,
+    timeout: Optional[float] = None,
+    ttl: float = 0.0,
+    shared: bool = False,
+) -> ToolPolicy:
+    """Per-tool execution settings, overridable via env.
+
+    `TOOL_{NAME}_CONCURRENCY`, `TOOL_{NAME}_TIMEOUT`, `TOOL_{NAME}_CACHE_TTL` (e.g.
+    TOOL_WEB_SEARCH_TIMEOUT). A timeout or TTL <= 0 disables the feature.
+    """
+    prefix = f"TOOL_{name.upper()}"
+    timeout = float(os.getenv(f"{prefix}_TIMEOUT", timeout or 0))
+    return ToolPolicy(
+        concurrency=max(1, int(os.getenv(f"{prefix}_CONCURRENCY", concurrency))),
+        timeout=timeout if timeout > 0 else None,
+        ttl=max(0.0, float(os.getenv(f"{prefix}_CACHE_TTL", ttl))),
+        shared=shared,
+    )
+
+
+class ToolResultCache:
+    """LRU of successful tool results keyed by (scope, tool, args), with per-entry expiry.
+
+    Concurrent misses for the same key share one execution (single flight). If the caller
+    running it is cancelled, the others do not inherit the cancellation; one of them runs
+    the call again.
+    """
+
+    def __init__(
+        self, max_entries: int = TOOL_CACHE_MAX, clock: Callable[[], float] = time.monotonic
+    ):
+        self._max = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, str, str], tuple[float, dict[str, Any]]] = (
+            OrderedDict()
+        )
+        self._inflight: dict[tuple[str, str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple[str, str, str]) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: tuple[str, str, str], value: dict[str, Any], ttl: float) -> None:
+        if self._max <= 0:
+            return
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max:
+            self._entries.popitem(last=False)
+
+    async def get_or_run(
+        self,
+        key: tuple[str, str, str],
+        ttl: float,
+        run: Callable[[], Awaitable[Optional[dict[str, Any]]]],
+    ) -> tuple[Optional[dict[str, Any]], bool]:
+        """Cached value (hit=True) or the result of `run()`; `run()` returning None is not cached."""
+        while True:
+            cached = self.get(key)
+            if cached is not None:
+                self.hits += 1
+                return cached, True
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            value = await asyncio.shield(inflight)
+            if value is not _RETRY:
+                self.hits += 1
+                return value, True
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await run()
+        except asyncio.CancelledError:
+            # 취소는 이 호출자 몫이므로 전파하지 않음
+            future.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # 기다리는 쪽이 없어도 경고가 나지 않도록
+            raise
+        else:
+            future.set_result(value)
+            if value is not None:
+                self.put(key, value, ttl)
+            return value, False
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class ToolCallMiddleware(AgentMiddleware):
+    """Runs an agent's tool calls under per-tool policies.
+
+    - parallel mode leaves the tool node's concurrent execution of one model step's calls
+      in place; sequential mode runs a session's calls one at a time.
+    - Each tool is limited to `concurrency` executions process-wide and `timeout` seconds
+      per call (a timeout comes back to the model as an error ToolMessage). A sync tool
+      still running in its executor thread after a timeout keeps its slot until it returns.
+    - Successful results are memoized for `ttl` seconds per session, or across sessions
+      for `shared` tools.
+    """
+
+    def __init__(
+        self,
+        policies: dict[str, ToolPolicy],
+        *,
+        mode: str = TOOL_EXECUTION,
+        cache: Optional[ToolResultCache] = None,
+    ) -> None:
+        super().__init__()
+        self._policies = policies
+        self._mode = mode
+        self._cache = cache if cache is not None else ToolResultCache()
+        self._limits = {name: asyncio.Semaphore(p.concurrency) for name, p in policies.items()}
+        self._session_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+
+    @property
+    def cache(self) -> ToolResultCache:
+        return self._cache
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[Any]],
+    ) -> Any:
+        call = request.tool_call
+        name = call["name"]
+        policy = self._policies.get(name)
+        if policy is None:
+            return await handler(request)
+        session_id = _session_id(request)
+
+        async def _execute() -> Any:
+            if self._mode == "sequential" and session_id:
+                lock = self._session_locks.get(session_id)
+                if lock is None:
+                    lock = self._session_locks[session_id] = asyncio.Lock()
+                async with lock:
+                    return await self._limited(name, policy, request, handler)
+            return await self._limited(name, policy, request, handler)
+
+        if policy.ttl <= 0 or self._cache._max <= 0:  # noqa: SLF001
+            return await _execute()
+
+        holder: dict[str, Any] = {}
+
+        async def _run() -> Optional[dict[str, Any]]:
+            result = holder["result"] = await _execute()
+            if isinstance(result, ToolMessage) and result.status != "error":
+                return {"content": result.content, "artifact": result.artifact}
+            return None
+
+        key = (_SHARED if policy.shared else session_id or "", name, _args_key(call.get("args")))
+        value, hit = await self._cache.get_or_run(key, policy.ttl, _run)
+        if "result" in holder:
+            return holder["result"]
+        if value is None:  # 함께 기다린 실행이 캐시할 수 없는 결과였음
+            return await _execute()
+        with span("tool.cache", "tool", tool=name, hit=hit):
+            return ToolMessage(
+                content=value["content"],
+                artifact=value["artifact"],
+                tool_call_id=call["id"],
+                name=name,
+            )
+
+    async def _limited(
+        self,
+        name: str,
+        policy: ToolPolicy,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[Any]],
+    ) -> Any:
+        limit = self._limits[name]
+        await limit.acquire()
+        try:
+            task = asyncio.ensure_future(handler(request))
+        except BaseException:
+            limit.release()
+            raise
+        # 슬롯은 실행이 실제로 끝날 때 반환(타임아웃 뒤에도 도는 동기 도구 스레드 포함)
+        task.add_done_callback(functools.partial(_release, limit))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=policy.timeout)
+        except asyncio.TimeoutError:
+            return ToolMessage(
+                content=f"Tool '{name}' timed out after {policy.timeout:g}s.",
+                tool_call_id=request.tool_call["id"],
+                name=name,
+                status="error",
+            )
+        finally:
+            # 스레드는 취소해도 멈추지 않으므로 끝날 때까지 두고, 비동기 도구만 취소
+            if not task.done() and not _runs_in_thread(request.tool):
+                task.cancel()
+
+
+def _release(limit: asyncio.Semaphore, task: asyncio.Future) -> None:
+    limit.release()
+    if not task.cancelled():
+        task.exception()  # 버려진 결과의 예외 경고 방지
+
+
+def _runs_in_thread(tool: Any) -> bool:
+    # coroutine 이 없는 StructuredTool/Tool 과 _arun 을 재정의하지 않은 도구는 executor 에서 실행됨
+    if tool is None or getattr(tool, "coroutine", None) is not None:
+        return False
+    return getattr(tool, "func", None) is not None or type(tool)._arun is BaseTool._arun
+
+
+def _session_id(request: ToolCallRequest) -> Optional[str]:
+    config = getattr(request.runtime, "config", None) or {}
+    return (config.get("configurable") or {}).get("thread_id")
+
+
+def _args_key(args: Any) -> str:
+    return json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class CassetteToolMiddleware(AgentMiddleware):
+    """Records tool results (content, status, latency) to a cassette or replays them.
+
+    Goes innermost (after `ToolCallMiddleware`) so only real executions are recorded.
+    """
+
+    def __init__(self, cassette: Cassette) -> None:
+        super().__init__()
+        self._cassette = cassette
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[Any]],
+    ) -> Any:
+        call = request.tool_call
+        key = request_key(call["name"], call.get("args"))
+        if self._cassette.replaying:
+            entry = self._cassette.take(TOOL, key, f"{call['name']}({call.get('args')})")
+            await self._cassette.wait(entry["d"])
+            return ToolMessage(
+                content=entry["content"],
+                status=entry["status"],
+                tool_call_id=call["id"],
+                name=call["name"],
+            )
+        started = time.perf_counter()
+        result = await handler(request)
+        if isinstance(result, ToolMessage):
+            self._cassette.record(
+                TOOL,
+                key,
+                req=call["name"],
+                d=time.perf_counter() - started,
+                content=result.content,
+                status=result.status,
+            )
+        return result
+
+
+def cassette_middleware() -> list[AgentMiddleware]:
+    """`[CassetteToolMiddleware]` when `CASSETTE_MODE` is record/replay, else empty."""
+    return [CassetteToolMiddleware(cassette)] if cassette is not None else []
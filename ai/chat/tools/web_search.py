@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 from dotenv import load_dotenv
 from langchain_google_community import GoogleSearchAPIWrapper
 from langchain_core.tools import tool
 
-load_dotenv()
 
-search_wrapper = GoogleSearchAPIWrapper()
+@lru_cache(maxsize=1)
+def get_search_wrapper() -> GoogleSearchAPIWrapper:
+    """Build the wrapper on first use so importing this module needs no credentials."""
+    load_dotenv()
+    return GoogleSearchAPIWrapper()
 
 
 @tool("web_search", parse_docstring=True)
@@ -35,6 +40,6 @@ def google_search_tool(query: str) -> str:
     """
 
     try:
-        return search_wrapper.run(query)
+        return get_search_wrapper().run(query)
     except Exception as e:
         raise e
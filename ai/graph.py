@@ -1,18 +1,15 @@
 import os
+import threading
 
-from langgraph.checkpoint.memory import InMemorySaver
 from enum import Enum
 from langgraph.graph import StateGraph, END
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 
-from ai.news.agent import NewsAgent
-from ai.router.agent import RouterAgent
+from ai.models import NodeModelConfig, model_registry, node_model_config
+from ai.scheduler import Priority
+from ai.sessions import session_store
+from ai.usage import usage_ledger
 from ai.state import AgentState
-from ai.chat.agent import ChatAgent
-from ai.summary.agent import SummaryAgent
-
-_ = load_dotenv()
 
 
 class NodeName(Enum):
@@ -23,33 +20,141 @@ class NodeName(Enum):
     SUMMARY_AGENT = "summary_agent"
 
 
-__model = os.getenv("BASE_MODEL", "gemini-2.5-flash")
-__foundation_model = ChatGoogleGenerativeAI(model=__model)
+def node_model_configs() -> dict[NodeName, NodeModelConfig]:
+    model = os.getenv("BASE_MODEL", "gemini-2.5-flash")
+    # 분류(라우팅/피드 선택)용 저지연 모델. 구조화 출력 실패 시 BASE_MODEL 로 승급
+    fast_model = os.getenv("FAST_MODEL", "gemini-2.5-flash-lite")
+    return {
+        NodeName.ROUTER_AGENT: node_model_config(
+            NodeName.ROUTER_AGENT.value,
+            default_model=fast_model,
+            default_escalation_model=model,
+            default_timeout=15.0,
+            default_cache_prompt=True,
+            default_priority=Priority.ROUTING,
+        ),
+        NodeName.CHAT_AGENT: node_model_config(NodeName.CHAT_AGENT.value, default_model=model),
+        NodeName.NEWS_AGENT: node_model_config(
+            NodeName.NEWS_AGENT.value,
+            default_model=fast_model,
+            default_escalation_model=model,
+            default_timeout=15.0,
+            default_cache_prompt=True,
+            default_priority=Priority.ROUTING,
+        ),
+        NodeName.SUMMARY_AGENT: node_model_config(
+            NodeName.SUMMARY_AGENT.value, default_model=model, default_cache_prompt=True
+        ),
+    }
 
-__router_agent = RouterAgent(__foundation_model)
-__chat_agent = ChatAgent(__foundation_model)
-__news_agent = NewsAgent(__foundation_model)
-__summary_agent = SummaryAgent(__foundation_model)
 
-__workflow = StateGraph(AgentState)
+def build_graph():
+    """Construct the agents and compile the workflow. Use `get_ai_app()` to share one."""
+    _ = load_dotenv()
 
-__workflow.add_node(NodeName.ROUTER_AGENT.value, __router_agent.run)
-__workflow.add_node(NodeName.CHAT_AGENT.value, __chat_agent.run)
-__workflow.add_node(NodeName.NEWS_AGENT.value, __news_agent.run)
-__workflow.add_node(NodeName.SUMMARY_AGENT.value, __summary_agent.run)
+    # 에이전트/도구 모듈은 무거운 import(langchain.agents, google 클라이언트)를 끌고 오므로
+    # 그래프를 실제로 만들 때까지 미룹니다.
+    from ai.chat.agent import ChatAgent
+    from ai.news.agent import NewsAgent, guess_feed_url
+    from ai.router.agent import RouterAgent
+    from ai.speculation import Speculator, speculation_mode
+    from ai.summary.agent import SummaryAgent
+    from ai.summary.digest import NEWS_DIGEST, digest_store
 
-__workflow.set_entry_point(NodeName.ROUTER_AGENT.value)
-__workflow.add_conditional_edges(
-    NodeName.ROUTER_AGENT.value,
-    __router_agent.edge_condition,
-    {
-        "chat_agent": NodeName.CHAT_AGENT.value,
-        "news_agent": NodeName.NEWS_AGENT.value,
-    }
+    configs = node_model_configs()
+    router_agent = RouterAgent(model_registry, configs[NodeName.ROUTER_AGENT])
+    chat_agent = ChatAgent(model_registry, configs[NodeName.CHAT_AGENT])
+    summary_agent = SummaryAgent(
+        model_registry,
+        configs[NodeName.SUMMARY_AGENT],
+        digests=digest_store if NEWS_DIGEST else None,
+    )
+
+    router_run, chat_run, speculator = router_agent.run, chat_agent.run, None
+    mode = speculation_mode()
+    if mode in ("feed", "all"):
+        speculator = Speculator(
+            guess_feed=guess_feed_url,
+            chat=chat_agent.run if mode == "all" else None,
+            feed_budget=int(os.getenv("SPECULATION_FEED_BUDGET", "30")),
+            chat_budget=int(os.getenv("SPECULATION_CHAT_BUDGET", "5")),
+        )
+        router_run = speculator.wrap_router(router_agent.run)
+        chat_run = speculator.wrap_chat(chat_agent.run)
+    news_agent = NewsAgent(model_registry, configs[NodeName.NEWS_AGENT], speculator=speculator)
+
+    workflow = StateGraph(AgentState)
+
+    # 노드마다 실행 전에 세션 토큰 예산 확인
+    guard = usage_ledger.guard
+    workflow.add_node(NodeName.ROUTER_AGENT.value, guard(router_run))
+    workflow.add_node(NodeName.CHAT_AGENT.value, guard(chat_run))
+    workflow.add_node(NodeName.NEWS_AGENT.value, guard(news_agent.run))
+    workflow.add_node(NodeName.SUMMARY_AGENT.value, guard(summary_agent.run))
+
+    workflow.set_entry_point(NodeName.ROUTER_AGENT.value)
+    workflow.add_conditional_edges(
+        NodeName.ROUTER_AGENT.value,
+        router_agent.edge_condition,
+        {
+            "chat_agent": NodeName.CHAT_AGENT.value,
+            "news_agent": NodeName.NEWS_AGENT.value,
+        }
+        )
+
+    workflow.add_edge(NodeName.CHAT_AGENT.value, END)
+    workflow.add_edge(NodeName.NEWS_AGENT.value, NodeName.SUMMARY_AGENT.value)
+    workflow.add_edge(NodeName.SUMMARY_AGENT.value, END)
+
+    return workflow.compile(checkpointer=session_store)
+
+
+__ai_app = None
+__lock = threading.Lock()
+
+
+def get_ai_app():
+    """Return the process-wide compiled graph, building it on first use."""
+    global __ai_app
+    if __ai_app is None:
+        with __lock:
+            if __ai_app is None:
+                __ai_app = build_graph()
+    return __ai_app
+
+
+def is_warm() -> bool:
+    return __ai_app is not None
+
+
+def warm_up() -> None:
+    """Build the graph, every node's model client and the search wrapper ahead of traffic."""
+    get_ai_app()
+    for config in node_model_configs().values():
+        model_registry.get(config.model)
+
+    from ai.chat.tools.web_search import get_search_wrapper
+
+    get_search_wrapper()
+
+
+async def run_digest_refresher() -> None:
+    """Keep `NEWS_DIGEST_FEEDS` (and recently requested feeds) summarized in `digest_store`."""
+    from ai.news.agent import catalog_feed_url
+    from ai.summary.agent import SummaryAgent
+    from ai.summary.digest import NEWS_DIGEST_FEEDS, DigestRefresher, digest_store
+
+    summary_agent = SummaryAgent(model_registry, node_model_configs()[NodeName.SUMMARY_AGENT])
+    refresher = DigestRefresher(
+        digest_store,
+        summary_agent.summarize,
+        feeds=[catalog_feed_url(key) for key in NEWS_DIGEST_FEEDS],
     )
+    await refresher.run()
 
-__workflow.add_edge(NodeName.CHAT_AGENT.value, END)
-__workflow.add_edge(NodeName.NEWS_AGENT.value, NodeName.SUMMARY_AGENT.value)
-__workflow.add_edge(NodeName.SUMMARY_AGENT.value, END)
 
-ai_app = __workflow.compile(checkpointer=InMemorySaver())
+def __getattr__(name: str):
+    # 하위 호환: `from ai.graph import ai_app`
+    if name == "ai_app":
+        return get_ai_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable, Optional
+
+from ai.loop import approx_size, run_cpu
+
+# 실제 state 필드 외에 projection 으로 요청할 수 있는 가상 필드
+LAST_MESSAGE = "last_message"
+
+
+def snapshot_to_item(snapshot: Any, fields: Optional[Iterable[str]] = None) -> dict[str, Any]:
+    """Convert a LangGraph StateSnapshot into a history item.
+
+    - `checkpoint_id` can be passed back as the `before` cursor for the next page.
+    - `fields` limits `values` to the given keys; `last_message` yields only the
+      newest entry of `messages` instead of the whole list.
+    """
+    created_at = getattr(snapshot, "created_at", None)
+    config = getattr(snapshot, "config", None) or {}
+    return {
+        "checkpoint_id": config.get("configurable", {}).get("checkpoint_id"),
+        "ts": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+        "values": project_values(snapshot.values, fields),
+    }
+
+
+def project_values(values: Any, fields: Optional[Iterable[str]] = None) -> Any:
+    if fields is None or not isinstance(values, dict):
+        return values
+    out: dict[str, Any] = {}
+    for name in fields:
+        if name == LAST_MESSAGE:
+            messages = values.get("messages") or []
+            out[LAST_MESSAGE] = messages[-1] if messages else None
+        elif name in values:
+            out[name] = values[name]
+    return out
+
+
+async def iter_json_array(items: AsyncIterator[dict[str, Any]]) -> AsyncIterator[str]:
+    """Encode items one by one as a JSON array so only one snapshot is held at a time.
+
+    Large snapshots are encoded off the event loop (`run_cpu`).
+    """
+    yield "["
+    first = True
+    async for item in items:
+        yield ("" if first else ",") + await run_cpu(dumps, item, size=approx_size(item))
+        first = False
+    yield "]"
+
+
+def dumps(obj: Any) -> str:
+    return json.dumps(obj, default=_default, ensure_ascii=False)
+
+
+def _default(obj: Any) -> Any:
+    # langchain 메시지/상태는 pydantic, NewsItem 은 dataclass
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import dataclasses
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+# 이벤트 루프 지연 측정 간격(ms). 0이면 측정하지 않습니다.
+LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+# 이 시간(ms) 이상 루프를 붙잡은 콜백을 경고 로그로 남깁니다. 0이면 끔(기본).
+# 켜면 모든 루프 콜백에 시간 측정이 붙으므로 진단할 때만 사용합니다.
+SLOW_CALLBACK_MS = float(os.getenv("LOOP_SLOW_CALLBACK_MS", "0"))
+# CPU 작업(피드 파싱, 큰 직렬화) 실행 위치: inline(루프) | thread | process
+OFFLOAD_MODE = os.getenv("OFFLOAD_MODE", "thread").lower()
+OFFLOAD_WORKERS = int(os.getenv("OFFLOAD_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+# 이보다 작은 입력은 풀 전환 비용이 더 크므로 루프에서 바로 처리합니다.
+OFFLOAD_MIN_BYTES = int(os.getenv("OFFLOAD_MIN_BYTES", "32768"))
+
+T = TypeVar("T")
+
+_log = logging.getLogger(__name__)
+
+
+# -------------- Lag monitor --------------
+class LoopMonitor:
+    """Measures event loop lag (how late a periodic sleep wakes up) and logs slow callbacks.
+
+    Slow callbacks are found by timing `asyncio.Handle._run`, which every task step and
+    `call_soon`/`call_later` callback goes through; `install()` enables it process-wide.
+    """
+
+    def __init__(
+        self,
+        interval: float = LAG_INTERVAL_MS / 1000,
+        slow_callback: float = SLOW_CALLBACK_MS / 1000,
+        *,
+        window: int = 600,
+        clock: Callable[[], float] = time.perf_counter,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self.interval = interval
+        self.slow_callback = slow_callback
+        self._clock = clock
+        self._log = logger or _log
+        self._lags: deque[float] = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.slow_callbacks = 0
+        self.recent_slow: deque[dict[str, Any]] = deque(maxlen=20)
+
+    async def run(self) -> None:
+        if self.interval <= 0:
+            return
+        while True:
+            started = self._clock()
+            await asyncio.sleep(self.interval)
+            self.observe(self._clock() - started - self.interval)
+
+    def observe(self, lag: float) -> None:
+        lag = max(0.0, lag)
+        self._lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+
+    def install(self) -> None:
+        """Start timing loop callbacks (no-op when `slow_callback` is 0)."""
+        global _active_monitor
+        if self.slow_callback <= 0:
+            return
+        _active_monitor = self
+        if asyncio.events.Handle._run is not _timed_run:
+            # 콜백 실행 시간을 잴 공개 훅이 없어 Handle._run 을 교체(uninstall 에서 복원)
+            asyncio.events.Handle._run = _timed_run  # type: ignore[method-assign]
+
+    def uninstall(self) -> None:
+        global _active_monitor
+        if _active_monitor is self:
+            _active_monitor = None
+            asyncio.events.Handle._run = _original_run  # type: ignore[method-assign]
+
+    def record_slow(self, handle: asyncio.Handle, elapsed: float) -> None:
+        self.slow_callbacks += 1
+        where = _describe(handle)
+        self.recent_slow.append({"callback": where, "duration_ms": round(elapsed * 1000, 1)})
+        self._log.warning("slow event loop callback (%.0f ms): %s", elapsed * 1000, where)
+
+    def stats(self) -> dict[str, Any]:
+        lags = sorted(self._lags)
+
+        def _pct(p: float) -> float:
+            return round(lags[min(len(lags) - 1, int(p * len(lags)))] * 1000, 2) if lags else 0.0
+
+        return {
+            "lag_ms": {
+                "last": round(self._lags[-1] * 1000, 2) if self._lags else 0.0,
+                "p50": _pct(0.50),
+                "p99": _pct(0.99),
+                "max": round(self.max_lag * 1000, 2),
+                "samples": len(lags),
+            },
+            "slow_callbacks": self.slow_callbacks,
+            "recent_slow_callbacks": list(self.recent_slow),
+            "offload": offload_stats(),
+        }
+
+
+_original_run = asyncio.events.Handle._run
+_active_monitor: Optional[LoopMonitor] = None
+
+
+def _timed_run(self: asyncio.Handle) -> None:
+    started = time.perf_counter()
+    try:
+        _original_run(self)
+    finally:
+        monitor = _active_monitor
+        elapsed = time.perf_counter() - started
+        if monitor is not None and elapsed >= monitor.slow_callback:
+            monitor.record_slow(self, elapsed)
+
+
+def _describe(handle: asyncio.Handle) -> str:
+    # Task.__step 이면 코루틴 위치가 보이도록 asyncio 의 handle 포매터를 사용
+    fmt = getattr(asyncio.base_events, "_format_handle", None)
+    try:
+        return fmt(handle) if fmt is not None else repr(handle)
+    except Exception:
+        return repr(handle)
+
+
+# -------------- Offloading --------------
+_threads: Optional[ThreadPoolExecutor] = None
+_processes: Optional[ProcessPoolExecutor] = None
+_counts: Counter[str] = Counter()
+
+
+def _thread_pool() -> ThreadPoolExecutor:
+    global _threads
+    if _threads is None:
+        _threads = ThreadPoolExecutor(OFFLOAD_WORKERS, thread_name_prefix="offload")
+    return _threads
+
+
+def _process_pool() -> ProcessPoolExecutor:
+    global _processes
+    if _processes is None:
+        # fork 는 스레드가 도는 서버 프로세스에서 안전하지 않으므로 spawn
+        _processes = ProcessPoolExecutor(
+            OFFLOAD_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _processes
+
+
+async def run_cpu(
+    fn: Callable[..., T], *args: Any, size: Optional[int] = None, process_safe: bool = False
+) -> T:
+    """Run CPU-bound `fn(*args)` where `OFFLOAD_MODE` says.
+
+    - `size`: input size in bytes; below `OFFLOAD_MIN_BYTES` the call stays on the loop.
+    - `process_safe`: `fn` is a module-level function with picklable arguments and result,
+      so it may go to the process pool. Other calls use the thread pool in process mode.
+    Thread calls keep the caller's context variables (trace, current turn).
+    """
+    if OFFLOAD_MODE == "inline" or (size is not None and size < OFFLOAD_MIN_BYTES):
+        _counts["inline"] += 1
+        return fn(*args)
+    loop = asyncio.get_running_loop()
+    if OFFLOAD_MODE == "process" and process_safe:
+        _counts["process"] += 1
+        return await loop.run_in_executor(_process_pool(), fn, *args)
+    _counts["thread"] += 1
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_thread_pool(), partial(ctx.run, fn, *args))
+
+
+def approx_size(obj: Any, limit: int = OFFLOAD_MIN_BYTES) -> int:
+    """Rough serialized size of `obj`; stops counting once it reaches `limit`."""
+    total = 0
+    stack = [obj]
+    while stack and total < limit:
+        o = stack.pop()
+        if isinstance(o, (str, bytes)):
+            total += len(o) + 2
+        elif isinstance(o, dict):
+            total += 4 * len(o)
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            total += len(o) + 2
+            stack.extend(o)
+        elif dataclasses.is_dataclass(o) and not isinstance(o, type):
+            stack.extend(getattr(o, f.name) for f in dataclasses.fields(o))
+        elif hasattr(o, "__dict__"):
+            stack.extend(vars(o).values())
+        else:
+            total += 8
+    return total
+
+
+def offload_stats() -> dict[str, Any]:
+    return {
+        "mode": OFFLOAD_MODE,
+        "workers": OFFLOAD_WORKERS,
+        "min_bytes": OFFLOAD_MIN_BYTES,
+        "calls": dict(_counts),
+    }
+
+
+def shutdown_offload() -> None:
+    global _threads, _processes
+    for pool in (_threads, _processes):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _threads = _processes = None
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from pydantic import ValidationError
+
+from ai.cassette import cassette
+from ai.prompt_cache import PromptCache, prompt_cache_from_env
+from ai.scheduler import (
+    ModelCallPreempted,
+    ModelScheduler,
+    Priority,
+    model_scheduler,
+    scheduling_middleware,
+)
+from ai.usage import TokenBudgetExceeded, UsageLedger, new_messages, usage_ledger
+
+if TYPE_CHECKING:
+    from langchain.chat_models.base import BaseChatModel
+
+_log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True, frozen=True)
+class NodeModelConfig:
+    model: str
+    escalation_model: Optional[str] = None
+    timeout: Optional[float] = None
+    # 정적 system prompt 를 provider 측 cached content 로 보냄(도구 없는 노드만)
+    cache_prompt: bool = False
+    # MODEL_CONCURRENCY 스케줄러에서의 호출 우선순위
+    priority: Priority = Priority.INTERACTIVE
+
+
+def node_model_config(
+    node: str,
+    *,
+    default_model: str,
+    default_escalation_model: Optional[str] = None,
+    default_timeout: Optional[float] = None,
+    default_cache_prompt: bool = False,
+    default_priority: Priority = Priority.INTERACTIVE,
+) -> NodeModelConfig:
+    """Resolve per-node model settings, overridable via env.
+
+    `{NODE}_MODEL`, `{NODE}_ESCALATION_MODEL`, `{NODE}_TIMEOUT`, `{NODE}_CACHE_PROMPT`,
+    `{NODE}_PRIORITY` (routing|interactive|background; e.g. ROUTER_AGENT_MODEL). An empty
+    escalation model / a timeout <= 0 disables the feature.
+    """
+    prefix = node.upper()
+    escalation = os.getenv(f"{prefix}_ESCALATION_MODEL", default_escalation_model or "")
+    timeout_env = os.getenv(f"{prefix}_TIMEOUT")
+    timeout = float(timeout_env) if timeout_env else default_timeout
+    model = os.getenv(f"{prefix}_MODEL", default_model)
+    cache_env = os.getenv(f"{prefix}_CACHE_PROMPT")
+    priority_env = os.getenv(f"{prefix}_PRIORITY")
+    return NodeModelConfig(
+        model=model,
+        escalation_model=escalation if escalation and escalation != model else None,
+        timeout=timeout if timeout and timeout > 0 else None,
+        cache_prompt=cache_env == "1" if cache_env is not None else default_cache_prompt,
+        priority=Priority.parse(priority_env) if priority_env else default_priority,
+    )
+
+
+def _google_genai(model: str, **options: Any) -> BaseChatModel:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(model=model, **options)
+
+
+def _create_agent(**kwargs: Any) -> Any:
+    from langchain.agents import create_agent
+
+    return create_agent(**kwargs)
+
+
+class ModelRegistry:
+    """Lazily constructs chat model clients and shares them by model name (+ options).
+
+    `agent_factory` builds node agents from a client (`create_agent` by default).
+    """
+
+    def __init__(
+        self,
+        factory: Callable[..., BaseChatModel] = _google_genai,
+        *,
+        agent_factory: Callable[..., Any] = _create_agent,
+        prompt_cache: Optional[PromptCache] = None,
+        usage: Optional[UsageLedger] = None,
+        scheduler: Optional[ModelScheduler] = None,
+    ) -> None:
+        self._factory = factory
+        self.agent_factory = agent_factory
+        self._clients: dict[tuple, BaseChatModel] = {}
+        self._lock = threading.Lock()
+        self.prompt_cache = prompt_cache
+        self.usage = usage
+        self.scheduler = scheduler if scheduler is not None and scheduler.enabled else None
+
+    def get(self, model: str, **options: Any) -> BaseChatModel:
+        key = (model, *sorted(options.items()))
+        client = self._clients.get(key)
+        if client is None:
+            # warm_up() 이 스레드에서 호출될 수 있으므로 생성은 한 번만
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self._factory(model, **options)
+        return client
+
+    def discard(self, model: str, **options: Any) -> None:
+        self._clients.pop((model, *sorted(options.items())), None)
+
+    def loaded(self) -> list[str]:
+        return list(dict.fromkeys(key[0] for key in self._clients))
+
+    def agent(self, config: NodeModelConfig, **agent_kwargs: Any) -> "TieredAgent":
+        return TieredAgent(self, config, **agent_kwargs)
+
+
+# 카세트 기록/재생 중에는 모델 호출을 감싸고, 재생과 키가 어긋나지 않도록 prompt cache 를 끕니다.
+model_registry = ModelRegistry(
+    cassette.chat_model_factory(_google_genai) if cassette is not None else _google_genai,
+    prompt_cache=prompt_cache_from_env() if cassette is None else None,
+    usage=usage_ledger,
+    scheduler=model_scheduler,
+)
+
+
+class TieredAgent:
+    """`create_agent` wrapper for one graph node.
+
+    - The underlying agent (and model client) is built on first call.
+    - `config.timeout` bounds each invocation.
+    - With `response_format`, an invalid/missing structured response is retried once on
+      `config.escalation_model`.
+    - With `config.cache_prompt` and a registry prompt cache, the system prompt is sent as
+      provider cached content; if that is unavailable or rejected the prompt goes inline.
+    - Token usage of every completed call is charged to the registry's usage ledger.
+    - With a registry scheduler, every model call (not tool calls) waits for a slot at
+      `config.priority`.
+    """
+
+    def __init__(self, registry: ModelRegistry, config: NodeModelConfig, **agent_kwargs: Any):
+        self._registry = registry
+        self._config = config
+        self._agent_kwargs = agent_kwargs
+        self._agents: dict[tuple[str, Optional[str]], Any] = {}
+        # Gemini 는 cached content 와 tools/system_instruction 을 함께 보낼 수 없습니다.
+        self._prompt_cache = (
+            registry.prompt_cache
+            if config.cache_prompt
+            and not agent_kwargs.get("tools")
+            and agent_kwargs.get("system_prompt")
+            else None
+        )
+
+    @property
+    def config(self) -> NodeModelConfig:
+        return self._config
+
+    def _agent(self, model: str, cached_content: Optional[str] = None):
+        agent = self._agents.get((model, cached_content))
+        if agent is None:
+            kwargs = dict(self._agent_kwargs)
+            options = {}
+            if cached_content:
+                kwargs.pop("system_prompt", None)
+                options["cached_content"] = cached_content
+                self._drop_stale(model, cached_content)
+            if self._registry.scheduler is not None:
+                kwargs["middleware"] = [
+                    scheduling_middleware(self._registry.scheduler, self._config.priority),
+                    *kwargs.get("middleware", ()),
+                ]
+            agent = self._agents[(model, cached_content)] = self._registry.agent_factory(
+                model=self._registry.get(model, **options), **kwargs
+            )
+        return agent
+
+    def _drop_stale(self, model: str, cached_content: str) -> None:
+        for m, handle in list(self._agents):
+            if m == model and handle and handle != cached_content:
+                del self._agents[(m, handle)]
+                self._registry.discard(m, cached_content=handle)
+
+    async def _invoke(self, model: str, input: Any) -> dict[str, Any]:
+        from langchain.agents.structured_output import StructuredOutputError
+
+        prompt_cache = self._prompt_cache
+        cached_content = None
+        if prompt_cache is not None:
+            cached_content = await prompt_cache.get(model, self._agent_kwargs["system_prompt"])
+        try:
+            return await self._call(self._agent(model, cached_content), input)
+        except (
+            asyncio.TimeoutError,
+            StructuredOutputError,
+            ValidationError,
+            ModelCallPreempted,
+            TokenBudgetExceeded,
+        ):
+            # cache 와 무관한 실패: handle 을 유지하고 그대로 올림
+            raise
+        except Exception as e:
+            if prompt_cache is None or cached_content is None:
+                raise
+            # 만료/삭제된 cache 등: handle 을 버리고 prompt 를 inline 으로 1회 재시도
+            _log.warning(
+                "call with cached content %s failed (%s); retrying inline", cached_content, e
+            )
+            prompt_cache.invalidate(model, self._agent_kwargs["system_prompt"])
+            return await self._call(self._agent(model), input)
+
+    async def _call(self, agent: Any, input: Any) -> dict[str, Any]:
+        call = agent.ainvoke(input)
+        if self._config.timeout is None:
+            result = await call
+        else:
+            result = await asyncio.wait_for(call, timeout=self._config.timeout)
+        if self._registry.usage is not None and isinstance(result, dict):
+            self._registry.usage.record_messages(new_messages(result, input))
+        return result
+
+    async def ainvoke(self, input: Any) -> dict[str, Any]:
+        from langchain.agents.structured_output import StructuredOutputError
+
+        structured = self._agent_kwargs.get("response_format") is not None
+        escalation = self._config.escalation_model if structured else None
+        try:
+            result = await self._invoke(self._config.model, input)
+            if not structured or result.get("structured_response") is not None or not escalation:
+                return result
+            reason: Any = "missing structured_response"
+        except (StructuredOutputError, ValidationError) as e:
+            if not escalation:
+                raise
+            reason = e
+
+        _log.warning(
+            "structured output failed on %s (%s); escalating to %s",
+            self._config.model,
+            reason,
+            escalation,
+        )
+        return await self._invoke(escalation, input)
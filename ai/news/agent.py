@@ -1,13 +1,23 @@
-from typing import List, Literal
-from langchain.chat_models.base import BaseChatModel
-from langchain.agents import create_agent
+import os
+import re
+from typing import TYPE_CHECKING, Any, List, Literal, Optional
+from langchain_core.callbacks import adispatch_custom_event
 from langchain_core.messages import ToolMessage
 from pydantic import BaseModel
 
-from ai.news.tools.rss_feed import RssFeedCollector
+from ai.batch import shared
+from ai.models import ModelRegistry, NodeModelConfig
+from ai.news.tools.rss_feed import NewsItem, RssFeedCollector
 from ai.state import AgentState
 
-_RSS_CATALOG = {
+if TYPE_CHECKING:
+    from ai.speculation import Speculator
+
+# 1이면 피드에서 파싱되는 대로 항목마다 `news_item` 이벤트를 보내고, 요약은 그 뒤에 이어집니다.
+NEWS_PROGRESSIVE = os.getenv("NEWS_PROGRESSIVE", "0") == "1"
+NEWS_ITEM_EVENT = "news_item"
+
+_RSS_CATALOG: dict[str, dict[str, Any]] = {
     "america": {
         "brand": "The New York Times",
         "base": "https://rss.nytimes.com/services/xml/rss/nyt/",
@@ -188,6 +198,42 @@ Feeds = Literal[
 
 
 
+# 소스(국가/매체)만 가리키는 키워드. 카테고리 판단에서는 제외합니다(→ default_feed).
+_SOURCE_HINTS = {
+    "korea": ("한국", "대한민국", "코리아", "korea", "국내"),
+    "america": ("미국", "us", "u.s.", "뉴욕타임즈", "nyt"),
+}
+
+
+def _mentions(text: str, keyword: str) -> bool:
+    if keyword.isascii():
+        # "us" 가 "business" 에 걸리지 않도록 영문 키워드는 단어 경계로 비교
+        return re.search(rf"(?<![a-z]){re.escape(keyword)}(?![a-z])", text) is not None
+    return keyword in text
+
+
+def catalog_feed_url(key: str) -> str:
+    """URL of a catalog feed given as "source/feed", e.g. "america/HomePage"."""
+    source, feed = key.split("/", 1)
+    catalog = _RSS_CATALOG[source]
+    return f"{catalog['base']}{catalog['feeds'][feed]['slug']}"
+
+
+def guess_feed_url(text: str) -> Optional[str]:
+    """Cheap keyword guess of the feed NewsAgent will pick, used for speculative prefetch."""
+    text = text.lower()
+    source = "korea" if any(_mentions(text, k) for k in _SOURCE_HINTS["korea"]) else "america"
+    catalog = _RSS_CATALOG[source]
+    candidates = {**{k.lower(): k for k in catalog["feeds"]}, **catalog["aliases"]}
+    matches = [
+        alias
+        for alias in candidates
+        if alias not in _SOURCE_HINTS[source] and _mentions(text, alias)
+    ]
+    feed = candidates[max(matches, key=len)] if matches else catalog["default_feed"]
+    return f"{catalog['base']}{catalog['feeds'][feed]['slug']}"
+
+
 class FeedResponseFormat(BaseModel):    
     category: List[str]
     
@@ -236,10 +282,16 @@ class NewsAgent:
     """
     
 
-    def __init__(self, model: BaseChatModel) -> None:
-        self.__model = create_agent(
-            model=model, system_prompt=self.__instruction, response_format=FeedResponseFormat
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        config: NodeModelConfig,
+        speculator: Optional["Speculator"] = None,
+    ) -> None:
+        self.__model = registry.agent(
+            config, system_prompt=self.__instruction, response_format=FeedResponseFormat
         )
+        self.__speculator = speculator
 
     async def run(self, state: AgentState):
         assistant = await self.__model.ainvoke({"messages": [state.messages[-1]]})
@@ -253,7 +305,20 @@ class NewsAgent:
         ):
             base = _RSS_CATALOG[feed_category[0]]["base"]
             slug = _RSS_CATALOG[feed_category[0]]["feeds"][feed_category[1]]["slug"]
-            news = await RssFeedCollector([f"{base}{slug}"]).fetch_all()
+            url = f"{base}{slug}"
+            news = await self.__speculator.take_feed(state, url) if self.__speculator else None
+            emitted: set[str] = set()
+            if news is None:
+                # 배치/WebSocket 안에서는 같은 피드 수집을 한 번만 수행
+                if NEWS_PROGRESSIVE:
+                    news = await shared("feed", url, lambda: _stream_feed(url, emitted))
+                else:
+                    news = await shared("feed", url, RssFeedCollector([url]).fetch_all)
+            if NEWS_PROGRESSIVE:
+                # 선수집/다른 턴이 가져온 결과는 아직 보내지 않았으므로 여기서 한꺼번에
+                for item in news:
+                    if item.id not in emitted:
+                        await adispatch_custom_event(NEWS_ITEM_EVENT, news_item_payload(item))
 
             # Compact, readable tool messages for streaming
             call_id = f"call_message_from_{state.messages[-1].id}"
@@ -267,4 +332,26 @@ class NewsAgent:
             tool_msgs = [ToolMessage(tool_call_id=call_id, content=_fmt(it)) for it in news]
             return {"messages": tool_msgs, "news": news}
 
+        if self.__speculator is not None:
+            # 카탈로그에 없는 카테고리: 선수집 결과는 쓰이지 않으므로 바로 정리
+            self.__speculator.release_feed(state)
         return {"news": None}
+
+
+def news_item_payload(item: NewsItem) -> dict[str, Any]:
+    return {
+        "id": item.id,
+        "title": item.title,
+        "link": item.link,
+        "published_at": item.published_at.isoformat() if item.published_at else None,
+        "source": item.source_name or item.source_url,
+    }
+
+
+async def _stream_feed(url: str, emitted: set[str]) -> list[NewsItem]:
+    items: list[NewsItem] = []
+    async for item in RssFeedCollector([url]).stream():
+        items.append(item)
+        emitted.add(item.id)
+        await adispatch_custom_event(NEWS_ITEM_EVENT, news_item_payload(item))
+    return items
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    from ai.news.tools.rss_feed import NewsItem
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a source's circuit is open and no cached copy is available."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed → open (cooldown) → half-open (one probe)."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._threshold = max(1, failure_threshold)
+        self._cooldown = cooldown
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at < self._cooldown:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    @property
+    def probing(self) -> bool:
+        return self._probing
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or self._failures >= self._threshold:
+            self._opened_at = self._clock()
+        self._probing = False
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed (cancelled); the next call may probe."""
+        self._probing = False
+
+
+class LatencyWindow:
+    """Last `size` fetch latencies (seconds); timed-out fetches count at their timeout."""
+
+    def __init__(self, size: int = 50) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+        return ordered[idx]
+
+
+@dataclass(slots=True)
+class SourceHealth:
+    breaker: CircuitBreaker
+    latency: LatencyWindow = field(default_factory=LatencyWindow)
+    last_good: Optional[list[NewsItem]] = None
+    last_good_at: Optional[float] = None
+
+
+class FeedHealthRegistry:
+    """Process-wide per-source health shared by every `RssFeedCollector`.
+
+    - timeout: `timeout_factor` × p95 latency, clamped to [min_timeout, collector timeout];
+      a half-open probe always gets the collector timeout, and a timeout counts as a
+      latency sample so a source that slowed down can earn a longer timeout again
+    - hedge delay: p90 latency; a duplicate request is sent if the first is still pending
+    - both fall back to defaults until `min_samples` latencies have been observed
+    """
+
+    def __init__(
+        self,
+        *,
+        min_samples: int = 5,
+        timeout_factor: float = 3.0,
+        min_timeout: float = 1.5,
+        min_hedge_delay: float = 0.2,
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        max_stale: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._min_samples = min_samples
+        self._timeout_factor = timeout_factor
+        self._min_timeout = min_timeout
+        self._min_hedge_delay = min_hedge_delay
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._max_stale = max_stale
+        self._clock = clock
+        self._sources: dict[str, SourceHealth] = {}
+
+    def get(self, url: str) -> SourceHealth:
+        health = self._sources.get(url)
+        if health is None:
+            health = self._sources[url] = SourceHealth(
+                breaker=CircuitBreaker(
+                    failure_threshold=self._failure_threshold,
+                    cooldown=self._cooldown,
+                    clock=self._clock,
+                )
+            )
+        return health
+
+    def timeout_for(self, url: str, default: float) -> float:
+        health = self.get(url)
+        if health.breaker.probing:
+            return default
+        p95 = health.latency.percentile(95)
+        if p95 is None or len(health.latency) < self._min_samples:
+            return default
+        return min(default, max(self._min_timeout, p95 * self._timeout_factor))
+
+    def hedge_delay_for(self, url: str) -> Optional[float]:
+        health = self.get(url)
+        p90 = health.latency.percentile(90)
+        if p90 is None or len(health.latency) < self._min_samples:
+            return None
+        return max(self._min_hedge_delay, p90)
+
+    def record_success(self, url: str, seconds: float, items: list[NewsItem]) -> None:
+        health = self.get(url)
+        health.breaker.record_success()
+        health.latency.add(seconds)
+        health.last_good = items
+        health.last_good_at = self._clock()
+
+    def record_failure(self, url: str, timeout: Optional[float] = None) -> None:
+        health = self.get(url)
+        health.breaker.record_failure()
+        if timeout is not None:
+            # 성공만 기록하면 느려진 소스는 학습된 타임아웃에 계속 걸려 표본이 갱신되지 않음
+            health.latency.add(timeout)
+
+    def record_cancelled(self, url: str) -> None:
+        self.get(url).breaker.release()
+
+    def stale_copy(self, url: str) -> Optional[list[NewsItem]]:
+        health = self.get(url)
+        if health.last_good is None or health.last_good_at is None:
+            return None
+        if self._clock() - health.last_good_at > self._max_stale:
+            return None
+        return health.last_good
+
+    def snapshot(self) -> dict[str, dict]:
+        return {
+            url: {
+                "state": h.breaker.state,
+                "p50": h.latency.percentile(50),
+                "p95": h.latency.percentile(95),
+                "samples": len(h.latency),
+                "has_cached_copy": h.last_good is not None,
+            }
+            for url, h in self._sources.items()
+        }
+
+
+feed_health = FeedHealthRegistry()
@@ -4,6 +4,7 @@ import asyncio
 import email.utils
 import html
 import logging
+import time
 import httpx
 import xml.etree.ElementTree as ET
 
@@ -11,6 +12,11 @@ from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, AsyncIterator, Callable, Iterable, Optional, Sequence
 
+from ai.cassette import http_transport
+from ai.loop import run_cpu
+from ai.news.tools.feed_health import CircuitOpenError, FeedHealthRegistry, feed_health
+from ai.trace import span
+
 
 # Public types
 @dataclass(slots=True)
@@ -40,6 +46,9 @@ class RssFeedCollector:
     - Parses both RSS 2.0 and Atom 1.0 into a normalized NewsItem
     - De-duplicates across polling runs using an in-memory id/link set
     - Provides `fetch_all()` for one-shot and `poll()` for continuous collection
+    - Tracks per-source health (shared `feed_health` by default): timeouts follow observed
+      latency, slow fetches are hedged with a duplicate request, and a source whose circuit
+      is open (or that just failed) is served from its last good copy
     """
 
     def __init__(
@@ -49,6 +58,8 @@ class RssFeedCollector:
         timeout: float = 10.0,
         concurrency: int = 8,
         logger: Optional[logging.Logger] = None,
+        health: Optional[FeedHealthRegistry] = None,
+        hedge: bool = True,
     ) -> None:
         self._sources: list[FeedSource] = [
             f if isinstance(f, FeedSource) else FeedSource(url=f) for f in feeds
@@ -57,13 +68,17 @@ class RssFeedCollector:
         self._sem = asyncio.Semaphore(max(1, int(concurrency)))
         self._seen: set[str] = set()
         self._log = logger or logging.getLogger(__name__)
+        self._health = health or feed_health
+        self._hedge = hedge
 
     async def fetch_all(
         self, client: Optional[httpx.AsyncClient] = None
     ) -> list[NewsItem]:
         close_client = False
         if client is None:
-            client = httpx.AsyncClient(timeout=self._timeout, follow_redirects=True)
+            client = httpx.AsyncClient(
+                timeout=self._timeout, follow_redirects=True, transport=http_transport()
+            )
             close_client = True
         try:
             tasks = [self._fetch_one(client, src) for src in self._sources]
@@ -103,107 +118,195 @@ class RssFeedCollector:
                 yield new_items
             await asyncio.sleep(max(1.0, float(interval)))
 
+    async def stream(self, client: Optional[httpx.AsyncClient] = None) -> AsyncIterator[NewsItem]:
+        """Like `fetch_all()`, but yields each item as soon as it is parsed off the wire.
+
+        Bodies are parsed incrementally while they download (no hedging). A source that
+        fails before yielding anything falls back to its last good copy.
+        """
+        close_client = False
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self._timeout, follow_redirects=True, transport=http_transport()
+            )
+            close_client = True
+        queue: asyncio.Queue[Optional[NewsItem]] = asyncio.Queue()
+
+        async def _one(source: FeedSource) -> None:
+            try:
+                await self._stream_one(client, source, queue.put_nowait)
+            except Exception as e:
+                self._log.warning("feed fetch failed: %s", e)
+
+        tasks = [asyncio.ensure_future(_one(src)) for src in self._sources]
+        done = asyncio.ensure_future(asyncio.gather(*tasks))
+        done.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (item := await queue.get()) is not None:
+                yield item
+        finally:
+            done.cancel()
+            if close_client:
+                await client.aclose()
+
     # -------------- Internal --------------
     async def _fetch_one(
         self, client: httpx.AsyncClient, source: FeedSource
     ) -> list[NewsItem]:
+        health = self._health
+        if not health.get(source.url).breaker.allow():
+            return self._stale_or_raise(source, CircuitOpenError(f"circuit open: {source.url}"))
+        try:
+            return await self._fetch_allowed(client, source)
+        except asyncio.CancelledError:
+            # 취소된 half-open 탐침은 성공도 실패도 아니므로 다음 요청이 다시 탐침하도록
+            health.record_cancelled(source.url)
+            raise
+
+    async def _fetch_allowed(
+        self, client: httpx.AsyncClient, source: FeedSource
+    ) -> list[NewsItem]:
+        health = self._health
+        started = time.monotonic()
+        timeout = health.timeout_for(source.url, self._timeout)
+        try:
+            with span("rss.fetch", "feed", url=source.url):
+                text = await asyncio.wait_for(self._get_hedged(client, source), timeout=timeout)
+        except Exception as e:
+            health.record_failure(source.url, _timed_out(e, timeout))
+            return self._stale_or_raise(source, e)
+        elapsed = time.monotonic() - started
+
+        with span("rss.parse", "feed", url=source.url, bytes=len(text)):
+            try:
+                # 큰 피드는 OFFLOAD_MODE 에 따라 스레드/프로세스 풀에서 파싱
+                items = await run_cpu(parse_feed, text, source, size=len(text), process_safe=True)
+            except ET.ParseError as e:
+                self._log.warning("XML parse error for %s: %s", source.url, e)
+                health.record_failure(source.url)
+                return self._stale_or_raise(source, e, default=[])
+        health.record_success(source.url, elapsed, items)
+        return items
+
+    async def _stream_one(
+        self, client: httpx.AsyncClient, source: FeedSource, emit: Callable[[NewsItem], Any]
+    ) -> None:
+        health = self._health
+        if not health.get(source.url).breaker.allow():
+            for item in self._stale_or_raise(source, CircuitOpenError(f"circuit open: {source.url}")):
+                emit(item)
+            return
+        try:
+            await self._stream_allowed(client, source, emit)
+        except asyncio.CancelledError:
+            health.record_cancelled(source.url)
+            raise
+
+    async def _stream_allowed(
+        self, client: httpx.AsyncClient, source: FeedSource, emit: Callable[[NewsItem], Any]
+    ) -> None:
+        health = self._health
+        started = time.monotonic()
+        items: list[NewsItem] = []
+
+        async def _read() -> None:
+            with span("rss.stream", "feed", url=source.url):
+                async with self._sem, client.stream(
+                    "GET", source.url, headers={"User-Agent": _UA}
+                ) as resp:
+                    resp.raise_for_status()
+                    # 청크 단위 파싱이라 루프를 오래 붙잡지 않습니다(오프로딩 불필요).
+                    parser = _ItemParser(source)
+                    async for chunk in resp.aiter_bytes():
+                        for item in parser.feed(chunk):
+                            items.append(item)
+                            emit(item)
+                    for item in parser.close():
+                        items.append(item)
+                        emit(item)
+
+        timeout = health.timeout_for(source.url, self._timeout)
+        try:
+            await asyncio.wait_for(_read(), timeout=timeout)
+        except Exception as e:
+            health.record_failure(source.url, _timed_out(e, timeout))
+            if items:  # 이미 보낸 항목은 되돌릴 수 없으므로 여기까지만
+                self._log.warning("feed %s failed after %d items: %r", source.url, len(items), e)
+                return
+            default: Optional[list[NewsItem]] = [] if isinstance(e, ET.ParseError) else None
+            for item in self._stale_or_raise(source, e, default=default):
+                emit(item)
+            return
+        health.record_success(source.url, time.monotonic() - started, items)
+
+    async def _get_text(self, client: httpx.AsyncClient, source: FeedSource) -> str:
         async with self._sem:
             resp = await client.get(source.url, headers={"User-Agent": _UA})
         resp.raise_for_status()
-        text = resp.text
+        return resp.text
+
+    async def _get_hedged(self, client: httpx.AsyncClient, source: FeedSource) -> str:
+        """GET, plus one duplicate request if the first outlives the source's p90 latency."""
+        delay = self._health.hedge_delay_for(source.url) if self._hedge else None
+        first = asyncio.ensure_future(self._get_text(client, source))
+        if delay is None:
+            return await first
 
+        pending: set[asyncio.Future] = {first}
         try:
-            root = ET.fromstring(text)
-        except ET.ParseError as e:
-            self._log.warning("XML parse error for %s: %s", source.url, e)
-            return []
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self._log.info("hedging slow feed fetch: %s", source.url)
+                pending.add(asyncio.ensure_future(self._get_text(client, source)))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    if fut.exception() is None:
+                        return fut.result()
+                    error = fut.exception()
+            assert error is not None
+            raise error
+        finally:
+            for fut in pending:
+                fut.cancel()
 
+    def _stale_or_raise(
+        self, source: FeedSource, error: Exception, default: Optional[list[NewsItem]] = None
+    ) -> list[NewsItem]:
+        stale = self._health.stale_copy(source.url)
+        if stale is not None:
+            self._log.warning("serving cached copy of %s: %r", source.url, error)
+            return stale
+        if default is not None:
+            return default
+        raise error
+
+    # 파서는 인스턴스 상태를 쓰지 않으므로 정적 메서드(프로세스 풀에서 실행 가능)
+    @staticmethod
+    def _parse_root(root: ET.Element, source: FeedSource) -> list[NewsItem]:
         tag = _strip_ns(root.tag)
         if tag == "rss" or tag == "rdf":
-            return self._parse_rss(root, source)
+            return RssFeedCollector._parse_rss(root, source)
         if tag == "feed":
-            return self._parse_atom(root, source)
+            return RssFeedCollector._parse_atom(root, source)
 
         # Fallback: try detecting by presence
         if root.find("channel") is not None:
-            return self._parse_rss(root, source)
-        return self._parse_atom(root, source)
+            return RssFeedCollector._parse_rss(root, source)
+        return RssFeedCollector._parse_atom(root, source)
 
-    def _parse_rss(self, root: ET.Element, source: FeedSource) -> list[NewsItem]:
+    @staticmethod
+    def _parse_rss(root: ET.Element, source: FeedSource) -> list[NewsItem]:
         # RSS 2.0: <rss><channel><item>...</item></channel></rss>
         channel = root.find("channel") if _strip_ns(root.tag) == "rss" else root
         items_el = channel.findall("item") if channel is not None else []
+        return [_rss_item(it, source) for it in items_el]
 
-        ns_content = "{http://purl.org/rss/1.0/modules/content/}encoded"
-        out: list[NewsItem] = []
-        for it in items_el:
-            title = _text(it.find("title"))
-            link = _text(it.find("link"))
-            guid = _text(it.find("guid")) or link or title
-            desc = _text(it.find("description")) or _text(it.find(ns_content))
-            pub = _text(it.find("pubDate"))
-
-            published = _parse_dt(pub)
-            authors = tuple(filter(None, [_text(it.find("author"))]))
-            tags = tuple(t.text.strip() for t in it.findall("category") if t.text)
-
-            out.append(
-                NewsItem(
-                    id=guid or link or title,
-                    title=html.unescape(title or ""),
-                    link=link or "",
-                    summary=html.unescape(desc or None) if desc else None,
-                    published_at=published,
-                    source_url=source.url,
-                    source_name=source.name,
-                    authors=authors,
-                    tags=source.tags + tags,
-                )
-            )
-        return out
-
-    def _parse_atom(self, root: ET.Element, source: FeedSource) -> list[NewsItem]:
+    @staticmethod
+    def _parse_atom(root: ET.Element, source: FeedSource) -> list[NewsItem]:
         # Atom 1.0: <feed><entry>...</entry></feed>
-        out: list[NewsItem] = []
-        for e in root.findall(_with_ns("entry", root)):
-            title = _text(e.find(_with_ns("title", root)))
-            link = _first_link(e, root)
-            id_ = _text(e.find(_with_ns("id", root))) or link or title
-            summary = _text(e.find(_with_ns("summary", root))) or _text(
-                e.find(_with_ns("content", root))
-            )
-            published = _text(e.find(_with_ns("published", root))) or _text(
-                e.find(_with_ns("updated", root))
-            )
-
-            authors = tuple(
-                filter(
-                    None,
-                    [
-                        _text(a.find(_with_ns("name", root)))
-                        for a in e.findall(_with_ns("author", root))
-                    ],
-                )
-            )
-            tags = tuple(
-                t.attrib.get("term") or _text(t.find(_with_ns("term", root))) or ""
-                for t in e.findall(_with_ns("category", root))
-            )
-
-            out.append(
-                NewsItem(
-                    id=id_,
-                    title=html.unescape(title or ""),
-                    link=link or "",
-                    summary=html.unescape(summary or None) if summary else None,
-                    published_at=_parse_dt(published),
-                    source_url=source.url,
-                    source_name=source.name,
-                    authors=authors,
-                    tags=source.tags + tags,
-                )
-            )
-        return out
+        return [_atom_entry(e, root, source) for e in root.findall(_with_ns("entry", root))]
 
     def _dedupe(self, items: Iterable[NewsItem]) -> list[NewsItem]:
         new_items: list[NewsItem] = []
@@ -217,6 +320,12 @@ class RssFeedCollector:
             new_items.append(it)
         return new_items
 
+
+def parse_feed(text: str, source: FeedSource) -> list[NewsItem]:
+    """Parse RSS/Atom text into NewsItems. Raises `ET.ParseError` on malformed XML."""
+    return RssFeedCollector._parse_root(ET.fromstring(text), source)
+
+
 _UA = (
     "Mozilla/5.0 (X11; Linux x86_64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -224,6 +333,109 @@ _UA = (
 )
 
 
+
+_NS_CONTENT = "{http://purl.org/rss/1.0/modules/content/}encoded"
+
+
+def _rss_item(it: ET.Element, source: FeedSource) -> NewsItem:
+    title = _text(it.find("title"))
+    link = _text(it.find("link"))
+    guid = _text(it.find("guid")) or link or title
+    desc = _text(it.find("description")) or _text(it.find(_NS_CONTENT))
+    pub = _text(it.find("pubDate"))
+
+    published = _parse_dt(pub)
+    authors = tuple(filter(None, [_text(it.find("author"))]))
+    tags = tuple(t.text.strip() for t in it.findall("category") if t.text)
+
+    return NewsItem(
+        id=guid or link or title,
+        title=html.unescape(title or ""),
+        link=link or "",
+        summary=html.unescape(desc or None) if desc else None,
+        published_at=published,
+        source_url=source.url,
+        source_name=source.name,
+        authors=authors,
+        tags=source.tags + tags,
+    )
+
+
+def _atom_entry(e: ET.Element, root: ET.Element, source: FeedSource) -> NewsItem:
+    title = _text(e.find(_with_ns("title", root)))
+    link = _first_link(e, root)
+    id_ = _text(e.find(_with_ns("id", root))) or link or title
+    summary = _text(e.find(_with_ns("summary", root))) or _text(e.find(_with_ns("content", root)))
+    published = _text(e.find(_with_ns("published", root))) or _text(
+        e.find(_with_ns("updated", root))
+    )
+
+    authors = tuple(
+        filter(
+            None,
+            [_text(a.find(_with_ns("name", root))) for a in e.findall(_with_ns("author", root))],
+        )
+    )
+    tags = tuple(
+        t.attrib.get("term") or _text(t.find(_with_ns("term", root))) or ""
+        for t in e.findall(_with_ns("category", root))
+    )
+
+    return NewsItem(
+        id=id_,
+        title=html.unescape(title or ""),
+        link=link or "",
+        summary=html.unescape(summary or None) if summary else None,
+        published_at=_parse_dt(published),
+        source_url=source.url,
+        source_name=source.name,
+        authors=authors,
+        tags=source.tags + tags,
+    )
+
+
+class _ItemParser:
+    """Incremental RSS/Atom parser: returns each item as soon as its element closes."""
+
+    def __init__(self, source: FeedSource) -> None:
+        self._source = source
+        self._parser: ET.XMLPullParser[ET.Element] = ET.XMLPullParser(events=("start", "end"))
+        self._root: Optional[ET.Element] = None
+
+    def feed(self, data: bytes) -> list[NewsItem]:
+        self._parser.feed(data)
+        return self._items()
+
+    def close(self) -> list[NewsItem]:
+        self._parser.close()
+        return self._items()
+
+    def _items(self) -> list[NewsItem]:
+        out: list[NewsItem] = []
+        for parsed in self._parser.read_events():
+            event, el = parsed[0], parsed[-1]
+            if not isinstance(el, ET.Element):  # start/end 만 구독하므로 오지 않음
+                continue
+            if event == "start":
+                if self._root is None:
+                    self._root = el
+                continue
+            tag = _strip_ns(el.tag)
+            if tag == "item":
+                out.append(_rss_item(el, self._source))
+            elif tag == "entry" and self._root is not None:
+                out.append(_atom_entry(el, self._root, self._source))
+            else:
+                continue
+            el.clear()  # 처리한 항목은 버려 큰 피드도 메모리 일정
+        return out
+
+
+def _timed_out(e: Exception, timeout: float) -> Optional[float]:
+    """`timeout` when `e` is the fetch deadline expiring (recorded as a latency sample)."""
+    return timeout if isinstance(e, asyncio.TimeoutError) else None
+
+
 def _strip_ns(tag: str) -> str:
     if not tag:
         return tag
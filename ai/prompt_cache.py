@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Protocol
+
+_log = logging.getLogger(__name__)
+
+
+class CacheProvider(Protocol):
+    """Provider-side cached content holding a static system instruction."""
+
+    async def create(self, model: str, system_instruction: str, ttl: float) -> str: ...
+
+    async def extend(self, name: str, ttl: float) -> None: ...
+
+
+class GoogleGenAICacheProvider:
+    """Gemini explicit context caching (`client.caches`)."""
+
+    def __init__(self, client: Any = None) -> None:
+        self.__client = client
+
+    def _client(self):
+        if self.__client is None:
+            from google import genai
+
+            self.__client = genai.Client()
+        return self.__client
+
+    async def create(self, model: str, system_instruction: str, ttl: float) -> str:
+        from google.genai import types
+
+        cache = await self._client().aio.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name=f"system-prompt-{_digest(system_instruction)[:12]}",
+                system_instruction=system_instruction,
+                ttl=f"{int(ttl)}s",
+            ),
+        )
+        return cache.name
+
+    async def extend(self, name: str, ttl: float) -> None:
+        from google.genai import types
+
+        await self._client().aio.caches.update(
+            name=name, config=types.UpdateCachedContentConfig(ttl=f"{int(ttl)}s")
+        )
+
+
+@dataclass(slots=True)
+class LocalCacheProvider:
+    """In-process fake provider for tests; records every call instead of calling an API."""
+
+    created: list[tuple[str, str, str]] = field(default_factory=list)
+    extended: list[str] = field(default_factory=list)
+    fail_create: bool = False
+    _ids: Any = field(default_factory=itertools.count)
+
+    async def create(self, model: str, system_instruction: str, ttl: float) -> str:
+        if self.fail_create:
+            raise RuntimeError("cache creation disabled")
+        name = f"cachedContents/local-{next(self._ids)}"
+        self.created.append((name, model, system_instruction))
+        return name
+
+    async def extend(self, name: str, ttl: float) -> None:
+        self.extended.append(name)
+
+
+@dataclass(slots=True)
+class _Handle:
+    name: str
+    expires_at: float
+
+
+class PromptCache:
+    """Process-wide cache handles keyed by (model, instruction hash), shared by all sessions.
+
+    - A handle is extended (or recreated) once it gets within `refresh_margin` of its TTL.
+    - Instructions estimated below `min_tokens` (the provider's minimum cached-content size)
+      are never cached; callers get None and send the prompt inline.
+    - Other provider failures are remembered for `retry_after` seconds, with the same fallback.
+    """
+
+    def __init__(
+        self,
+        provider: CacheProvider,
+        *,
+        ttl: float = 3600.0,
+        refresh_margin: float = 300.0,
+        retry_after: float = 600.0,
+        min_tokens: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._provider = provider
+        self._ttl = ttl
+        self._refresh_margin = min(refresh_margin, ttl / 2)
+        self._retry_after = retry_after
+        self._min_tokens = min_tokens
+        self._clock = clock
+        self._handles: dict[tuple[str, str], _Handle] = {}
+        self._failed_until: dict[tuple[str, str], float] = {}
+        self._locks: dict[tuple[str, str], asyncio.Lock] = {}
+        self._too_small: set[tuple[str, str]] = set()
+
+    async def get(self, model: str, instruction: str) -> Optional[str]:
+        key = (model, _digest(instruction))
+        if key in self._too_small:
+            return None
+        if _estimate_tokens(instruction) < self._min_tokens:
+            # 최소 크기 미만은 생성이 항상 실패하므로 재시도하지 않음
+            _log.info("system prompt for %s below cached-content minimum, sending inline", model)
+            self._too_small.add(key)
+            return None
+        handle = self._handles.get(key)
+        now = self._clock()
+        if handle and handle.expires_at - now > self._refresh_margin:
+            return handle.name
+        if self._failed_until.get(key, 0.0) > now:
+            return handle.name if handle and handle.expires_at > now else None
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # 다른 요청이 이미 갱신했으면 그대로 사용
+            handle = self._handles.get(key)
+            now = self._clock()
+            if handle and handle.expires_at - now > self._refresh_margin:
+                return handle.name
+            return await self._refresh(key, model, instruction, handle)
+
+    def invalidate(self, model: str, instruction: str) -> None:
+        self._handles.pop((model, _digest(instruction)), None)
+
+    async def _refresh(
+        self, key: tuple[str, str], model: str, instruction: str, handle: Optional[_Handle]
+    ) -> Optional[str]:
+        now = self._clock()
+        if handle and handle.expires_at > now:
+            try:
+                await self._provider.extend(handle.name, self._ttl)
+                handle.expires_at = now + self._ttl
+                return handle.name
+            except Exception as e:
+                _log.info("extending cached content %s failed, recreating: %s", handle.name, e)
+
+        try:
+            name = await self._provider.create(model, instruction, self._ttl)
+        except Exception as e:
+            _log.warning("cached content for %s unavailable, sending prompt inline: %s", model, e)
+            self._handles.pop(key, None)
+            self._failed_until[key] = now + self._retry_after
+            return None
+        self._handles[key] = _Handle(name=name, expires_at=now + self._ttl)
+        self._failed_until.pop(key, None)
+        return name
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _estimate_tokens(text: str) -> int:
+    # UTF-8 4바이트당 1토큰 정도(영문 ~4자, 한글 ~1.3자)로 어림
+    return len(text.encode()) // 4
+
+
+def prompt_cache_from_env() -> Optional[PromptCache]:
+    """`PROMPT_CACHE=google|off` (default off), `PROMPT_CACHE_TTL` seconds,
+    `PROMPT_CACHE_MIN_TOKENS` (default 1024, Gemini's minimum cached-content size)."""
+    if os.getenv("PROMPT_CACHE", "off").lower() != "google":
+        return None
+    return PromptCache(
+        GoogleGenAICacheProvider(),
+        ttl=float(os.getenv("PROMPT_CACHE_TTL", "3600")),
+        min_tokens=int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024")),
+    )
@@ -1,6 +1,6 @@
-from langchain.chat_models.base import BaseChatModel
-from langchain.agents import create_agent
 from pydantic import BaseModel
+from ai.batch import shared
+from ai.models import ModelRegistry, NodeModelConfig
 from ai.state import AgentState
 from typing import Literal
 
@@ -26,17 +26,22 @@ class RouterAgent:
     - 예시: {"router": "news_agent"}
     """
 
-    def __init__(self, model: BaseChatModel) -> None:
-        self.__model = create_agent(
-            model=model,
+    def __init__(self, registry: ModelRegistry, config: NodeModelConfig) -> None:
+        self.__model = registry.agent(
+            config,
             system_prompt=self.__instruction,
             response_format=RouteResponseFormat,
         )
 
     async def run(self, state: AgentState):
+        # 배치/WebSocket 안에서는 같은 메시지에 대한 라우팅 결과를 공유
+        route = await shared("route", str(state.messages[-1].content), lambda: self.__route(state))
+        return {"route": route}
+
+    async def __route(self, state: AgentState) -> str:
         # LLM으로 마지막 메시지를 기준으로 라우팅 판단
         resp = await self.__model.ainvoke({"messages": state.messages[-1]})
-        return {"route": resp["structured_response"].router}
+        return resp["structured_response"].router
 
     def edge_condition(self, state: AgentState) -> str:
         return state.route
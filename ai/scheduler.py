@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, AsyncIterator, Iterator, Optional
+
+# 프로세스 전체에서 동시에 진행되는 모델 호출 수 상한. 0 이면 스케줄링하지 않습니다.
+MODEL_CONCURRENCY = int(os.getenv("MODEL_CONCURRENCY", "0"))
+# 백그라운드 작업이 동시에 차지할 수 있는 슬롯 비율(나머지는 대화 턴 전용)
+MODEL_BACKGROUND_SHARE = float(os.getenv("MODEL_BACKGROUND_SHARE", "0.5"))
+# /batch 요청 세션의 공정 큐 가중치(대화 세션은 1)
+MODEL_BATCH_WEIGHT = float(os.getenv("MODEL_BATCH_WEIGHT", "0.5"))
+
+
+class Priority(IntEnum):
+    """Model call classes, served strictly in this order."""
+
+    ROUTING = 0  # 라우팅/피드 선택처럼 턴의 첫 단계인 짧은 분류 호출
+    INTERACTIVE = 1  # 사용자에게 스트리밍되는 생성(chat, summary)
+    BACKGROUND = 2  # 요약 미리 생성 등 기다리는 사용자가 없는 작업
+
+    @classmethod
+    def parse(cls, value: str) -> "Priority":
+        return cls[value.strip().upper()]
+
+
+class ModelCallPreempted(RuntimeError):
+    """A queued background model call gave its place up to interactive work."""
+
+
+# 모델 호출의 우선순위/가중치를 호출 지점 밖에서 지정(백그라운드 작업, 배치 요청)
+current_priority: ContextVar[Optional[Priority]] = ContextVar("current_priority", default=None)
+current_weight: ContextVar[float] = ContextVar("current_weight", default=1.0)
+
+
+@contextmanager
+def background() -> Iterator[None]:
+    """Run the model calls made inside this block as `Priority.BACKGROUND`."""
+    token = current_priority.set(Priority.BACKGROUND)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+@dataclass(slots=True, order=True)
+class _Waiter:
+    priority: Priority
+    finish: float
+    seq: int
+    session: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class ModelScheduler:
+    """Admits model calls under a process-wide concurrency limit.
+
+    - Strict priority between classes; within a class, weighted fair queueing per
+      session (virtual finish times), so one busy session or batch client cannot
+      starve the rest.
+    - Background calls may hold at most `background_share` of the slots, keeping the
+      rest free for interactive turns (a running call cannot be interrupted).
+    - When an interactive call has to wait while background calls hold slots, queued
+      background calls are preempted with `ModelCallPreempted`; their callers retry later.
+      If only interactive work is running, priority order alone serves the waiter first.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = MODEL_CONCURRENCY,
+        *,
+        background_share: float = MODEL_BACKGROUND_SHARE,
+    ) -> None:
+        self._concurrency = concurrency
+        self._background_limit = max(1, int(concurrency * background_share)) if concurrency else 0
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._running_background = 0
+        self._virtual = 0.0
+        self._last_finish: dict[str, float] = {}
+        self.admitted = {p.name.lower(): 0 for p in Priority}
+        self.preempted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._concurrency > 0
+
+    @asynccontextmanager
+    async def slot(
+        self, priority: Priority, session_id: Optional[str] = None, *, weight: float = 1.0
+    ) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+        await self._acquire(priority, session_id or "", weight)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    async def _acquire(self, priority: Priority, session: str, weight: float) -> None:
+        # 세션별 가상 종료 시각: 가중치가 작을수록 같은 호출 수에 더 늦게 배정
+        start = max(self._virtual, self._last_finish.get(session, 0.0))
+        finish = start + 1.0 / max(weight, 1e-3)
+        self._last_finish[session] = finish
+        waiter = _Waiter(
+            priority, finish, next(self._seq), session, asyncio.get_running_loop().create_future()
+        )
+        heapq.heappush(self._queue, waiter)
+        self._dispatch()
+        if not waiter.future.done() and priority < Priority.BACKGROUND:
+            self._preempt_background()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release(priority)  # 슬롯을 받은 직후 취소됨
+            raise
+
+    def _can_start(self, priority: Priority) -> bool:
+        if self._running >= self._concurrency:
+            return False
+        return priority < Priority.BACKGROUND or self._running_background < self._background_limit
+
+    def _dispatch(self) -> None:
+        while self._queue:
+            head = self._queue[0]
+            if head.future.done():  # 취소/선점된 대기자
+                heapq.heappop(self._queue)
+                continue
+            if not self._can_start(head.priority):
+                return
+            heapq.heappop(self._queue)
+            self._running += 1
+            if head.priority == Priority.BACKGROUND:
+                self._running_background += 1
+            self._virtual = max(self._virtual, head.finish)
+            self.admitted[head.priority.name.lower()] += 1
+            head.future.set_result(None)
+        # 대기 중인 호출이 없으면 세션별 기록은 가상 시각과 같아지므로 정리
+        self._last_finish.clear()
+
+    def _preempt_background(self) -> None:
+        # 대기 중인 백그라운드 호출은 어차피 우선순위가 낮아 먼저 배정되지 않으므로,
+        # 백그라운드가 실제로 슬롯을 잡고 있어 부하를 줄여야 할 때만 밀어냄
+        if self._running_background == 0:
+            return
+        for waiter in self._queue:
+            if waiter.priority == Priority.BACKGROUND and not waiter.future.done():
+                waiter.future.set_exception(ModelCallPreempted("background model call preempted"))
+                self.preempted += 1
+
+    def _release(self, priority: Priority) -> None:
+        self._running -= 1
+        if priority == Priority.BACKGROUND:
+            self._running_background -= 1
+        self._dispatch()
+
+    def stats(self) -> dict[str, Any]:
+        queued = {p.name.lower(): 0 for p in Priority}
+        for waiter in self._queue:
+            if not waiter.future.done():
+                queued[waiter.priority.name.lower()] += 1
+        return {
+            "concurrency": self._concurrency or None,
+            "running": self._running,
+            "running_background": self._running_background,
+            "queued": queued,
+            "admitted": dict(self.admitted),
+            "preempted": self.preempted,
+        }
+
+
+def scheduling_middleware(scheduler: ModelScheduler, priority: Priority) -> Any:
+    """Agent middleware holding a scheduler slot for each model call of an agent.
+
+    The class comes from `current_priority` when set (e.g. inside `background()`), else
+    `priority`; the session and weight from the current turn / `current_weight`.
+    """
+    # langchain.agents 는 무거우므로 에이전트를 만들 때 import
+    from langchain.agents.middleware import wrap_model_call
+
+    from ai.usage import current_turn
+
+    @wrap_model_call
+    async def model_scheduling(request: Any, handler: Any) -> Any:
+        turn = current_turn.get()
+        override = current_priority.get()
+        async with scheduler.slot(
+            override if override is not None else priority,
+            turn.session_id if turn is not None else None,
+            weight=current_weight.get(),
+        ):
+            return await handler(request)
+
+    return model_scheduling
+
+
+model_scheduler = ModelScheduler()
@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import copy
+import json
+import logging
+import os
+import struct
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Sequence
+
+import ormsgpack
+from langgraph.checkpoint.memory import InMemorySaver
+
+from ai.loop import approx_size, run_cpu
+
+_log = logging.getLogger(__name__)
+
+# 0 이면 해당 제한을 끕니다.
+IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "0"))
+MAX_SESSIONS = int(os.getenv("SESSION_MAX", "0"))
+KEEP_CHECKPOINTS = int(os.getenv("SESSION_KEEP_CHECKPOINTS", "0"))
+SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+# 1이면 messages 를 단계별 변경분(write)만 저장하고 읽을 때 복원, N번 갱신마다 전체 스냅샷
+CHECKPOINT_DELTA = os.getenv("CHECKPOINT_DELTA", "0") == "1"
+CHECKPOINT_SNAPSHOT_EVERY = int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "20"))
+
+NDJSON, BINARY = "ndjson", "binary"
+# binary 스트림: MAGIC 뒤에 [4바이트 big-endian 길이][msgpack 레코드] 반복
+MAGIC = b"LGS1"
+_LEN = struct.Struct(">I")
+
+
+class SessionStore(InMemorySaver):
+    """`InMemorySaver` with bounded memory: idle TTL, LRU cap and per-thread compaction.
+
+    - `max_sessions`: writing a new thread beyond the cap evicts the least recently used one.
+    - `idle_ttl`: `maintain()` drops threads not read or written for that many seconds.
+    - `keep_checkpoints`: `maintain()` keeps only the newest N checkpoints of threads written
+      since the last pass, and the blobs they still reference.
+    Keys are indexed per thread, so evicting one thread does not scan the whole store.
+    `sidecar()` holds small per-thread data (e.g. usage) that is evicted and exported with it.
+    `delta_channels`: channels stored as `DeltaChannel` writes; compaction keeps every
+    checkpoint back to their last full snapshot so the value can still be rebuilt.
+    """
+
+    def __init__(
+        self,
+        *,
+        idle_ttl: Optional[float] = None,
+        max_sessions: Optional[int] = None,
+        keep_checkpoints: Optional[int] = None,
+        delta_channels: Sequence[str] = (),
+        clock: Callable[[], float] = time.monotonic,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self._idle_ttl = idle_ttl or None
+        self._max_sessions = max_sessions or None
+        self._keep = keep_checkpoints or None
+        self._delta_channels = tuple(delta_channels)
+        self._clock = clock
+        self._last_used: OrderedDict[str, float] = OrderedDict()
+        self._write_keys: defaultdict[str, set[tuple]] = defaultdict(set)
+        self._blob_keys: defaultdict[str, set[tuple]] = defaultdict(set)
+        self._dirty: set[str] = set()
+        self._sidecars: dict[str, dict[str, Any]] = {}
+        self.evicted = 0
+        self.expired = 0
+
+    # -------------- Saver overrides --------------
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        try:
+            return super().get_tuple(config)
+        finally:
+            self._after_read(thread_id)
+
+    def list(self, config, *, filter=None, before=None, limit=None) -> Iterator:
+        thread_id = config["configurable"]["thread_id"] if config else None
+        try:
+            yield from super().list(config, filter=filter, before=before, limit=limit)
+        finally:
+            if thread_id is not None:
+                self._after_read(thread_id)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"]["checkpoint_ns"]
+        self._blob_keys[thread_id].update((thread_id, ns, k, v) for k, v in new_versions.items())
+        self._dirty.add(thread_id)
+        self._touch(thread_id)
+        return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        super().put_writes(config, writes, task_id, task_path)
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        self._write_keys[thread_id].add((thread_id, ns, config["configurable"]["checkpoint_id"]))
+        self._touch(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.storage.pop(thread_id, None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        self._last_used.pop(thread_id, None)
+        self._dirty.discard(thread_id)
+        self._sidecars.pop(thread_id, None)
+
+    def sidecar(self, thread_id: str) -> dict[str, Any]:
+        """Mutable JSON/msgpack-friendly dict stored alongside the thread."""
+        return self._sidecars.setdefault(thread_id, {})
+
+    def peek_sidecar(self, thread_id: str) -> Optional[dict[str, Any]]:
+        return self._sidecars.get(thread_id)
+
+    # -------------- Lifecycle --------------
+    def _touch(self, thread_id: str) -> None:
+        is_new = thread_id not in self._last_used
+        self._last_used[thread_id] = self._clock()
+        self._last_used.move_to_end(thread_id)
+        if is_new and self._max_sessions is not None:
+            while len(self._last_used) > self._max_sessions:
+                oldest = next(iter(self._last_used))
+                self.delete_thread(oldest)
+                self.evicted += 1
+
+    def _after_read(self, thread_id: str) -> None:
+        if thread_id in self._last_used:
+            self._touch(thread_id)
+        else:
+            # 없는 세션 조회 시 defaultdict 가 만든 빈 항목 정리
+            self.storage.pop(thread_id, None)
+
+    def threads(self) -> List[str]:  # 클래스 안에서는 `list` 가 아래 saver 메서드를 가리킴
+        """Thread ids, least recently used first."""
+        return list(self._last_used)
+
+    def expire(self) -> int:
+        if self._idle_ttl is None:
+            return 0
+        now = self._clock()
+        count = 0
+        while self._last_used:
+            thread_id, last = next(iter(self._last_used.items()))
+            if now - last <= self._idle_ttl:
+                break
+            self.delete_thread(thread_id)
+            count += 1
+        self.expired += count
+        return count
+
+    def compact(self) -> int:
+        """Drop checkpoints beyond the newest `keep_checkpoints`; returns how many."""
+        keep = self._keep
+        if keep is None:
+            self._dirty.clear()
+            return 0
+        dropped = 0
+        for thread_id in list(self._dirty):
+            dropped += self._compact_thread(thread_id, keep)
+        self._dirty.clear()
+        return dropped
+
+    def _compact_thread(self, thread_id: str, keep: int) -> int:
+        dropped = 0
+        referenced: set[tuple] = set()
+        for ns, checkpoints in self.storage.get(thread_id, {}).items():
+            # checkpoint id 는 시간순 정렬 가능한 uuid6
+            ordered = sorted(checkpoints)
+            cut = max(0, len(ordered) - keep)
+            # delta 채널은 스냅샷 이후의 write 가 모두 있어야 복원되므로 스냅샷까지 남김
+            while cut > 0 and not self._has_snapshot(thread_id, ns, checkpoints[ordered[cut]][0]):
+                cut -= 1
+            for checkpoint_id in ordered[:cut]:
+                del checkpoints[checkpoint_id]
+                self.writes.pop((thread_id, ns, checkpoint_id), None)
+                self._write_keys[thread_id].discard((thread_id, ns, checkpoint_id))
+                dropped += 1
+            for saved, _, _ in checkpoints.values():
+                versions = self.serde.loads_typed(saved).get("channel_versions", {})
+                referenced.update((thread_id, ns, ch, v) for ch, v in versions.items())
+        if dropped:
+            blob_keys = self._blob_keys[thread_id]
+            for key in blob_keys - referenced:
+                self.blobs.pop(key, None)
+            blob_keys &= referenced
+        return dropped
+
+    def _has_snapshot(self, thread_id: str, ns: str, saved: tuple[str, bytes]) -> bool:
+        if not self._delta_channels:
+            return True
+        versions = self.serde.loads_typed(saved).get("channel_versions", {})
+        for channel in self._delta_channels:
+            version = versions.get(channel)
+            if version is None:
+                continue
+            blob = self.blobs.get((thread_id, ns, channel, version))
+            if blob is None or blob[0] == "empty":
+                return False
+        return True
+
+    def maintain(self) -> dict[str, int]:
+        return {"expired": self.expire(), "compacted": self.compact()}
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "sessions": len(self._last_used),
+            "checkpoints": sum(len(cps) for ns in self.storage.values() for cps in ns.values()),
+            "blobs": len(self.blobs),
+            "blob_bytes": sum(len(b) for _, b in self.blobs.values()),
+            "write_bytes": sum(
+                len(value[1])
+                for writes in self.writes.values()
+                for _, _, value, _ in writes.values()
+            ),
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "limits": {
+                "idle_ttl": self._idle_ttl,
+                "max_sessions": self._max_sessions,
+                "keep_checkpoints": self._keep,
+                "delta_channels": list(self._delta_channels),
+            },
+        }
+
+    # -------------- Export / import --------------
+    def export_thread(self, thread_id: str) -> Optional[dict[str, Any]]:
+        """Serialized checkpoints, pending writes and blobs of one thread, or None."""
+        if thread_id not in self._last_used:
+            return None
+        checkpoints = [
+            [ns, cid, *saved, *meta, parent]
+            for ns, cps in self.storage.get(thread_id, {}).items()
+            for cid, (saved, meta, parent) in cps.items()
+        ]
+        writes = [
+            [ns, cid, task_id, idx, channel, *value, path]
+            for (_, ns, cid) in self._write_keys.get(thread_id, ())
+            for (task_id, idx), (_, channel, value, path) in self.writes.get(
+                (thread_id, ns, cid), {}
+            ).items()
+        ]
+        blobs = []
+        for key in self._blob_keys.get(thread_id, ()):
+            if key in self.blobs:
+                _, ns, channel, version = key
+                blobs.append([ns, channel, version, *self.blobs[key]])
+        return {
+            "thread_id": thread_id,
+            "checkpoints": checkpoints,
+            "writes": writes,
+            "blobs": blobs,
+            "sidecar": copy.deepcopy(self._sidecars.get(thread_id, {})),
+        }
+
+    def import_thread(self, record: dict[str, Any]) -> str:
+        """Replace a thread with an exported record."""
+        thread_id = record["thread_id"]
+        self.delete_thread(thread_id)
+        for ns, cid, ctype, cdata, mtype, mdata, parent in record["checkpoints"]:
+            self.storage[thread_id][ns][cid] = ((ctype, cdata), (mtype, mdata), parent)
+        for ns, cid, task_id, idx, channel, vtype, vdata, path in record["writes"]:
+            self.writes[(thread_id, ns, cid)][(task_id, idx)] = (
+                task_id,
+                channel,
+                (vtype, vdata),
+                path,
+            )
+            self._write_keys[thread_id].add((thread_id, ns, cid))
+        for ns, channel, version, btype, bdata in record["blobs"]:
+            key = (thread_id, ns, channel, version)
+            self.blobs[key] = (btype, bdata)
+            self._blob_keys[thread_id].add(key)
+        if record.get("sidecar"):
+            self._sidecars[thread_id] = record["sidecar"]
+        self._dirty.add(thread_id)
+        self._touch(thread_id)
+        return thread_id
+
+    def export_threads(
+        self, thread_ids: Optional[Sequence[str]] = None, *, evict: bool = False
+    ) -> Iterator[dict[str, Any]]:
+        """Records of the given threads (default: all). `evict` drops each once yielded.
+
+        Iterate on the event loop that updates the store (see `export_stream`).
+        """
+        for thread_id in list(thread_ids if thread_ids is not None else self._last_used):
+            record = self.export_thread(thread_id)
+            if record is None:
+                continue
+            yield record
+            if evict:
+                self.delete_thread(thread_id)
+
+
+def encode_record(record: dict[str, Any], fmt: str) -> bytes:
+    if fmt == BINARY:
+        body = ormsgpack.packb(record)
+        return _LEN.pack(len(body)) + body
+    return json.dumps(_b64(record), ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+
+
+def encode_stream(records: Iterable[dict[str, Any]], fmt: str) -> Iterator[bytes]:
+    if fmt == BINARY:
+        yield MAGIC
+    for record in records:
+        yield encode_record(record, fmt)
+
+
+async def export_stream(
+    store: SessionStore,
+    thread_ids: Optional[Sequence[str]] = None,
+    fmt: str = NDJSON,
+    *,
+    evict: bool = False,
+) -> AsyncIterator[bytes]:
+    """`encode_stream` for a streaming response.
+
+    Each thread is snapshotted on the event loop, so graph runs and maintenance cannot
+    change it mid-copy; only the encoding of large records leaves the loop.
+    """
+    if fmt == BINARY:
+        yield MAGIC
+    for record in store.export_threads(thread_ids, evict=evict):
+        yield await run_cpu(encode_record, record, fmt, size=approx_size(record))
+
+
+class RecordReader:
+    """Incremental decoder for `encode_stream` output fed in arbitrary chunks."""
+
+    def __init__(self, fmt: str) -> None:
+        self._fmt = fmt
+        self._buf = bytearray()
+        self._header = fmt != BINARY
+
+    def feed(self, chunk: bytes) -> list[dict[str, Any]]:
+        self._buf += chunk
+        return list(self._drain())
+
+    def close(self) -> None:
+        leftover = self._buf.strip() if self._fmt == NDJSON else self._buf
+        if leftover:
+            raise ValueError("truncated session stream")
+
+    def _drain(self) -> Iterator[dict[str, Any]]:
+        if not self._header:
+            if len(self._buf) < len(MAGIC):
+                return
+            if bytes(self._buf[: len(MAGIC)]) != MAGIC:
+                raise ValueError("not a session export stream")
+            del self._buf[: len(MAGIC)]
+            self._header = True
+        while True:
+            if self._fmt == BINARY:
+                if len(self._buf) < _LEN.size:
+                    return
+                (size,) = _LEN.unpack_from(self._buf)
+                if len(self._buf) < _LEN.size + size:
+                    return
+                body = bytes(self._buf[_LEN.size : _LEN.size + size])
+                del self._buf[: _LEN.size + size]
+                yield ormsgpack.unpackb(body)
+            else:
+                end = self._buf.find(b"\n")
+                if end < 0:
+                    return
+                line = bytes(self._buf[:end]).strip()
+                del self._buf[: end + 1]
+                if line:
+                    yield _unb64(json.loads(line))
+
+
+def _b64(obj: Any) -> Any:
+    if isinstance(obj, (bytes, bytearray)):
+        return {"$b64": base64.b64encode(obj).decode()}
+    if isinstance(obj, dict):
+        return {k: _b64(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_b64(v) for v in obj]
+    return obj
+
+
+def _unb64(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        if len(obj) == 1 and "$b64" in obj:
+            return base64.b64decode(obj["$b64"])
+        return {k: _unb64(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_unb64(v) for v in obj]
+    return obj
+
+
+async def run_maintenance(store: SessionStore, interval: float = SWEEP_INTERVAL) -> None:
+    """Periodic `store.maintain()`; run as a background task for the app's lifetime."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = store.maintain()
+        except Exception:
+            _log.exception("session maintenance failed")
+            continue
+        if any(result.values()):
+            _log.info("session maintenance: %s", result)
+
+
+session_store = SessionStore(
+    idle_ttl=IDLE_TTL,
+    max_sessions=MAX_SESSIONS,
+    keep_checkpoints=KEEP_CHECKPOINTS,
+    delta_channels=("messages",) if CHECKPOINT_DELTA else (),
+)
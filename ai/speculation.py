@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.runnables.config import var_child_runnable_config
+
+from ai.news.tools.rss_feed import NewsItem, RssFeedCollector
+from ai.state import AgentState
+
+_log = logging.getLogger(__name__)
+
+NodeFn = Callable[[AgentState], Awaitable[dict[str, Any]]]
+
+
+class WasteBudget:
+    """Sliding-window cap on speculative work that ended up unused."""
+
+    def __init__(
+        self, limit: int, window: float = 60.0, clock: Callable[[], float] = time.monotonic
+    ):
+        self._limit = limit
+        self._window = window
+        self._clock = clock
+        self._events: deque[float] = deque()
+
+    def allows(self) -> bool:
+        now = self._clock()
+        while self._events and now - self._events[0] > self._window:
+            self._events.popleft()
+        return len(self._events) < self._limit
+
+    def spend(self) -> None:
+        self._events.append(self._clock())
+
+
+@dataclass(slots=True)
+class _Turn:
+    started_at: float
+    feed_url: Optional[str] = None
+    feed: Optional[asyncio.Task] = None
+    chat: Optional[asyncio.Task] = None
+
+
+class Speculator:
+    """Overlaps downstream work with the router's LLM call.
+
+    While `router_agent` decides, it prefetches the feed guessed from the message
+    (`guess_feed`) and, if `chat` is given, runs `chat_agent` as well. Once the route is
+    known the losing branch is cancelled. Each kind stops speculating once its unused
+    work in the last minute reaches its budget.
+
+    The speculative chat call runs detached from the graph callbacks, so when it wins its
+    answer arrives as a whole instead of token-by-token.
+    """
+
+    def __init__(
+        self,
+        *,
+        guess_feed: Callable[[str], Optional[str]],
+        chat: Optional[NodeFn] = None,
+        fetch_feed: Optional[Callable[[str], Awaitable[list[NewsItem]]]] = None,
+        feed_budget: int = 30,
+        chat_budget: int = 5,
+        max_age: float = 120.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._guess_feed = guess_feed
+        self._chat = chat
+        self._fetch_feed = fetch_feed or (lambda url: RssFeedCollector([url]).fetch_all())
+        self._feed_budget = WasteBudget(feed_budget, clock=clock)
+        self._chat_budget = WasteBudget(chat_budget, clock=clock)
+        self._max_age = max_age
+        self._clock = clock
+        self._turns: dict[str, _Turn] = {}
+
+    # -------------- Graph hooks --------------
+    def wrap_router(self, run: NodeFn) -> NodeFn:
+        async def _run(state: AgentState) -> dict[str, Any]:
+            key = _turn_key(state)
+            if key is not None:
+                self._start(key, state)
+            try:
+                result = await run(state)
+            except BaseException:
+                if key is not None:
+                    self._discard(self._turns.pop(key, None))
+                raise
+            if key is not None:
+                self._settle(key, result.get("route"))
+            return result
+
+        return _run
+
+    def wrap_chat(self, run: NodeFn) -> NodeFn:
+        async def _run(state: AgentState) -> dict[str, Any]:
+            key = _turn_key(state)
+            turn = self._turns.get(key or "")
+            if turn is None or turn.chat is None:
+                return await run(state)
+            task, turn.chat = turn.chat, None
+            self._forget(key)
+            try:
+                return await task
+            except Exception as e:
+                _log.info("speculative chat failed, running normally: %s", e)
+                return await run(state)
+
+        return _run
+
+    async def take_feed(self, state: AgentState, url: str) -> Optional[list[NewsItem]]:
+        """Result of the prefetch if it fetched `url`, else None (caller fetches itself)."""
+        key = _turn_key(state)
+        turn = self._turns.get(key or "")
+        if turn is None or turn.feed is None:
+            return None
+        task, turn.feed = turn.feed, None
+        self._forget(key)
+        if turn.feed_url != url:
+            self._waste(task, self._feed_budget)
+            return None
+        return await task
+
+    def release_feed(self, state: AgentState) -> None:
+        """Drop the prefetch of a turn whose feed choice came back unusable."""
+        turn = self._turns.get(_turn_key(state) or "")
+        if turn is None or turn.feed is None:
+            return
+        self._waste(turn.feed, self._feed_budget)
+        turn.feed = None
+        self._forget(_turn_key(state))
+
+    # -------------- Internal --------------
+    def _start(self, key: str, state: AgentState) -> None:
+        self._expire()
+        turn = self._turns[key] = _Turn(started_at=self._clock())
+        text = _text(state.messages[-1])
+
+        url = self._guess_feed(text) if self._feed_budget.allows() else None
+        if url:
+            turn.feed_url = url
+            turn.feed = _detached(self._fetch_feed, url)
+        if self._chat is not None and self._chat_budget.allows():
+            turn.chat = _detached(self._chat, state)
+
+    def _settle(self, key: str, route: Optional[str]) -> None:
+        turn = self._turns.get(key)
+        if turn is None:
+            return
+        if route != "news_agent" and turn.feed is not None:
+            self._waste(turn.feed, self._feed_budget)
+            turn.feed = None
+        if route != "chat_agent" and turn.chat is not None:
+            self._waste(turn.chat, self._chat_budget)
+            turn.chat = None
+        self._forget(key)
+
+    def _forget(self, key: Optional[str]) -> None:
+        if key is None:
+            return
+        turn = self._turns.get(key)
+        if turn is not None and turn.feed is None and turn.chat is None:
+            del self._turns[key]
+
+    def _expire(self) -> None:
+        now = self._clock()
+        for key, turn in list(self._turns.items()):
+            if now - turn.started_at > self._max_age:
+                self._discard(self._turns.pop(key))
+
+    def _discard(self, turn: Optional[_Turn]) -> None:
+        if turn is None:
+            return
+        if turn.feed is not None:
+            self._waste(turn.feed, self._feed_budget)
+        if turn.chat is not None:
+            self._waste(turn.chat, self._chat_budget)
+
+    @staticmethod
+    def _waste(task: asyncio.Task, budget: WasteBudget) -> None:
+        task.cancel()
+        budget.spend()
+
+
+def _detached(fn: Callable[..., Awaitable[Any]], *args: Any) -> asyncio.Task:
+    async def _run():
+        # 그래프 콜백에서 분리: 버려질 수 있는 작업의 이벤트가 SSE 로 새지 않게 합니다.
+        var_child_runnable_config.set(None)
+        return await fn(*args)
+
+    task = asyncio.create_task(_run())
+    # 취소/미사용 task 의 예외가 "never retrieved" 경고로 남지 않게
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+
+def _turn_key(state: AgentState) -> Optional[str]:
+    if not state.messages:
+        return None
+    return state.messages[-1].id
+
+
+def _text(message: Any) -> str:
+    content = getattr(message, "content", "")
+    return content if isinstance(content, str) else str(content)
+
+
+def speculation_mode() -> str:
+    """`SPECULATION=off|feed|all` (default off). `all` also runs chat_agent speculatively."""
+    return os.getenv("SPECULATION", "off").lower()
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Optional
+
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.messages.ai import add_ai_message_chunks
+from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from ai.loop import approx_size, run_cpu
+
+try:  # langsmith 의존성으로 보통 설치되어 있지만 필수는 아님
+    import orjson
+except ImportError:  # pragma: no cover
+    _HAS_ORJSON = False
+else:
+    _HAS_ORJSON = True
+
+# 같은 모델 호출의 토큰 청크를 이 시간(ms) 동안 모아 한 이벤트로 보냅니다. 0이면 끔.
+COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "0"))
+# 허용할 스트림 압축(쉼표 구분, 선호 순): 예) "br,gzip". 비어 있으면 압축하지 않습니다.
+COMPRESSION = tuple(
+    e.strip() for e in os.getenv("SSE_COMPRESSION", "").lower().split(",") if e.strip()
+)
+# 압축 스트림에서 유휴 시 보내는 keep-alive 주석 간격(초)
+PING_INTERVAL = float(os.getenv("SSE_PING_INTERVAL", "15"))
+
+_SEP = "\r\n"
+_PING = f": ping{_SEP}{_SEP}".encode()
+
+
+# -------------- Encoding --------------
+def encode_event(event: dict[str, Any]) -> dict[str, str]:
+    """Encode a LangGraph astream_events payload as `{"event", "data"}` (data is JSON text).
+
+    Messages are written field by field instead of through `str()`, so token chunks
+    arrive as `{"chunk": {"type", "content", "id", ...}}`.
+    """
+    name = event.get("event") or "message"
+    if name == "on_custom_event":  # adispatch_custom_event 는 자기 이름으로(예: news_item)
+        name = event.get("name") or name
+    payload = event.get("data")
+    encoder = _ENCODERS.get(name, dumps)
+    try:
+        data = encoder(payload)
+    except Exception:
+        data = json.dumps({"repr": repr(payload)}, ensure_ascii=False)
+    return {"event": name, "data": data}
+
+
+async def encode_event_offloaded(event: dict[str, Any]) -> dict[str, str]:
+    """`encode_event`, moved off the loop for large payloads such as node state."""
+    if event.get("event") in _ENCODERS:  # 토큰 청크는 작으므로 바로 인코딩
+        return encode_event(event)
+    return await run_cpu(encode_event, event, size=approx_size(event.get("data")))
+
+
+def frame_bytes(event: dict[str, str]) -> bytes:
+    """One wire-ready SSE frame. JSON text never contains raw newlines, so no splitting."""
+    return f"event: {event['event']}{_SEP}data: {event['data']}{_SEP}{_SEP}".encode()
+
+
+def _json_dumps(obj: Any) -> str:
+    return json.dumps(obj, default=_default, ensure_ascii=False)
+
+
+def _orjson_dumps(obj: Any) -> str:
+    try:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    except TypeError:  # orjson 범위를 벗어나는 값(64bit 초과 정수 등)은 표준 json 으로
+        return _json_dumps(obj)
+
+
+# 인코더는 import 시점에 한 번 고릅니다.
+dumps: Callable[[Any], str] = _orjson_dumps if _HAS_ORJSON else _json_dumps
+
+
+def _encode_stream(payload: dict[str, Any]) -> str:
+    chunk = payload.get("chunk")
+    if isinstance(chunk, BaseMessage):
+        return dumps({"chunk": _message(chunk)})
+    return dumps(payload)
+
+
+def _message(m: BaseMessage) -> dict[str, Any]:
+    out: dict[str, Any] = {"type": m.type, "content": m.content, "id": m.id}
+    # 비어 있는 필드는 생략해 토큰 이벤트를 작게 유지
+    for key in (
+        "name",
+        "tool_calls",
+        "tool_call_chunks",
+        "tool_call_id",
+        "usage_metadata",
+        "response_metadata",
+    ):
+        value = getattr(m, key, None)
+        if value:
+            out[key] = value
+    return out
+
+
+def _default(obj: Any) -> Any:
+    # 한 단계만 풀어 주면 나머지는 인코더가 다시 _default 를 호출합니다.
+    if isinstance(obj, BaseMessage):
+        return _message(obj)
+    if isinstance(obj, BaseModel):
+        return {k: getattr(obj, k) for k in type(obj).model_fields}
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+_ENCODERS: dict[str, Callable[[Any], str]] = {
+    "on_chat_model_stream": _encode_stream,
+    "on_llm_stream": _encode_stream,
+}
+
+
+# -------------- Token coalescing --------------
+async def coalesce_tokens(
+    events: AsyncIterator[dict[str, Any]], window: float
+) -> AsyncIterator[dict[str, Any]]:
+    """Merge consecutive `on_chat_model_stream` events of the same run.
+
+    A merged event is emitted `window` seconds after its first chunk, or earlier when
+    another kind of event (or another run's chunk) arrives.
+    """
+    pending: list[dict[str, Any]] = []
+    deadline = 0.0
+    loop = asyncio.get_running_loop()
+
+    def _timeout() -> Optional[float]:
+        return max(0.0, deadline - loop.time()) if pending else None
+
+    async for ev in _paced(events, _timeout):
+        if ev is None:
+            yield _merge(pending)
+            pending = []
+            continue
+        if pending and not _same_run(pending[0], ev):
+            yield _merge(pending)
+            pending = []
+        if _is_chunk(ev):
+            if not pending:
+                deadline = loop.time() + window
+            pending.append(ev)
+        else:
+            yield ev
+    if pending:
+        yield _merge(pending)
+
+
+def _is_chunk(ev: dict[str, Any]) -> bool:
+    return ev.get("event") == "on_chat_model_stream" and isinstance(
+        (ev.get("data") or {}).get("chunk"), AIMessageChunk
+    )
+
+
+def _same_run(a: dict[str, Any], b: dict[str, Any]) -> bool:
+    return _is_chunk(b) and a.get("run_id") == b.get("run_id")
+
+
+def _merge(pending: list[dict[str, Any]]) -> dict[str, Any]:
+    first = pending[0]
+    if len(pending) == 1:
+        return first
+    chunks = [ev["data"]["chunk"] for ev in pending]
+    return {**first, "data": {**first["data"], "chunk": add_ai_message_chunks(*chunks)}}
+
+
+async def _paced(
+    source: AsyncIterator[Any], timeout: Callable[[], Optional[float]]
+) -> AsyncIterator[Any]:
+    """Items of `source`, plus None whenever `timeout()` seconds pass without one."""
+    it = aiter(source)
+    nxt: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if nxt is None:
+                nxt = asyncio.ensure_future(anext(it))
+            wait = timeout()
+            if wait is not None:
+                done, _ = await asyncio.wait({nxt}, timeout=wait)
+                if not done:
+                    yield None
+                    continue
+            try:
+                item = await nxt
+            except StopAsyncIteration:
+                nxt = None
+                return
+            nxt = None
+            yield item
+    finally:
+        if nxt is not None:
+            nxt.cancel()
+
+
+# -------------- Responses --------------
+def choose_encoding(accept_encoding: str, allowed: tuple[str, ...] = COMPRESSION) -> Optional[str]:
+    """First encoding in `allowed` the client accepts (q > 0), or None for identity."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token] = q
+    for encoding in allowed:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0 and _codec(encoding):
+            return encoding
+    return None
+
+
+def sse_response(request: Request, events: AsyncIterator[dict[str, str]]) -> Response:
+    """SSE response of pre-encoded frames, compressed if allowed and accepted."""
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    frames = (frame_bytes(ev) async for ev in events)
+    if encoding is None:
+        return EventSourceResponse(frames)
+    return StreamingResponse(
+        _compressed(frames, encoding),
+        media_type="text/event-stream",
+        headers={
+            "Content-Encoding": encoding,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+async def _compressed(frames: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    # 프레임마다 flush 해야 클라이언트가 이벤트를 즉시 받습니다.
+    codec = _codec(encoding)
+    if codec is None:  # choose_encoding 은 사용할 수 있는 인코딩만 고름
+        raise ValueError(f"unsupported content encoding: {encoding}")
+    compress, finish = codec()
+    async for frame in _paced(frames, lambda: PING_INTERVAL):
+        yield compress(frame if frame is not None else _PING)
+    yield finish()
+
+
+def _codec(
+    encoding: str,
+) -> Optional[Callable[[], tuple[Callable[[bytes], bytes], Callable[[], bytes]]]]:
+    if encoding == "gzip":
+
+        def _gzip():
+            z = zlib.compressobj(6, zlib.DEFLATED, 31)
+            return (lambda b: z.compress(b) + z.flush(zlib.Z_SYNC_FLUSH)), z.flush
+
+        return _gzip
+    if encoding == "br":
+        try:
+            import brotli
+        except ImportError:
+            return None
+
+        def _br():
+            c = brotli.Compressor()
+            return (lambda b: c.process(b) + c.flush()), c.finish
+
+        return _br
+    return None
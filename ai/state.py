@@ -1,12 +1,35 @@
 from pydantic import BaseModel, Field
-from typing import Annotated, List, Optional
+from typing import Annotated, Any, List, Optional, Sequence
 from langchain_core.messages import AnyMessage
+from langgraph.channels.delta import DeltaChannel
 from langgraph.graph import add_messages
+from langgraph.graph.message import Messages
 
 from ai.news.tools.rss_feed import NewsItem
+from ai.sessions import CHECKPOINT_DELTA, CHECKPOINT_SNAPSHOT_EVERY
+
+
+def _add_message_batches(messages: Messages, batches: Sequence[Messages]) -> Messages:
+    # DeltaChannel 은 한 번에 여러 write 를 넘기므로 add_messages 를 차례로 적용
+    for batch in batches:
+        messages = add_messages(messages, batch)
+    return messages
+
+
+def messages_channel(
+    delta: bool = CHECKPOINT_DELTA, snapshot_every: int = CHECKPOINT_SNAPSHOT_EVERY
+) -> Any:
+    """Reducer for `messages`: `add_messages`, or a `DeltaChannel` over it in delta mode.
+
+    Delta mode checkpoints only each step's new messages and rebuilds the list from
+    ancestor writes on read, with a full snapshot every `snapshot_every` updates.
+    """
+    if delta:
+        return DeltaChannel(_add_message_batches, snapshot_frequency=snapshot_every)
+    return add_messages
 
 
 class AgentState(BaseModel):
-    messages: Annotated[List[AnyMessage], add_messages] = Field(default_factory=list)
+    messages: Annotated[List[AnyMessage], messages_channel()] = Field(default_factory=list)
     news: Optional[List[NewsItem]] = Field(default=None)
     route: Optional[str] = Field(default=None)
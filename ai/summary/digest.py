@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from ai.news.tools.rss_feed import NewsItem, RssFeedCollector
+from ai.scheduler import ModelCallPreempted, background
+
+_log = logging.getLogger(__name__)
+
+# 1이면 기본 형식 요약을 (피드, 항목 해시)별로 저장해 재사용하고, 인기 피드는 백그라운드에서 미리 생성
+NEWS_DIGEST = os.getenv("NEWS_DIGEST", "0") == "1"
+# 백그라운드로 유지할 피드(source/feed key, 쉼표 구분)
+NEWS_DIGEST_FEEDS = tuple(
+    f.strip()
+    for f in os.getenv("NEWS_DIGEST_FEEDS", "america/HomePage,korea/AllNews").split(",")
+    if f.strip()
+)
+# 피드 확인 주기(초)와 저장할 요약 수
+NEWS_DIGEST_INTERVAL = float(os.getenv("NEWS_DIGEST_INTERVAL", "300"))
+NEWS_DIGEST_MAX = int(os.getenv("NEWS_DIGEST_MAX", "256"))
+
+# 길이/형식/초점/언어를 지정한 요청은 저장된 기본 요약 대신 실시간으로 요약합니다.
+_INSTRUCTION = re.compile(
+    r"\d+\s*(?:문장|줄|개|단어|불릿|자|sentences?|lines?|bullets?|words?|points?)"
+    r"|한\s*줄|한\s*문장|짧게|간단히|간략|자세히|상세|길게|표로|불릿|목록|형식|포맷|톤|말투|반말|존댓말"
+    r"|영어로|영문|일본어|중국어|초점|위주|중심으로|관점|만\s*(?:골라|추려|알려)|제외|빼고"
+    r"|\b(?:english|brief|short|detailed|table|bullets?|focus|tone|format)\b",
+    re.IGNORECASE,
+)
+
+
+def digest_input(items: Iterable[NewsItem]) -> str:
+    """The summary model's input for a feed's items (also what the digest key hashes)."""
+    return "\n".join(str(item) for item in items)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def has_instructions(request: str) -> bool:
+    """True when the user asked for a specific length/format/focus/language."""
+    return _INSTRUCTION.search(request) is not None
+
+
+def feed_of(items: list[NewsItem]) -> Optional[str]:
+    """The single feed all items came from, or None for mixed/empty input."""
+    sources = {item.source_url for item in items}
+    return sources.pop() if len(sources) == 1 else None
+
+
+@dataclass(slots=True)
+class Digest:
+    feed: str
+    content_hash: str
+    text: str
+    created_at: float
+
+
+class DigestStore:
+    """Default-format summaries keyed by (feed URL, hash of the summarized items), LRU-bounded.
+
+    Also remembers when each feed was last asked for, so the refresher keeps popular
+    feeds current.
+    """
+
+    def __init__(
+        self, max_entries: int = NEWS_DIGEST_MAX, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._max = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, str], Digest] = OrderedDict()
+        self._requested: dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, feed: str, content_hash: str) -> Optional[Digest]:
+        self._requested[feed] = self._clock()
+        digest = self._entries.get((feed, content_hash))
+        if digest is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end((feed, content_hash))
+        return digest
+
+    def has(self, feed: str, content_hash: str) -> bool:
+        return (feed, content_hash) in self._entries
+
+    def put(self, feed: str, content_hash: str, text: str) -> Digest:
+        digest = self._entries[(feed, content_hash)] = Digest(
+            feed, content_hash, text, self._clock()
+        )
+        self._entries.move_to_end((feed, content_hash))
+        while len(self._entries) > self._max:
+            self._entries.popitem(last=False)
+        return digest
+
+    def requested_since(self, since: float) -> list[str]:
+        for feed, at in list(self._requested.items()):
+            if at < since:
+                del self._requested[feed]
+        return list(self._requested)
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class DigestRefresher:
+    """Background job: re-fetches watched feeds and summarizes only item sets it has not seen.
+
+    Watched feeds are `feeds` plus any feed requested within `watch_for` seconds. Model
+    calls run at background priority; a pass stops early when interactive turns preempt it.
+    """
+
+    def __init__(
+        self,
+        store: DigestStore,
+        summarize: Callable[[str], Awaitable[str]],
+        *,
+        feeds: Iterable[str] = (),
+        fetch: Optional[Callable[[str], Awaitable[list[NewsItem]]]] = None,
+        interval: float = NEWS_DIGEST_INTERVAL,
+        watch_for: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._store = store
+        self._summarize = summarize
+        self._feeds = list(feeds)
+        self._fetch = fetch or (lambda url: RssFeedCollector([url]).fetch_all())
+        self._interval = interval
+        self._watch_for = watch_for
+        self._clock = clock
+        self.generated = 0
+
+    def watched(self) -> list[str]:
+        recent = self._store.requested_since(self._clock() - self._watch_for)
+        return list(dict.fromkeys([*self._feeds, *recent]))
+
+    async def refresh(self, feed: str) -> bool:
+        """Summarize `feed`'s current items unless that item set already has a digest."""
+        items = await self._fetch(feed)
+        if not items:
+            return False
+        text = digest_input(items)
+        key = content_hash(text)
+        if self._store.has(feed, key):
+            return False
+        with background():
+            summary = await self._summarize(text)
+        self._store.put(feed, key, summary)
+        self.generated += 1
+        return True
+
+    async def refresh_all(self) -> int:
+        changed = 0
+        for feed in self.watched():
+            try:
+                changed += await self.refresh(feed)
+            except ModelCallPreempted:
+                _log.info("digest refresh deferred: model calls busy with interactive turns")
+                break
+            except Exception as e:
+                _log.warning("digest refresh failed for %s: %s", feed, e)
+        return changed
+
+    async def run(self) -> None:
+        while True:
+            changed = await self.refresh_all()
+            if changed:
+                _log.info("regenerated %d feed digest(s)", changed)
+            await asyncio.sleep(self._interval)
+
+
+class DigestReplayModel(BaseChatModel):
+    """Streams a stored digest word by word, so clients get the usual token events."""
+
+    text: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "digest-replay"
+
+    def _generate(
+        self, messages: list[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any
+    ) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(self.text))])
+
+    async def _astream(
+        self, messages: list[BaseMessage], stop: Any = None, run_manager: Any = None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        for piece in re.findall(r"\s*\S+\s*", self.text) or [self.text]:
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+
+digest_store = DigestStore()
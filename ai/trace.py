@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from langchain_core.runnables.config import var_child_runnable_config
+
+# 요청별 디버그 트레이스 허용 여부. 꺼져 있으면 헤더/쿼리 플래그를 무시합니다.
+TRACE_ENABLED = os.getenv("TRACE", "0") == "1"
+# sse: 마지막 `trace` 이벤트로 전송, file: TRACE_DIR 에 Chrome trace JSON 저장, both
+TRACE_OUTPUT = os.getenv("TRACE_OUTPUT", "sse").lower()
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+PROFILE_INTERVAL = float(os.getenv("TRACE_PROFILE_INTERVAL_MS", "5")) / 1000
+
+TRACE_HEADER = "x-debug-trace"
+_PROFILE_FLAG = "profile"
+_ON_FLAGS = {"1", "true", "on", "spans", _PROFILE_FLAG}
+
+
+@dataclass(slots=True)
+class Span:
+    id: str
+    name: str
+    cat: str
+    start: float
+    parent: Optional[str] = None
+    end: Optional[float] = None
+    args: dict[str, Any] = field(default_factory=dict)
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every `interval` seconds from a helper thread.
+
+    The event loop thread is shared, so samples include other requests running meanwhile.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, max_depth: int = 64) -> None:
+        self.interval = interval
+        self._max_depth = max_depth
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.samples: list[tuple[float, tuple[str, ...]]] = []
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="trace-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack: list[str] = []
+            while frame is not None and len(stack) < self._max_depth:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.samples.append((time.perf_counter(), tuple(reversed(stack))))
+
+    def top(self, limit: int = 15) -> list[dict[str, Any]]:
+        self_counts: Counter[str] = Counter()
+        total_counts: Counter[str] = Counter()
+        for _, stack in self.samples:
+            self_counts[stack[-1]] += 1
+            total_counts.update(set(stack))
+        return [
+            {"frame": frame, "self": self_counts[frame], "total": total}
+            for frame, total in sorted(
+                total_counts.items(), key=lambda kv: (self_counts[kv[0]], kv[1]), reverse=True
+            )[:limit]
+        ]
+
+
+class Trace:
+    """Span tree of one request: graph nodes, model and tool calls (from astream_events)
+    plus explicit `span()` blocks such as RSS fetch/parse, optionally with CPU samples."""
+
+    def __init__(self, *, profile: bool = False, clock: Callable[[], float] = time.perf_counter):
+        self.id = uuid.uuid4().hex
+        self._clock = clock
+        self.started = clock()
+        self.ended: Optional[float] = None
+        self.spans: dict[str, Span] = {}
+        self.profiler = SamplingProfiler() if profile else None
+
+    def start(self) -> None:
+        """Start CPU sampling, if requested. Call it where `finish()` is sure to follow."""
+        if self.profiler is not None and self.ended is None:
+            self.profiler.start()
+
+    def start_span(
+        self,
+        name: str,
+        cat: str,
+        *,
+        parent: Optional[str] = None,
+        span_id: Optional[str] = None,
+        **args: Any,
+    ) -> Span:
+        span = Span(span_id or uuid.uuid4().hex, name, cat, self._clock(), parent, args=args)
+        self.spans[span.id] = span
+        return span
+
+    def end_span(self, span_id: str, **args: Any) -> None:
+        span = self.spans.get(span_id)
+        if span is not None and span.end is None:
+            span.end = self._clock()
+            span.args.update(args)
+
+    def observe(self, event: dict[str, Any]) -> None:
+        """Turn astream_events start/end pairs into spans keyed by run_id."""
+        kind = event.get("event", "")
+        run_id = str(event.get("run_id", ""))
+        if not kind.startswith("on_") or not run_id:
+            return
+        phase = kind.rsplit("_", 1)[-1]
+        if phase == "start":
+            parents = event.get("parent_ids") or []
+            metadata = event.get("metadata") or {}
+            args = {"node": metadata["langgraph_node"]} if "langgraph_node" in metadata else {}
+            self.start_span(
+                event.get("name") or kind,
+                kind[3:-6],  # on_chain_start → chain
+                parent=str(parents[-1]) if parents else None,
+                span_id=run_id,
+                **args,
+            )
+        elif phase in ("end", "error"):
+            self.end_span(run_id, **({"error": True} if phase == "error" else {}))
+
+    def finish(self) -> None:
+        if self.ended is not None:
+            return
+        self.ended = self._clock()
+        if self.profiler is not None:
+            self.profiler.stop()
+        for span in self.spans.values():
+            if span.end is None:
+                span.end = self.ended
+
+    # -------------- Output --------------
+    def tree(self) -> list[dict[str, Any]]:
+        nodes: dict[str, dict[str, Any]] = {
+            sid: {
+                "name": s.name,
+                "cat": s.cat,
+                "start_ms": round((s.start - self.started) * 1000, 3),
+                "duration_ms": round(((s.end or s.start) - s.start) * 1000, 3),
+                "args": s.args,
+                "children": [],
+            }
+            for sid, s in self.spans.items()
+        }
+        roots: list[dict[str, Any]] = []
+        for sid, s in sorted(self.spans.items(), key=lambda kv: kv[1].start):
+            parent = nodes.get(s.parent) if s.parent else None
+            (parent["children"] if parent is not None else roots).append(nodes[sid])
+        return roots
+
+    def summary(self) -> dict[str, Any]:
+        out: dict[str, Any] = {
+            "trace_id": self.id,
+            "duration_ms": round(((self.ended or self._clock()) - self.started) * 1000, 3),
+            "spans": self.tree(),
+        }
+        if self.profiler is not None:
+            out["profile"] = {
+                "interval_ms": self.profiler.interval * 1000,
+                "samples": len(self.profiler.samples),
+                "top": self.profiler.top(),
+            }
+        return out
+
+    def chrome(self) -> dict[str, Any]:
+        """Chrome trace event format (chrome://tracing, Perfetto)."""
+        events: list[dict[str, Any]] = []
+        for span, lane in _lanes(sorted(self.spans.values(), key=lambda s: s.start)):
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.cat,
+                    "ph": "X",
+                    "ts": (span.start - self.started) * 1e6,
+                    "dur": ((span.end or span.start) - span.start) * 1e6,
+                    "pid": 1,
+                    "tid": lane + 1,
+                    "args": span.args,
+                }
+            )
+        out: dict[str, Any] = {"traceEvents": events, "displayTimeUnit": "ms"}
+        if self.profiler is not None:
+            frames: dict[tuple[str, ...], int] = {}
+            stack_frames: dict[str, dict[str, Any]] = {}
+            samples = []
+            for ts, stack in self.profiler.samples:
+                parent = None
+                for depth in range(1, len(stack) + 1):
+                    key = stack[:depth]
+                    if key not in frames:
+                        frames[key] = len(frames)
+                        entry: dict[str, Any] = {"name": stack[depth - 1], "category": "python"}
+                        if parent is not None:
+                            entry["parent"] = str(parent)
+                        stack_frames[str(frames[key])] = entry
+                    parent = frames[key]
+                samples.append(
+                    {
+                        "cpu": 0,
+                        "tid": 0,
+                        "ts": (ts - self.started) * 1e6,
+                        "sf": str(parent),
+                        "weight": 1,
+                    }
+                )
+            out["stackFrames"] = stack_frames
+            out["samples"] = samples
+        return out
+
+    def write_chrome(self, directory: str = TRACE_DIR) -> str:
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        file = path / f"trace-{self.id}.json"
+        file.write_text(json.dumps(self.chrome(), default=str))
+        return str(file)
+
+
+def _lanes(spans: list[Span]) -> Iterator[tuple[Span, int]]:
+    """Assign each span a track so spans sharing a track nest properly (Chrome needs this)."""
+    lanes: list[list[Span]] = []
+    for span in spans:
+        end = span.end or span.start
+        for i, stack in enumerate(lanes):
+            while stack and (stack[-1].end or stack[-1].start) <= span.start:
+                stack.pop()
+            if not stack or (stack[-1].end or stack[-1].start) >= end:
+                stack.append(span)
+                yield span, i
+                break
+        else:
+            lanes.append([span])
+            yield span, len(lanes) - 1
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(name: str, cat: str = "app", **args: Any) -> Iterator[None]:
+    """Record a span in the current request's trace; a no-op when tracing is off."""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    s = trace.start_span(name, cat, parent=_current_span.get() or _runnable_parent(), **args)
+    token = _current_span.set(s.id)
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+        trace.end_span(s.id)
+
+
+def _runnable_parent() -> Optional[str]:
+    # 그래프 노드 안이면 해당 노드 run 아래에 붙입니다(astream_events run_id 와 동일).
+    config = var_child_runnable_config.get() or {}
+    run_id = getattr(config.get("callbacks"), "parent_run_id", None)
+    return str(run_id) if run_id else None
+
+
+def trace_from_request(request: Any) -> Optional[Trace]:
+    """`X-Debug-Trace: 1|profile` header or `?trace=1|profile`, honoured only with `TRACE=1`."""
+    if not TRACE_ENABLED:
+        return None
+    flag = (request.headers.get(TRACE_HEADER) or request.query_params.get("trace") or "").lower()
+    if flag not in _ON_FLAGS:
+        return None
+    return Trace(profile=flag == _PROFILE_FLAG)
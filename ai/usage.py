@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables.config import var_child_runnable_config
+
+from ai.sessions import SessionStore, session_store
+
+# 0 이면 해당 예산을 끕니다.
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "0"))
+SESSION_TOKENS_PER_MINUTE = int(os.getenv("SESSION_TOKENS_PER_MINUTE", "0"))
+
+_FIELDS = ("input_tokens", "output_tokens", "total_tokens")
+# 그래프 노드 밖(투기 실행 등)에서 호출된 모델 사용량
+UNATTRIBUTED = "unattributed"
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """A session hit its lifetime or per-minute token budget."""
+
+    def __init__(self, session_id: str, kind: str, used: int, limit: int) -> None:
+        super().__init__(f"session {session_id} exceeded {kind} token budget ({used}/{limit})")
+        self.session_id, self.kind, self.used, self.limit = session_id, kind, used, limit
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"budget": self.kind, "used": self.used, "limit": self.limit}
+
+
+def _empty() -> dict[str, int]:
+    return {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "calls": 0}
+
+
+def _add(into: dict[str, int], usage: dict[str, Any]) -> None:
+    for key in _FIELDS:
+        into[key] += int(usage.get(key) or 0)
+    into["calls"] += 1
+
+
+@dataclass(slots=True)
+class TurnUsage:
+    session_id: str
+    total: dict[str, int] = field(default_factory=_empty)
+    by_node: dict[str, dict[str, int]] = field(default_factory=dict)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"total": self.total, "by_node": self.by_node}
+
+
+current_turn: ContextVar[Optional[TurnUsage]] = ContextVar("current_turn", default=None)
+
+
+class UsageLedger:
+    """Token usage per session and node, kept in the session store's sidecar.
+
+    `record_messages()` is called with the messages a model call produced; usage is charged
+    to the session of `current_turn`, under the graph node it ran in.
+    Budgets are checked by `check()` before a turn and before every node (`guard()`).
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        *,
+        session_budget: int = 0,
+        per_minute_budget: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._store = store
+        self._session_budget = session_budget
+        self._per_minute_budget = per_minute_budget
+        self._clock = clock
+        # 분당 예산용 (시각, 토큰) 기록, 마지막 기록 순. 세션 데이터가 아니므로 내보내지 않습니다.
+        self._recent: OrderedDict[str, deque[tuple[float, int]]] = OrderedDict()
+
+    def check(self, session_id: str) -> None:
+        if self._session_budget:
+            used = self._totals(session_id)["total_tokens"]
+            if used >= self._session_budget:
+                raise TokenBudgetExceeded(session_id, "session", used, self._session_budget)
+        if self._per_minute_budget:
+            used = self._last_minute(session_id)
+            if used >= self._per_minute_budget:
+                raise TokenBudgetExceeded(session_id, "per_minute", used, self._per_minute_budget)
+
+    def guard(self, run: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+        """Wrap a graph node so it refuses to run once the turn's session is over budget."""
+
+        async def _run(state: Any) -> Any:
+            turn = current_turn.get()
+            if turn is not None:
+                self.check(turn.session_id)
+            return await run(state)
+
+        return _run
+
+    def record_messages(self, messages: Iterable[Any]) -> None:
+        turn = current_turn.get()
+        if turn is None:
+            return
+        node = _current_node()
+        for message in messages:
+            usage = (
+                getattr(message, "usage_metadata", None) if isinstance(message, AIMessage) else None
+            )
+            if usage:
+                self.record(turn, node, usage)
+
+    def record(self, turn: TurnUsage, node: str, usage: dict[str, Any]) -> None:
+        _add(turn.total, usage)
+        _add(turn.by_node.setdefault(node, _empty()), usage)
+        entry = self._store.sidecar(turn.session_id).setdefault("usage", {})
+        _add(entry.setdefault(node, _empty()), usage)
+        if self._per_minute_budget:
+            now = self._clock()
+            recent = self._recent.setdefault(turn.session_id, deque())
+            recent.append((now, int(usage.get("total_tokens") or 0)))
+            self._recent.move_to_end(turn.session_id)
+            # 1분 넘게 기록이 없는 세션 정리
+            while self._recent:
+                oldest = next(iter(self._recent.values()))
+                if oldest[-1][0] >= now - 60.0:
+                    break
+                self._recent.popitem(last=False)
+
+    def usage(self, session_id: str) -> dict[str, Any]:
+        by_node = (self._store.peek_sidecar(session_id) or {}).get("usage", {})
+        return {
+            "session_id": session_id,
+            "total": self._totals(session_id),
+            "by_node": by_node,
+            "last_minute_tokens": self._last_minute(session_id),
+            "budget": {
+                "session": self._session_budget or None,
+                "per_minute": self._per_minute_budget or None,
+            },
+        }
+
+    def _totals(self, session_id: str) -> dict[str, int]:
+        total = _empty()
+        for counts in (self._store.peek_sidecar(session_id) or {}).get("usage", {}).values():
+            for key, value in counts.items():
+                total[key] += value
+        return total
+
+    def _last_minute(self, session_id: str) -> int:
+        recent = self._recent.get(session_id)
+        if not recent:
+            return 0
+        cutoff = self._clock() - 60.0
+        while recent and recent[0][0] < cutoff:
+            recent.popleft()
+        if not recent:
+            del self._recent[session_id]
+            return 0
+        return sum(tokens for _, tokens in recent)
+
+
+def _current_node() -> str:
+    config = var_child_runnable_config.get() or {}
+    return (config.get("metadata") or {}).get("langgraph_node") or UNATTRIBUTED
+
+
+def new_messages(result: dict[str, Any], input: Any) -> list[Any]:
+    """Messages in an agent result that were not part of its input."""
+    given = input.get("messages", []) if isinstance(input, dict) else []
+    if not isinstance(given, (list, tuple)):
+        given = [given]
+    # 입력 메시지는 reducer 가 id 를 채워 넣으므로 호출 후에 비교합니다.
+    seen = {getattr(m, "id", None) for m in given} - {None}
+    return [m for m in result.get("messages", []) if getattr(m, "id", None) not in seen]
+
+
+usage_ledger = UsageLedger(
+    session_store,
+    session_budget=SESSION_TOKEN_BUDGET,
+    per_minute_budget=SESSION_TOKENS_PER_MINUTE,
+)
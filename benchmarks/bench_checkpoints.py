@@ -0,0 +1,135 @@
+"""Checkpoint memory and write latency vs session length: full blobs vs delta channels.
+
+    python benchmarks/bench_checkpoints.py [--turns 10 50 100 200] [--snapshot-every 20]
+
+Runs a two-node turn (router stand-in, then a ~600 character reply) against a
+`SessionStore` per mode, with `messages` as a plain `add_messages` channel (full) or a
+`DeltaChannel` (delta, `CHECKPOINT_DELTA=1`). Reports bytes held by the store, traced
+memory, checkpoint write (`put`) latency over the last 10 turns, and the time to read the
+latest state and the whole history.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Annotated, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage  # noqa: E402
+from langgraph.graph import END, StateGraph  # noqa: E402
+from pydantic import Field  # noqa: E402
+
+from ai.sessions import SessionStore  # noqa: E402
+from ai.state import AgentState, messages_channel  # noqa: E402
+
+_REPLY = "요약 문장과 링크가 이어지는 평범한 답변입니다. " * 20
+
+
+class _TimedStore(SessionStore):
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.put_times: list[float] = []
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        started = time.perf_counter()
+        try:
+            return super().put(config, checkpoint, metadata, new_versions)
+        finally:
+            self.put_times.append(time.perf_counter() - started)
+
+
+def _schema(delta: bool, snapshot_every: int) -> type[AgentState]:
+    # 이 파일은 `from __future__ import annotations` 없이 둡니다(지역 변수로 채널 지정).
+    class State(AgentState):
+        messages: Annotated[List[AnyMessage], messages_channel(delta, snapshot_every)] = Field(
+            default_factory=list
+        )
+
+    return State
+
+
+def _app(store: SessionStore, schema: type[AgentState]):
+    async def route(state):
+        return {"route": "chat_agent"}
+
+    async def reply(state):
+        return {"messages": [AIMessage(_REPLY)]}
+
+    g = StateGraph(schema)
+    g.add_node("router", route)
+    g.add_node("chat", reply)
+    g.set_entry_point("router")
+    g.add_edge("router", "chat")
+    g.add_edge("chat", END)
+    return g.compile(checkpointer=store)
+
+
+def _stored_bytes(store: SessionStore) -> int:
+    stats = store.stats()
+    checkpoints = sum(
+        len(saved[1]) + len(meta[1])
+        for ns in store.storage.values()
+        for cps in ns.values()
+        for saved, meta, _ in cps.values()
+    )
+    return stats["blob_bytes"] + stats["write_bytes"] + checkpoints
+
+
+async def _run(turns: int, delta: bool, snapshot_every: int) -> dict[str, float]:
+    cfg = {"configurable": {"thread_id": "bench"}}
+    tracemalloc.start()
+    store = _TimedStore(delta_channels=("messages",) if delta else ())
+    app = _app(store, _schema(delta, snapshot_every))
+    tail_from = 0
+    for i in range(turns):
+        if i == turns - 10:
+            tail_from = len(store.put_times)
+        await app.ainvoke({"messages": [HumanMessage(f"질문 {i}")]}, cfg)
+    traced = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    state = await app.aget_state(cfg)
+    read = time.perf_counter() - started
+    assert len(state.values["messages"]) == turns * 2
+    started = time.perf_counter()
+    _ = [s async for s in app.aget_state_history(cfg)]
+    history_time = time.perf_counter() - started
+    tail = sorted(store.put_times[tail_from:])
+    return {
+        "stored": _stored_bytes(store),
+        "traced": traced,
+        "put_ms": statistics.mean(tail) * 1000,
+        "put_p99_ms": tail[int(len(tail) * 0.99)] * 1000,
+        "read_ms": read * 1000,
+        "history_ms": history_time * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--snapshot-every", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'turns':>5} {'mode':>5} {'stored':>10} {'traced':>10} {'put':>8} {'put p99':>8} "
+        f"{'read':>8} {'history':>10}"
+    )
+    for turns in args.turns:
+        for mode in ("full", "delta"):
+            r = asyncio.run(_run(max(turns, 10), mode == "delta", args.snapshot_every))
+            print(
+                f"{turns:>5} {mode:>5} {r['stored'] / 1e6:>8.2f}MB {r['traced'] / 1e6:>8.2f}MB "
+                f"{r['put_ms']:>6.3f}ms {r['put_p99_ms']:>6.3f}ms {r['read_ms']:>6.2f}ms "
+                f"{r['history_ms']:>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Replay a recorded cassette through the full `ai_app` graph, offline.
+
+    # 1) record real traffic (Gemini, Google Search, ip-api, RSS) while using the server
+    CASSETTE_MODE=record CASSETTE_PATH=cassettes/news.jsonl.gz uvicorn main:app
+    # 2) replay it at production timing, or scaled (0 = no upstream latency)
+    python benchmarks/bench_replay.py cassettes/news.jsonl.gz [--scale 1.0] [--repeat 3]
+
+Recorded user turns are resent in order (sessions run concurrently, turns within a
+session in sequence). Reports time to first token and turn latency per turn, and fails
+when a request has no recorded response, which means the graph's behaviour changed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def _session(turns: list[dict], results: list[tuple[float, float]]) -> None:
+    from ai.agent import ai_model
+
+    for turn in turns:
+        started = time.perf_counter()
+        first: Optional[float] = None
+        async for ev in ai_model(turn["session_id"], turn["text"]):
+            if first is None and ev["event"] == "on_chat_model_stream":
+                first = time.perf_counter() - started
+        total = time.perf_counter() - started
+        results.append((first if first is not None else total, total))
+
+
+async def _replay(turns: list[dict]) -> list[tuple[float, float]]:
+    sessions: dict[str, list[dict]] = defaultdict(list)
+    for turn in turns:
+        sessions[turn["session_id"]].append(turn)
+    results: list[tuple[float, float]] = []
+    await asyncio.gather(*(_session(t, results) for t in sessions.values()))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("cassette")
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="multiplier for recorded latencies"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    # ai.* 모듈은 import 시 환경 변수를 읽으므로 먼저 설정합니다.
+    os.environ.update(
+        CASSETTE_MODE="replay", CASSETTE_PATH=args.cassette, CASSETTE_TIME_SCALE=str(args.scale)
+    )
+    from ai.cassette import cassette
+    from ai.sessions import session_store
+
+    if cassette is None or not cassette.turns:
+        sys.exit("cassette has no recorded turns (record through ai_model / the HTTP API)")
+    for run in range(args.repeat):
+        # 같은 세션 id 로 다시 보내므로 이전 반복의 대화 기록을 지웁니다.
+        for turn in cassette.turns:
+            session_store.delete_thread(turn["session_id"])
+        cassette.rewind()
+        started = time.perf_counter()
+        results = asyncio.run(_replay(cassette.turns))
+        wall = time.perf_counter() - started
+        ttft = sorted(r[0] * 1000 for r in results)
+        total = sorted(r[1] * 1000 for r in results)
+        print(
+            f"run {run + 1}: {len(results)} turns in {wall:.2f}s | "
+            f"TTFT p50 {statistics.median(ttft):.0f} ms max {ttft[-1]:.0f} ms | "
+            f"turn p50 {statistics.median(total):.0f} ms max {total[-1]:.0f} ms | "
+            f"unused interactions {cassette.remaining()}"
+        )
+
+
+if __name__ == "__main__":
+    main()
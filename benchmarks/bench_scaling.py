@@ -0,0 +1,134 @@
+"""Throughput vs. worker count behind the session-affinity proxy (`proxy.py`).
+
+    python benchmarks/bench_scaling.py --workers 1 2 4 --cpu-ms 20 --duration 10
+
+Workers run a synthetic app that burns `--cpu-ms` of CPU per request and streams a few
+SSE frames, standing in for graph execution + serialization without model calls. The
+proxy and the load generator each run in their own process; on a host with enough
+cores throughput should grow near-linearly with the worker count.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from proxy import spawn_workers, wait_ready  # noqa: E402
+
+_CPU_MS = float(os.getenv("BENCH_CPU_MS", "20"))
+
+
+async def _session(request):
+    from starlette.responses import StreamingResponse
+
+    async def _frames():
+        deadline = time.process_time() + _CPU_MS / 1000
+        while time.process_time() < deadline:
+            pass
+        for i in range(5):
+            yield f"event: on_chat_model_stream\ndata: token-{i}\n\n".encode()
+
+    return StreamingResponse(_frames(), media_type="text/event-stream")
+
+
+def _worker_app():
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+
+    async def health(_request):
+        return PlainTextResponse("ok")
+
+    return Starlette(
+        routes=[Route("/health", health), Route("/{session_id}", _session, methods=["POST"])]
+    )
+
+
+worker_app = _worker_app()
+
+
+async def _load(url: str, *, concurrency: int, duration: float, sessions: int) -> int:
+    sids = [str(uuid.uuid4()) for _ in range(sessions)]
+    done = 0
+    deadline = time.monotonic() + duration
+
+    async with httpx.AsyncClient(timeout=30.0) as client:
+
+        async def _user(i: int) -> None:
+            nonlocal done
+            n = i
+            while time.monotonic() < deadline:
+                r = await client.post(f"{url}/{sids[n % len(sids)]}", json={"message": "hi"})
+                r.raise_for_status()
+                done += 1
+                n += concurrency
+
+        await asyncio.gather(*(_user(i) for i in range(concurrency)))
+    return done
+
+
+def _run(workers: int, args) -> float:
+    env = {**os.environ, "PYTHONPATH": f"{ROOT / 'benchmarks'}{os.pathsep}{ROOT}"}
+    env["BENCH_CPU_MS"] = str(args.cpu_ms)
+    procs, urls = spawn_workers(
+        workers, base_port=args.base_port, app_path="bench_scaling:worker_app", env=env
+    )
+    proxy_proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "proxy:app",
+            "--port",
+            str(args.port),
+            "--log-level",
+            "warning",
+        ],
+        env={**env, "UPSTREAMS": ",".join(urls)},
+        cwd=ROOT,
+    )
+    proxy_url = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready([*urls, proxy_url])
+        done = asyncio.run(
+            _load(proxy_url, concurrency=args.concurrency, duration=args.duration, sessions=256)
+        )
+        return done / args.duration
+    finally:
+        for p in [*procs, proxy_proc]:
+            p.terminate()
+        for p in [*procs, proxy_proc]:
+            p.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--cpu-ms", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--base-port", type=int, default=8101)
+    args = parser.parse_args()
+
+    print(f"cpu cores={os.cpu_count()} cpu/request={args.cpu_ms}ms")
+    baseline = None
+    for n in args.workers:
+        rps = _run(n, args)
+        baseline = baseline or rps / n
+        print(f"workers={n:3d} throughput={rps:9.1f} req/s efficiency={rps / (baseline * n):6.1%}")
+
+
+if __name__ == "__main__":
+    main()
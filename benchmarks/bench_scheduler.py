@@ -0,0 +1,99 @@
+"""Interactive time to first token under background model load, with and without priority lanes.
+
+    python benchmarks/bench_scheduler.py [--upstream 8] [--background 16] [--turns 40]
+
+A simulated provider serves at most `--upstream` model calls at once (FIFO beyond that).
+Interactive turns arrive every 200 ms: a routing call (150 ms), then a generation whose
+first token comes after 250 ms (1 s total). `--background` workers issue 2 s summary
+calls in a loop, like digest prefetch or map-reduce jobs. `off` sends everything
+straight to the provider; `on` goes through `ModelScheduler(--upstream)`, where
+background work holds at most half the slots and is preempted (workers back off 0.5 s).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai.scheduler import ModelCallPreempted, ModelScheduler, Priority  # noqa: E402
+
+
+class _Provider:
+    def __init__(self, concurrency: int) -> None:
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def call(self, first_token: float, total: float, on_first=None) -> None:
+        async with self._slots:
+            await asyncio.sleep(first_token)
+            if on_first is not None:
+                on_first()
+            await asyncio.sleep(total - first_token)
+
+
+async def _run(scheduled: bool, upstream: int, workers: int, turns: int) -> tuple[list[float], int]:
+    provider = _Provider(upstream)
+    scheduler = ModelScheduler(upstream if scheduled else 0)
+    done_background = 0
+    stop = asyncio.Event()
+
+    async def _background(i: int) -> None:
+        nonlocal done_background
+        while not stop.is_set():
+            try:
+                async with scheduler.slot(Priority.BACKGROUND, f"bg-{i}"):
+                    await provider.call(2.0, 2.0)
+                done_background += 1
+            except ModelCallPreempted:
+                await asyncio.sleep(0.5)
+
+    async def _turn(i: int) -> float:
+        started = time.perf_counter()
+        first: list[float] = []
+        async with scheduler.slot(Priority.ROUTING, f"user-{i}"):
+            await provider.call(0.15, 0.15)
+        async with scheduler.slot(Priority.INTERACTIVE, f"user-{i}"):
+            await provider.call(0.25, 1.0, lambda: first.append(time.perf_counter() - started))
+        return first[0]
+
+    load = [asyncio.create_task(_background(i)) for i in range(workers)]
+    await asyncio.sleep(0.5)  # 백그라운드가 먼저 슬롯을 채운 상태에서 시작
+    tasks = []
+    for i in range(turns):
+        tasks.append(asyncio.create_task(_turn(i)))
+        await asyncio.sleep(0.2)
+    ttft = await asyncio.gather(*tasks)
+    stop.set()
+    for task in load:
+        task.cancel()
+    await asyncio.gather(*load, return_exceptions=True)
+    return list(ttft), done_background
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--upstream", type=int, default=8)
+    parser.add_argument("--background", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=40)
+    args = parser.parse_args()
+
+    baseline = statistics.median(asyncio.run(_run(True, args.upstream, 0, args.turns))[0])
+    print(f"idle TTFT p50 {baseline * 1000:.0f} ms")
+    for scheduled in (False, True):
+        ttft, done = asyncio.run(_run(scheduled, args.upstream, args.background, args.turns))
+        ttft.sort()
+        mode = "on " if scheduled else "off"
+        print(
+            f"scheduler {mode}: TTFT p50 {statistics.median(ttft) * 1000:.0f} ms "
+            f"p99 {ttft[int(len(ttft) * 0.99)] * 1000:.0f} ms max {ttft[-1] * 1000:.0f} ms | "
+            f"background calls done {done}"
+        )
+
+
+if __name__ == "__main__":
+    main()
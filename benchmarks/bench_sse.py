@@ -0,0 +1,112 @@
+"""SSE encoding microbenchmark: events/s on one core, legacy vs pre-encoded frames.
+
+    python benchmarks/bench_sse.py [--events 20000] [--window-tokens 4]
+
+- legacy: `json.dumps(data, default=str)` + sse-starlette `ServerSentEvent.encode()`
+- fast:   `ai.sse.encode_event` + `frame_bytes`
+- coalesced: fast path after merging every `--window-tokens` chunks into one event
+Also reports bytes on the wire with gzip (per-frame sync flush) against identity.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage  # noqa: E402
+from langchain_core.messages.ai import add_ai_message_chunks  # noqa: E402
+from sse_starlette.sse import ServerSentEvent  # noqa: E402
+
+from ai.sse import encode_event, frame_bytes  # noqa: E402
+from ai.state import AgentState  # noqa: E402
+
+
+def _workload(n: int) -> list[dict]:
+    """Mostly token chunks with an occasional chain end, like a chat turn."""
+    state = AgentState(
+        messages=[HumanMessage("미국 테크 뉴스 요약해줘"), AIMessage("요약입니다. " * 40)],
+        route="chat_agent",
+    )
+    events = []
+    for i in range(n):
+        if i % 200 == 199:
+            events.append({"event": "on_chain_end", "run_id": "c", "data": {"output": state}})
+        else:
+            chunk = AIMessageChunk(content=f"토큰{i % 7} ", id="run-1")
+            events.append(
+                {"event": "on_chat_model_stream", "run_id": "m", "data": {"chunk": chunk}}
+            )
+    return events
+
+
+def _legacy(ev: dict) -> bytes:
+    data = json.dumps(ev.get("data"), default=str, ensure_ascii=False)
+    return ServerSentEvent(data=data, event=ev["event"]).encode()
+
+
+def _fast(ev: dict) -> bytes:
+    return frame_bytes(encode_event(ev))
+
+
+def _coalesce(events: list[dict], size: int) -> list[dict]:
+    out: list[dict] = []
+    run: list[dict] = []
+    for ev in events + [{"event": "end"}]:
+        if ev["event"] == "on_chat_model_stream" and len(run) < size:
+            run.append(ev)
+            continue
+        if run:
+            chunk = add_ai_message_chunks(*(e["data"]["chunk"] for e in run))
+            out.append({**run[0], "data": {"chunk": chunk}})
+            run = []
+        if ev["event"] == "on_chat_model_stream":
+            run.append(ev)
+        elif ev["event"] != "end":
+            out.append(ev)
+    return out
+
+
+def _bench(name: str, fn, events: list[dict], source_events: int) -> list[bytes]:
+    t0 = time.perf_counter()
+    frames = [fn(ev) for ev in events]
+    secs = time.perf_counter() - t0
+    identity = sum(map(len, frames))
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    gz = sum(len(z.compress(f) + z.flush(zlib.Z_SYNC_FLUSH)) for f in frames)
+    print(
+        f"{name:10s} {source_events / secs:12,.0f} src-events/s  frames={len(frames):6d}  "
+        f"identity={identity / 1024:8.1f}KiB  gzip={gz / 1024:8.1f}KiB"
+    )
+    return frames
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--window-tokens", type=int, default=4)
+    args = parser.parse_args()
+
+    events = _workload(args.events)
+    _bench("legacy", _legacy, events, len(events))
+    _bench("fast", _fast, events, len(events))
+
+    t0 = time.perf_counter()
+    merged = _coalesce(events, args.window_tokens)
+    merge_secs = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    frames = [_fast(ev) for ev in merged]
+    secs = merge_secs + time.perf_counter() - t1
+    print(
+        f"{'coalesced':10s} {len(events) / secs:12,.0f} src-events/s  frames={len(frames):6d}  "
+        f"identity={sum(map(len, frames)) / 1024:8.1f}KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
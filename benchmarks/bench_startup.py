@@ -0,0 +1,64 @@
+"""Cold start benchmark: `import main` and first graph build, each in a fresh interpreter.
+
+    python benchmarks/bench_startup.py [--runs 5]
+
+Graph build needs no network; dummy credentials are injected if none are set.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from ai.graph import is_warm, warm_up
+cold = not is_warm()
+warm_up()
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "warm_up": t2 - t1, "cold_after_import": cold}))
+"""
+
+
+def _run_once() -> dict:
+    env = {**os.environ}
+    env.setdefault("GOOGLE_API_KEY", "bench")
+    env.setdefault("GOOGLE_CSE_ID", "bench")
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [_run_once() for _ in range(args.runs)]
+    for key in ("import", "warm_up"):
+        values = [r[key] * 1000 for r in runs]
+        print(
+            f"{key:8s} median={statistics.median(values):8.1f}ms "
+            f"min={min(values):8.1f}ms max={max(values):8.1f}ms"
+        )
+    print(f"cold after import: {all(r['cold_after_import'] for r in runs)}")
+
+
+if __name__ == "__main__":
+    main()
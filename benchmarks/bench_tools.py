@@ -0,0 +1,106 @@
+"""Multi-tool chat turn latency: sequential vs parallel tool execution, cold vs cached.
+
+    python benchmarks/bench_tools.py [--search-ms 400] [--ip-ms 150] [--turns 5]
+
+The model (a scripted fake, no network) asks for two web searches and one IP lookup in
+one step, then answers. Tools sleep for the given latencies. Each turn uses a fresh
+session, so `cached` shows cross-session reuse of search results (ip_info is per session).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from langchain.agents import create_agent  # noqa: E402
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage  # noqa: E402
+from langchain_core.tools import tool  # noqa: E402
+
+from ai.chat.tool_calls import ToolCallMiddleware, ToolPolicy  # noqa: E402
+
+
+class _ToolModel(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _tools(search_s: float, ip_s: float):
+    @tool("web_search")
+    async def search(query: str) -> str:
+        """Search."""
+        await asyncio.sleep(search_s)
+        return f"results for {query}"
+
+    @tool("ip_info")
+    async def ip_info(request_ip: str) -> str:
+        """IP lookup."""
+        await asyncio.sleep(ip_s)
+        return f"tz of {request_ip}"
+
+    return [search, ip_info]
+
+
+def _responses() -> list[BaseMessage]:
+    ask = AIMessage(
+        "",
+        tool_calls=[
+            {"name": "web_search", "args": {"query": "k8s hpa"}, "id": "c0"},
+            {"name": "web_search", "args": {"query": "keda scaler"}, "id": "c1"},
+            {"name": "ip_info", "args": {"request_ip": "8.8.8.8"}, "id": "c2"},
+        ],
+    )
+    return [ask, AIMessage("answer")]
+
+
+async def _turns(middleware: ToolCallMiddleware, tools, turns: int, warm: bool) -> list[float]:
+    if warm:
+        agent = create_agent(
+            model=_ToolModel(responses=_responses()), tools=tools, middleware=[middleware]
+        )
+        await agent.ainvoke(
+            {"messages": [HumanMessage("q")]}, config={"configurable": {"thread_id": "warm"}}
+        )
+    out = []
+    for i in range(turns):
+        agent = create_agent(
+            model=_ToolModel(responses=_responses()), tools=tools, middleware=[middleware]
+        )
+        started = time.perf_counter()
+        await agent.ainvoke(
+            {"messages": [HumanMessage("q")]}, config={"configurable": {"thread_id": f"s{i}"}}
+        )
+        out.append(time.perf_counter() - started)
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--search-ms", type=float, default=400)
+    parser.add_argument("--ip-ms", type=float, default=150)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    tools = _tools(args.search_ms / 1000, args.ip_ms / 1000)
+    no_cache = {"web_search": ToolPolicy(), "ip_info": ToolPolicy()}
+    cache = {"web_search": ToolPolicy(ttl=600, shared=True), "ip_info": ToolPolicy(ttl=30)}
+    cases = [
+        ("sequential", ToolCallMiddleware(no_cache, mode="sequential"), False),
+        ("parallel", ToolCallMiddleware(no_cache, mode="parallel"), False),
+        ("parallel+cache", ToolCallMiddleware(cache, mode="parallel"), True),
+    ]
+    print(f"2x web_search ({args.search_ms:.0f} ms) + ip_info ({args.ip_ms:.0f} ms) per turn")
+    print(f"{'mode':<16} {'median ms':>10} {'max ms':>8}")
+    for name, middleware, warm in cases:
+        times = asyncio.run(_turns(middleware, tools, args.turns, warm))
+        print(f"{name:<16} {statistics.median(times) * 1000:10.1f} {max(times) * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
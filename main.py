@@ -1,20 +1,108 @@
+import asyncio
+import hmac
+import json
 import logging
 import os
+from contextlib import asynccontextmanager
 from uuid import UUID
-from typing import Any
 
-from fastapi import FastAPI, Request, Path, Response
+from fastapi import (
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Request,
+    Path,
+    Query,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, ConfigDict
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
 
+from dotenv import load_dotenv
 from sse_starlette.sse import EventSourceResponse
-from ai.agent import ai_model, get_session_history
+
+# ai.* 모듈은 import 시점에 os.getenv 로 설정을 읽으므로 그 전에 .env 를 불러옵니다.
+load_dotenv()
+
+from ai.agent import ai_model, get_session_history  # noqa: E402
+from ai.cassette import cassette  # noqa: E402
+from ai.trace import TRACE_HEADER, trace_from_request  # noqa: E402
+from ai.usage import usage_ledger  # noqa: E402
+from ai.batch import SharedScope, current_scope, frame, run_batch, turn_events  # noqa: E402
+from ai.graph import is_warm, run_digest_refresher, warm_up  # noqa: E402
+from ai.history import iter_json_array, snapshot_to_item  # noqa: E402
+from ai.loop import approx_size, loop_monitor, run_cpu, shutdown_offload  # noqa: E402
+from ai.models import model_registry  # noqa: E402
+from ai.news.tools.feed_health import feed_health  # noqa: E402
+from ai.scheduler import model_scheduler  # noqa: E402
+from ai.sessions import BINARY, NDJSON, RecordReader, export_stream, run_maintenance, session_store  # noqa: E402
+from ai.sse import sse_response  # noqa: E402
+from ai.summary.digest import NEWS_DIGEST  # noqa: E402
+
+# 페이지 크기(limit 미지정 시). stream 모드는 limit 미지정 시 전체를 흘려보냅니다.
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
+# 배치 요청당 최대 항목 수 / WebSocket 연결 내 라우팅·피드 공유 유지 시간(초)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "64"))
+WS_SHARED_TTL = float(os.getenv("WS_SHARED_TTL", "30"))
+# WebSocket 연결당 동시에 진행할 수 있는 턴 수. 넘으면 다음 프레임을 읽지 않고 기다립니다.
+WS_MAX_INFLIGHT = int(os.getenv("WS_MAX_INFLIGHT", "8"))
+# 1이면 기동 직후 백그라운드에서 그래프/모델 클라이언트를 미리 생성합니다.
+PREWARM = os.getenv("PREWARM", "0") == "1"
+# /admin/* 엔드포인트 인증 토큰(X-Admin-Token). 비어 있으면 admin API 비활성화
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+_log = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.prewarm = None
+    if PREWARM:
+        app.state.prewarm = asyncio.create_task(asyncio.to_thread(warm_up))
+        app.state.prewarm.add_done_callback(_log_prewarm)
+    maintenance = asyncio.create_task(run_maintenance(session_store))
+    digests = asyncio.create_task(run_digest_refresher()) if NEWS_DIGEST else None
+    loop_monitor.install()
+    lag_monitor = asyncio.create_task(loop_monitor.run())
+    yield
+    maintenance.cancel()
+    if digests is not None:
+        digests.cancel()
+    lag_monitor.cancel()
+    loop_monitor.uninstall()
+    shutdown_offload()
+    if cassette is not None:
+        cassette.close()
+    if app.state.prewarm is not None and not app.state.prewarm.done():
+        app.state.prewarm.cancel()
+
+
+def _log_prewarm(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        _log.error("prewarm failed: %s", task.exception())
+
+
+def _prewarm_status(task: asyncio.Task | None) -> str:
+    if task is None:
+        return "disabled"
+    if not task.done():
+        return "running"
+    if task.cancelled() or task.exception() is not None:
+        return "failed"
+    return "done"
 
 
 tags_metadata = [
-    {"name": "Health", "description": "Liveness/health checks."},
+    {"name": "Health", "description": "Liveness/readiness checks."},
     {"name": "Sessions", "description": "Session-scoped history and state."},
     {"name": "Talk", "description": "SSE streaming chat with the agents."},
+    {"name": "Batch", "description": "Many sessions per request / connection (gateways)."},
+    {"name": "Admin", "description": "Session lifecycle, export/import (X-Admin-Token)."},
 ]
 
 app = FastAPI(
@@ -28,6 +116,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
 
 # Dev-friendly CORS (adjust for production)
@@ -51,20 +140,278 @@ async def health() -> dict[str, str]:
     """Simple liveness endpoint used by local/dev environments."""
     return {"status": "ok"}
 
+
+@app.get("/ready", tags=["Health"], summary="Readiness probe (warm/cold)")
+async def ready(request: Request):
+    """Report whether the graph is built. 503 while a configured prewarm is still running."""
+    body = {
+        "status": "warm" if is_warm() else "cold",
+        "prewarm": _prewarm_status(request.app.state.prewarm),
+        "models": model_registry.loaded(),
+    }
+    if body["prewarm"] in ("running", "failed"):
+        return JSONResponse(body, status_code=503)
+    return body
+
+
+@app.get("/health/loop", tags=["Health"], summary="Event loop lag and offload metrics")
+async def loop_health():
+    """Loop lag percentiles over the recent window, slow callbacks and offloaded CPU calls."""
+    return loop_monitor.stats()
+
+
+@app.get("/health/models", tags=["Health"], summary="Model call scheduler state")
+async def models_health():
+    """Running/queued model calls per priority class, admissions and preemptions."""
+    return model_scheduler.stats()
+
+
+@app.get("/health/feeds", tags=["Health"], summary="Per-source feed health")
+async def feeds_health():
+    """Circuit state, latency percentiles and cached-copy availability per feed source."""
+    return feed_health.snapshot()
+
+
+async def require_admin(x_admin_token: str | None = Header(None)) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="admin API disabled (set ADMIN_TOKEN)")
+    if not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="invalid admin token")
+
+
+_SESSION_MEDIA_TYPES = {NDJSON: "application/x-ndjson", BINARY: "application/octet-stream"}
+
+
+@app.get(
+    "/admin/sessions",
+    tags=["Admin"],
+    summary="Session store statistics",
+    dependencies=[Depends(require_admin)],
+)
+async def session_stats():
+    """Sessions, checkpoints and blob bytes held in memory, plus eviction counters."""
+    return session_store.stats()
+
+
+@app.get(
+    "/admin/sessions/export",
+    tags=["Admin"],
+    summary="Stream sessions out (NDJSON or binary)",
+    dependencies=[Depends(require_admin)],
+)
+async def export_sessions(
+    format: str = Query(NDJSON, pattern=f"^({NDJSON}|{BINARY})$"),
+    thread_id: list[str] | None = Query(None, description="Sessions to export (default: all)."),
+    evict: bool = Query(False, description="Drop each session once written (node drain)."),
+):
+    """One record per session: serialized checkpoints, pending writes and channel blobs."""
+    return StreamingResponse(
+        export_stream(session_store, thread_id, format, evict=evict),
+        media_type=_SESSION_MEDIA_TYPES[format],
+    )
+
+
+@app.post(
+    "/admin/sessions/import",
+    tags=["Admin"],
+    summary="Load sessions from an export stream",
+    dependencies=[Depends(require_admin)],
+)
+async def import_sessions(
+    request: Request,
+    format: str = Query(NDJSON, pattern=f"^({NDJSON}|{BINARY})$"),
+):
+    """Replaces sessions with the same id. Records are applied as they are decoded."""
+    reader = RecordReader(format)
+    imported = 0
+    try:
+        async for chunk in request.stream():
+            for record in reader.feed(chunk):
+                session_store.import_thread(record)
+                imported += 1
+        reader.close()
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(
+            status_code=400, detail=f"invalid session stream after {imported} records: {e}"
+        ) from e
+    return {"imported": imported}
+
+
+class TurnRequest(BaseModel):
+    """One user message for one session."""
+
+    session_id: UUID = Field(description="UUID v4 session identifier")
+    message: str = Field(description="User message to the agent.")
+    request_id: str | None = Field(
+        default=None, description="Echoed back on every frame of this turn (WebSocket)."
+    )
+
+
+class BatchRequest(BaseModel):
+    """Request schema for batch chat."""
+
+    items: list[TurnRequest] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+    model_config = ConfigDict(
+        json_schema_extra={
+            "examples": [
+                {
+                    "items": [
+                        {
+                            "session_id": "00000000-0000-0000-0000-000000000001",
+                            "message": "미국 테크 뉴스 요약해줘",
+                        },
+                        {
+                            "session_id": "00000000-0000-0000-0000-000000000002",
+                            "message": "미국 테크 뉴스 요약해줘",
+                        },
+                    ]
+                }
+            ]
+        }
+    )
+
+
+@app.post(
+    "/batch",
+    response_class=EventSourceResponse,
+    tags=["Batch"],
+    summary="Run many session turns concurrently (multiplexed SSE)",
+    responses={
+        200: {
+            "description": (
+                "One SSE stream for all items. Each data is "
+                '`{"session_id", "event", "data"}`; every turn ends with `turn_end`.'
+            ),
+            "content": {
+                "text/event-stream": {
+                    "schema": {"type": "string"},
+                    "examples": {
+                        "token": {
+                            "value": 'event: on_chat_model_stream\ndata: {"session_id": "...", '
+                            '"event": "on_chat_model_stream", "data": {...}}\n\n'
+                        },
+                        "end": {
+                            "value": 'event: turn_end\ndata: {"session_id": "...", '
+                            '"event": "turn_end", "data": {"ok": true}}\n\n'
+                        },
+                    },
+                }
+            },
+        }
+    },
+)
+async def talk_batch(batch: BatchRequest, request: Request):
+    """Runs every item under admission control, sharing feed fetches and router decisions."""
+
+    async def _events():
+        items = [(str(it.session_id), it.message) for it in batch.items]
+        async for session_id, ev in run_batch(items):
+            yield {"event": ev["event"], "data": frame(session_id, ev)}
+
+    return sse_response(request, _events())
+
+
+@app.websocket("/ws")
+async def talk_multiplexed(websocket: WebSocket):
+    """Multiplex many sessions over one connection.
+
+    Send `{"session_id", "message", "request_id"?}` frames at any time; turns run
+    concurrently and every event comes back as `{"session_id", "request_id", "event", "data"}`.
+    At most `WS_MAX_INFLIGHT` turns run per connection; further frames wait to be read.
+    """
+    await websocket.accept()
+    scope = SharedScope(ttl=WS_SHARED_TTL)
+    send_lock = asyncio.Lock()
+    tasks: set[asyncio.Task] = set()
+    inflight = asyncio.Semaphore(max(1, WS_MAX_INFLIGHT))
+
+    async def _send(text: str) -> None:
+        async with send_lock:
+            await websocket.send_text(text)
+
+    async def _turn(req: TurnRequest) -> None:
+        session_id = str(req.session_id)
+        async for ev in turn_events(session_id, req.message):
+            await _send(frame(session_id, ev, req.request_id))
+
+    try:
+        while True:
+            # 진행 중인 턴이 상한이면 읽기를 멈춰 클라이언트 쪽으로 배압을 전달
+            await inflight.acquire()
+            try:
+                raw = await websocket.receive_text()
+                req = TurnRequest.model_validate_json(raw)
+            except ValidationError as e:
+                inflight.release()
+                detail = json.dumps(e.errors(include_url=False), default=str, ensure_ascii=False)
+                await _send(f'{{"event": "error", "data": {detail}}}')
+                continue
+            except BaseException:
+                inflight.release()
+                raise
+            token = current_scope.set(scope)
+            try:
+                task = asyncio.create_task(_turn(req))
+            finally:
+                current_scope.reset(token)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(lambda _: inflight.release())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+@app.get(
+    "/{session_id}/usage",
+    tags=["Sessions"],
+    summary="Token usage of a session",
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "example": {
+                        "session_id": "00000000-0000-0000-0000-000000000001",
+                        "total": {"input_tokens": 1200, "output_tokens": 300, "total_tokens": 1500, "calls": 3},
+                        "by_node": {"router_agent": {"input_tokens": 400, "output_tokens": 10, "total_tokens": 410, "calls": 1}},
+                        "last_minute_tokens": 1500,
+                        "budget": {"session": 200000, "per_minute": None},
+                    }
+                }
+            }
+        }
+    },
+)
+async def get_session_usage(
+    session_id: UUID = Path(..., description="UUID v4 session identifier"),
+):
+    """Prompt/completion tokens charged to the session, per graph node, and its budgets."""
+    return usage_ledger.usage(str(session_id))
+
+
 @app.get(
     "/{session_id}",
     tags=["Sessions"],
     summary="Get session history",
     responses={
         200: {
-            "description": "List of state history snapshots for the session.",
+            "description": (
+                "Page of state history snapshots for the session (newest first). "
+                "`X-Next-Before` header carries the cursor for the next page."
+            ),
             "content": {
                 "application/json": {
                     "examples": {
                         "empty": {"value": []},
                         "sample": {
                             "value": [
-                                {"ts": "2025-10-29T12:00:00Z", "values": {"route": "chat_agent"}}
+                                {
+                                    "checkpoint_id": "1f0b4c2e-0000-6000-8000-000000000001",
+                                    "ts": "2025-10-29T12:00:00Z",
+                                    "values": {"route": "chat_agent"},
+                                }
                             ]
                         },
                     }
@@ -75,19 +422,45 @@ async def health() -> dict[str, str]:
     },
 )
 async def get_chat_history(
-    session_id: UUID = Path(..., description="UUID v4 session identifier")
+    session_id: UUID = Path(..., description="UUID v4 session identifier"),
+    limit: int | None = Query(
+        None, ge=1, le=1000, description=f"Page size (default {HISTORY_PAGE_SIZE})."
+    ),
+    before: str | None = Query(
+        None, description="Cursor: return snapshots older than this checkpoint_id."
+    ),
+    fields: list[str] | None = Query(
+        None,
+        description="Project `values` to these keys, e.g. `fields=route&fields=last_message`.",
+    ),
+    stream: bool = Query(
+        False, description="Stream the history as a JSON array instead of a single page."
+    ),
 ):
-    """Return full session-scoped state history. Ephemeral (process memory)."""
+    """Return session-scoped state history. Ephemeral (process memory)."""
+
+    if stream:
+        hist_iter = get_session_history(str(session_id), limit=limit, before=before)
+        first = await anext(hist_iter, None)
+        if first is None:
+            return Response(status_code=204)
+
+        async def _items():
+            yield snapshot_to_item(first, fields)
+            async for h in hist_iter:
+                yield snapshot_to_item(h, fields)
 
-    hist_iter = get_session_history(str(session_id))
-    items = [
-        {"ts": h.created_at.isoformat() if getattr(h, "created_at", None) else None, "values": h.values}
-        async for h in hist_iter
-    ]
+        return StreamingResponse(iter_json_array(_items()), media_type="application/json")
+
+    page_size = limit or HISTORY_PAGE_SIZE
+    hist_iter = get_session_history(str(session_id), limit=page_size, before=before)
+    items = [snapshot_to_item(h, fields) async for h in hist_iter]
     if not items:
         return Response(status_code=204)
-    return items
-    
+    headers = {"X-Next-Before": items[-1]["checkpoint_id"]} if len(items) == page_size else {}
+    # 전체 메시지 목록을 담은 스냅샷 페이지는 크므로 루프 밖에서 인코딩
+    content = await run_cpu(jsonable_encoder, items, size=approx_size(items))
+    return JSONResponse(content, headers=headers)
 
 
 class ChatRequest(BaseModel):
@@ -115,7 +488,10 @@ class ChatRequest(BaseModel):
                 "text/event-stream": {
                     "schema": {"type": "string"},
                     "examples": {
-                        "token": {"value": "event: on_chat_model_stream\ndata: 토큰...\n\n"},
+                        "token": {
+                            "value": "event: on_chat_model_stream\n"
+                            'data: {"chunk": {"type": "AIMessageChunk", "content": "토큰..."}}\n\n'
+                        },
                         "tool": {"value": "event: on_tool_end\ndata: {...}\n\n"},
                     },
                 }
@@ -124,9 +500,15 @@ class ChatRequest(BaseModel):
     },
 )
 async def talk_to_llm(
+    request: Request,  # Accept-Encoding 으로 압축, X-Debug-Trace 로 트레이스 결정
     session_id: UUID = Path(..., description="UUID v4 session identifier"),
     user_message: ChatRequest = ...,  # JSON body
-    request: Request = ...,  # reserved for future middleware usage
+    trace: str | None = Query(
+        None,
+        description=f"`1` or `profile` to append a `trace` event (also via `{TRACE_HEADER}`). "
+        "Ignored unless the server runs with `TRACE=1`.",
+    ),
 ):
     """Starts an SSE stream that emits model tokens and tool events for the session."""
-    return EventSourceResponse(ai_model(str(session_id), user_message.message))
+    events = ai_model(str(session_id), user_message.message, trace=trace_from_request(request))
+    return sse_response(request, events)
@@ -0,0 +1,524 @@
+"""Session-affinity front proxy for multi-worker / multi-node deployments.
+
+Session state lives in each worker's `InMemorySaver`, so every request of a session must
+reach the same worker. This proxy owns the public port and forwards `/{session_id}...`
+to the upstream picked by rendezvous hashing of the session id; other paths go to the
+first upstream. `POST /batch` is split by session owner (the SSE streams are merged back)
+and `/ws` frames are relayed to one upstream WebSocket per owner. `/admin/sessions*`
+fans out: stats and export gather every worker, import sends each record to its owner.
+
+    python proxy.py --workers 4 --port 8000          # spawn local workers + proxy
+    UPSTREAMS=http://10.0.0.1:8001,http://10.0.0.2:8001 uvicorn proxy:app --port 8000
+
+Across nodes, run the proxy on every node with the same `UPSTREAMS` (all workers of the
+cluster, in any order); each session then has one owner no matter which proxy it hits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, Sequence
+from uuid import UUID
+
+import httpx
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+_log = logging.getLogger(__name__)
+
+# 프록시가 그대로 전달하면 안 되는 hop-by-hop 헤더
+_HOP_HEADERS = frozenset(
+    {
+        "connection",
+        "keep-alive",
+        "proxy-authenticate",
+        "proxy-authorization",
+        "te",
+        "trailers",
+        "transfer-encoding",
+        "upgrade",
+        "host",
+    }
+)
+_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"]
+# 배치를 나눠 보낼 때는 본문이 달라지고, SSE 프레임 단위로 합쳐야 하므로 압축도 받지 않습니다.
+_SPLIT_DROP_HEADERS = _HOP_HEADERS | {"content-length", "accept-encoding"}
+_SSE_FRAME_END = re.compile(rb"\r\n\r\n|\n\n|\r\r")
+
+# 업스트림 WebSocket 연결: `send(text)`, `recv() -> str`, `close()`
+WsConnect = Callable[[str], Awaitable[Any]]
+
+
+def owner(session_id: str, upstreams: Sequence[str]) -> str:
+    """Rendezvous (HRW) hash: adding/removing an upstream only moves its own sessions."""
+    if not upstreams:
+        raise ValueError("no upstreams configured")
+    key = session_id.lower()
+    return max(
+        upstreams,
+        key=lambda u: hashlib.blake2b(f"{u}|{key}".encode(), digest_size=8).digest(),
+    )
+
+
+def session_id_of(path: str) -> Optional[str]:
+    first = path.lstrip("/").split("/", 1)[0]
+    try:
+        return str(UUID(first))
+    except ValueError:
+        return None
+
+
+def _ws_url(upstream: str) -> str:
+    return re.sub(r"^http", "ws", upstream) + "/ws"
+
+
+async def _ws_connect(url: str) -> Any:
+    # websockets 는 /ws 를 프록시할 때만 필요
+    from websockets.asyncio.client import connect
+
+    return await connect(url)
+
+
+def _turn_end_error(session_id: str, error: str) -> bytes:
+    data = {"session_id": session_id, "event": "turn_end", "data": {"ok": False, "error": error}}
+    return f"event: turn_end\r\ndata: {json.dumps(data, ensure_ascii=False)}\r\n\r\n".encode()
+
+
+def create_app(
+    upstreams: Sequence[str],
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+    ws_connect: Optional[WsConnect] = None,
+):
+    upstreams = [u.rstrip("/") for u in upstreams]
+    # SSE 스트림이 길어질 수 있으므로 read 타임아웃은 두지 않습니다.
+    client = client or httpx.AsyncClient(timeout=httpx.Timeout(None, connect=5.0))
+    ws_connect = ws_connect or _ws_connect
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        yield
+        await client.aclose()
+
+    async def forward(request: Request):
+        session_id = session_id_of(request.url.path)
+        return await _forward(request, owner(session_id, upstreams) if session_id else upstreams[0])
+
+    async def _forward(request: Request, target: str):
+        headers = [(k, v) for k, v in request.headers.raw if k.decode().lower() not in _HOP_HEADERS]
+        upstream_req = client.build_request(
+            request.method,
+            httpx.URL(target + request.url.path, query=request.url.query.encode()),
+            headers=headers,
+            content=await request.body(),
+        )
+        try:
+            resp = await client.send(upstream_req, stream=True)
+        except httpx.TransportError as e:
+            _log.warning("upstream %s unavailable: %s", target, e)
+            return JSONResponse({"detail": "upstream unavailable", "upstream": target}, 502)
+
+        out_headers = {k: v for k, v in resp.headers.items() if k.lower() not in _HOP_HEADERS}
+        out_headers["x-session-owner"] = target
+        return StreamingResponse(
+            resp.aiter_raw(),
+            status_code=resp.status_code,
+            headers=out_headers,
+            background=BackgroundTask(resp.aclose),
+        )
+
+    async def batch(request: Request):
+        """Send each owner its share of the items and merge the SSE streams frame by frame."""
+        groups: dict[str, list[Any]] = {}
+        try:
+            for item in json.loads(await request.body())["items"]:
+                session_id = session_id_of(str(item["session_id"]))
+                if session_id is None:
+                    raise ValueError(item["session_id"])
+                groups.setdefault(owner(session_id, upstreams), []).append(item)
+        except (ValueError, KeyError, TypeError):
+            groups = {}
+        if len(groups) <= 1:
+            # 한 워커 몫이거나 잘못된 요청(검증 오류 응답은 워커가 만듦)
+            return await _forward(request, next(iter(groups), upstreams[0]))
+
+        headers = [
+            (k, v) for k, v in request.headers.raw if k.decode().lower() not in _SPLIT_DROP_HEADERS
+        ]
+        queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue()
+
+        async def _pump(target: str, items: list[Any]) -> None:
+            try:
+                async with client.stream(
+                    "POST", target + "/batch", json={"items": items}, headers=headers
+                ) as resp:
+                    if resp.status_code != 200:
+                        raise httpx.HTTPStatusError(
+                            f"http {resp.status_code}", request=resp.request, response=resp
+                        )
+                    pending = b""
+                    async for chunk in resp.aiter_bytes():
+                        *frames, pending = _SSE_FRAME_END.split(pending + chunk)
+                        for f in frames:
+                            queue.put_nowait(f + b"\r\n\r\n")
+            except httpx.HTTPError as e:
+                _log.warning("batch upstream %s failed: %s", target, e)
+                # 끝나지 않은 턴을 구분할 수 없으므로 이 워커 몫 전체를 실패로 알림
+                for item in items:
+                    queue.put_nowait(
+                        _turn_end_error(str(item["session_id"]), "upstream unavailable")
+                    )
+            finally:
+                queue.put_nowait(None)
+
+        async def _merged() -> AsyncIterator[bytes]:
+            tasks = [asyncio.ensure_future(_pump(t, items)) for t, items in groups.items()]
+            try:
+                remaining = len(tasks)
+                while remaining:
+                    chunk = await queue.get()
+                    if chunk is None:
+                        remaining -= 1
+                    else:
+                        yield chunk
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return StreamingResponse(
+            _merged(),
+            media_type="text/event-stream",
+            headers={"cache-control": "no-cache", "x-session-owner": ",".join(groups)},
+        )
+
+    async def relay(websocket: WebSocket):
+        """Relay `/ws` frames to the owner of each frame's session over per-owner connections."""
+        await websocket.accept()
+        conns: dict[str, Any] = {}
+        readers: set[asyncio.Task] = set()
+        send_lock = asyncio.Lock()
+
+        async def _send(text: str) -> None:
+            async with send_lock:
+                await websocket.send_text(text)
+
+        async def _read(target: str, conn: Any) -> None:
+            try:
+                while True:
+                    await _send(await conn.recv())
+            except Exception as e:  # 업스트림 종료/오류: 다음 프레임에서 다시 연결
+                if conns.get(target) is conn:
+                    del conns[target]
+                    detail = {"detail": "upstream unavailable", "upstream": target, "error": str(e)}
+                    await _send(json.dumps({"event": "error", "data": detail}, ensure_ascii=False))
+
+        async def _conn(target: str) -> Any:
+            conn = conns.get(target)
+            if conn is None:
+                conn = conns[target] = await ws_connect(_ws_url(target))
+                reader = asyncio.create_task(_read(target, conn))
+                readers.add(reader)
+                reader.add_done_callback(readers.discard)
+            return conn
+
+        try:
+            while True:
+                raw = await websocket.receive_text()
+                try:
+                    session_id = session_id_of(str(json.loads(raw)["session_id"]))
+                except (ValueError, KeyError, TypeError):
+                    session_id = None
+                target = owner(session_id, upstreams) if session_id else upstreams[0]
+                try:
+                    await (await _conn(target)).send(raw)
+                except Exception as e:
+                    conns.pop(target, None)
+                    _log.warning("ws upstream %s unavailable: %s", target, e)
+                    detail = {"detail": "upstream unavailable", "upstream": target}
+                    await _send(
+                        json.dumps(
+                            {"session_id": session_id, "event": "error", "data": detail},
+                            ensure_ascii=False,
+                        )
+                    )
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for reader in readers:
+                reader.cancel()
+            for conn in list(conns.values()):
+                await conn.close()
+
+    def _split_headers(request: Request) -> list[tuple[bytes, bytes]]:
+        return [
+            (k, v) for k, v in request.headers.raw if k.decode().lower() not in _SPLIT_DROP_HEADERS
+        ]
+
+    async def _upstream_error(target: str, resp: httpx.Response) -> Response:
+        body = await resp.aread()
+        return Response(
+            body,
+            status_code=resp.status_code,
+            media_type=resp.headers.get("content-type"),
+            headers={"x-session-owner": target},
+        )
+
+    async def admin_stats(request: Request):
+        """Per-worker session store stats plus totals of the counters."""
+        headers = _split_headers(request)
+        try:
+            responses = await asyncio.gather(
+                *(client.get(u + request.url.path, headers=headers) for u in upstreams)
+            )
+        except httpx.TransportError as e:
+            _log.warning("admin stats upstream unavailable: %s", e)
+            return JSONResponse({"detail": "upstream unavailable"}, 502)
+        for target, resp in zip(upstreams, responses, strict=True):
+            if resp.status_code != 200:
+                return await _upstream_error(target, resp)
+        per_worker = {u: r.json() for u, r in zip(upstreams, responses, strict=True)}
+        totals: dict[str, Any] = {}
+        for stats in per_worker.values():
+            for key, value in stats.items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    totals[key] = totals.get(key, 0) + value
+        return JSONResponse({**totals, "upstreams": per_worker})
+
+    async def admin_export(request: Request):
+        """Concatenate the workers' export streams (one binary header for the whole stream)."""
+        from ai.sessions import BINARY, MAGIC
+
+        thread_ids = request.query_params.getlist("thread_id")
+        targets: dict[str, list[str]] = {}
+        if thread_ids:  # 지정한 세션은 주인 워커에게만 요청
+            for thread_id in thread_ids:
+                target = owner(session_id_of(thread_id) or thread_id, upstreams)
+                targets.setdefault(target, []).append(thread_id)
+        else:
+            targets = {u: [] for u in upstreams}
+        base_query = httpx.QueryParams(str(request.query_params)).remove("thread_id")
+        headers = _split_headers(request)
+        responses: list[httpx.Response] = []
+
+        async def _close_all() -> None:
+            for resp in responses:
+                await resp.aclose()
+
+        try:
+            for target, ids in targets.items():
+                query = base_query
+                for thread_id in ids:
+                    query = query.add("thread_id", thread_id)
+                upstream_req = client.build_request(
+                    "GET", target + request.url.path, params=query, headers=headers
+                )
+                responses.append(await client.send(upstream_req, stream=True))
+        except httpx.TransportError as e:
+            await _close_all()
+            _log.warning("admin export upstream unavailable: %s", e)
+            return JSONResponse({"detail": "upstream unavailable"}, 502)
+        for target, resp in zip(targets, responses, strict=True):
+            if resp.status_code != 200:
+                error = await _upstream_error(target, resp)
+                await _close_all()
+                return error
+
+        binary = request.query_params.get("format") == BINARY
+
+        async def _concat() -> AsyncIterator[bytes]:
+            try:
+                if binary:
+                    yield MAGIC
+                for resp in responses:
+                    skip = len(MAGIC) if binary else 0  # 워커마다 붙는 헤더는 버림
+                    async for chunk in resp.aiter_bytes():
+                        if skip:
+                            cut, chunk = chunk[:skip], chunk[skip:]
+                            skip -= len(cut)
+                        if chunk:
+                            yield chunk
+            finally:
+                await _close_all()
+
+        return StreamingResponse(
+            _concat(),
+            media_type=responses[0].headers.get("content-type"),
+            headers={"x-session-owner": ",".join(targets)},
+        )
+
+    async def admin_import(request: Request):
+        """Decode the export stream and send every record to the worker that owns it."""
+        from ai.sessions import BINARY, MAGIC, NDJSON, RecordReader, encode_record
+
+        fmt = request.query_params.get("format", NDJSON)
+        if fmt not in (NDJSON, BINARY):
+            return await _forward(request, upstreams[0])  # 검증 오류 응답은 워커가 만듦
+        headers = _split_headers(request)
+        queues: dict[str, asyncio.Queue[Optional[bytes]]] = {}
+        posts: dict[str, asyncio.Task] = {}
+
+        async def _post(target: str, queue: asyncio.Queue[Optional[bytes]]) -> httpx.Response:
+            async def _body() -> AsyncIterator[bytes]:
+                if fmt == BINARY:
+                    yield MAGIC
+                while (chunk := await queue.get()) is not None:
+                    yield chunk
+
+            return await client.post(
+                target + request.url.path,
+                params=request.query_params,
+                content=_body(),
+                headers=headers,
+            )
+
+        async def _send(target: str, data: Optional[bytes]) -> None:
+            if target not in posts:
+                queue = queues[target] = asyncio.Queue(maxsize=64)
+                posts[target] = asyncio.ensure_future(_post(target, queue))
+            # 워커가 먼저 응답(인증 실패 등)하면 더 보내지 않음
+            put = asyncio.ensure_future(queues[target].put(data))
+            await asyncio.wait({put, posts[target]}, return_when=asyncio.FIRST_COMPLETED)
+            put.cancel()
+
+        reader = RecordReader(fmt)
+        try:
+            async for chunk in request.stream():
+                for record in reader.feed(chunk):
+                    thread_id = str(record["thread_id"])
+                    target = owner(session_id_of(thread_id) or thread_id, upstreams)
+                    await _send(target, encode_record(record, fmt))
+            reader.close()
+        except (ValueError, KeyError, TypeError) as e:
+            for post in posts.values():
+                post.cancel()
+            return JSONResponse({"detail": f"invalid session stream: {e}"}, 400)
+        for target in list(posts):
+            await _send(target, None)
+
+        imported: dict[str, int] = {}
+        for target, post in posts.items():
+            try:
+                resp = await post
+            except httpx.TransportError as e:
+                _log.warning("admin import upstream %s unavailable: %s", target, e)
+                return JSONResponse({"detail": "upstream unavailable", "upstream": target}, 502)
+            if resp.status_code != 200:
+                return await _upstream_error(target, resp)
+            imported[target] = resp.json()["imported"]
+        return JSONResponse({"imported": sum(imported.values()), "upstreams": imported})
+
+    async def cluster(_request: Request):
+        async def _probe(url: str) -> tuple[str, str]:
+            try:
+                r = await client.get(f"{url}/health", timeout=2.0)
+                return url, "ok" if r.status_code == 200 else f"http {r.status_code}"
+            except httpx.HTTPError as e:
+                return url, f"down ({type(e).__name__})"
+
+        results = dict(await asyncio.gather(*(_probe(u) for u in upstreams)))
+        status = 200 if all(v == "ok" for v in results.values()) else 503
+        return JSONResponse({"upstreams": results}, status_code=status)
+
+    return Starlette(
+        routes=[
+            Route("/_cluster", cluster, methods=["GET"]),
+            Route("/batch", batch, methods=["POST"]),
+            Route("/admin/sessions", admin_stats, methods=["GET"]),
+            Route("/admin/sessions/export", admin_export, methods=["GET"]),
+            Route("/admin/sessions/import", admin_import, methods=["POST"]),
+            WebSocketRoute("/ws", relay),
+            Route("/{path:path}", forward, methods=_METHODS),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def _env_upstreams() -> list[str]:
+    return [u.strip() for u in os.getenv("UPSTREAMS", "").split(",") if u.strip()]
+
+
+# `uvicorn proxy:app` 용. UPSTREAMS 미설정 시 로컬 단일 워커(8001)로 전달합니다.
+app = create_app(_env_upstreams() or ["http://127.0.0.1:8001"])
+
+
+def spawn_workers(
+    count: int,
+    *,
+    host: str = "127.0.0.1",
+    base_port: int = 8001,
+    app_path: str = "main:app",
+    env: Optional[dict[str, str]] = None,
+) -> tuple[list[subprocess.Popen], list[str]]:
+    procs = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                app_path,
+                "--host",
+                host,
+                "--port",
+                str(base_port + i),
+            ],
+            env=env,
+        )
+        for i in range(count)
+    ]
+    return procs, [f"http://{host}:{base_port + i}" for i in range(count)]
+
+
+def wait_ready(urls: Sequence[str], timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    pending = list(urls)
+    while pending:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"workers not ready: {pending}")
+        still = []
+        for url in pending:
+            try:
+                httpx.get(f"{url}/health", timeout=1.0).raise_for_status()
+            except httpx.HTTPError:
+                still.append(url)
+        pending = still
+        if pending:
+            time.sleep(0.2)
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "2")))
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--base-port", type=int, default=8001)
+    args = parser.parse_args()
+
+    procs, urls = spawn_workers(args.workers, base_port=args.base_port)
+    try:
+        wait_ready(urls)
+        uvicorn.run(create_app(urls), host=args.host, port=args.port)
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import pytest
+
+
+class ManualClock:
+    """Monotonic clock stand-in; tests advance `now` by hand."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> ManualClock:
+    return ManualClock()
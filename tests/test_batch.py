@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import ai.batch as batch
+from ai.batch import SharedScope, frame, run_batch
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    calls: list[tuple[str, str]] = []
+
+    async def _ai_model(session_id: str, message: str):
+        calls.append((session_id, message))
+        if message == "boom":
+            raise RuntimeError("model down")
+        for token in message.split():
+            await asyncio.sleep(0)
+            yield {"event": "on_chat_model_stream", "data": json.dumps(token)}
+
+    monkeypatch.setattr(batch, "ai_model", _ai_model)
+    return calls
+
+
+def test_shared_scope_single_flight():
+    calls = 0
+
+    async def _fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return ["item"]
+
+    async def _run():
+        scope = SharedScope()
+        return await asyncio.gather(*(scope.shared("feed", "u", _fetch) for _ in range(5)))
+
+    assert asyncio.run(_run()) == [["item"]] * 5
+    assert calls == 1
+
+
+def test_shared_scope_prunes_expired_and_forgets_failures():
+    now = [0.0]
+    calls = 0
+
+    async def _fetch():
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise RuntimeError("feed down")
+        return ["item"]
+
+    async def _run():
+        scope = SharedScope(ttl=10, clock=lambda: now[0])
+        with pytest.raises(RuntimeError):
+            await scope.shared("feed", "u", _fetch)
+        assert await scope.shared("feed", "u", _fetch) == ["item"]  # 실패는 재사용하지 않음
+        for i in range(5):
+            await scope.shared("feed", f"k{i}", _fetch)
+        assert len(scope) == 6
+        now[0] = 20
+        await scope.shared("feed", "new", _fetch)
+        return len(scope)
+
+    assert asyncio.run(_run()) == 1
+    assert calls == 8
+
+
+def test_frame_embeds_json_data():
+    text = frame("s1", {"event": "e", "data": '{"a": [1, "한"]}'}, request_id="r1")
+    assert json.loads(text) == {
+        "session_id": "s1",
+        "event": "e",
+        "request_id": "r1",
+        "data": {"a": [1, "한"]},
+    }
+
+
+def test_run_batch_orders_turns_per_session(fake_model):
+    async def _run():
+        items = [("s1", "a b"), ("s2", "boom"), ("s1", "c")]
+        return [(sid, ev["event"], json.loads(ev["data"])) async for sid, ev in run_batch(items)]
+
+    events = asyncio.run(_run())
+    s1 = [data for sid, _, data in events if sid == "s1"]
+    assert s1 == ["a", "b", {"ok": True}, "c", {"ok": True}]
+    assert ("s2", "turn_end", {"ok": False, "error": "RuntimeError: model down"}) in events
+    assert fake_model.index(("s1", "a b")) < fake_model.index(("s1", "c"))
+
+
+def test_websocket_multiplexes_sessions(fake_model):
+    import main
+
+    sid1, sid2 = str(uuid.uuid4()), str(uuid.uuid4())
+    with TestClient(main.app) as client, client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps({"session_id": sid1, "message": "x y", "request_id": "r1"}))
+        ws.send_text(json.dumps({"session_id": sid2, "message": "z", "request_id": "r2"}))
+        ws.send_text("{}")
+        frames, ends, errors = [], 0, 0
+        # 잘못된 프레임의 error 응답은 턴 이벤트와 순서가 정해져 있지 않습니다.
+        while ends < 2 or not errors:
+            f = json.loads(ws.receive_text())
+            frames.append(f)
+            ends += f["event"] == "turn_end"
+            errors += f["event"] == "error"
+
+    assert [f["data"] for f in frames if f.get("request_id") == "r1"] == ["x", "y", {"ok": True}]
+    assert {f["session_id"] for f in frames if f.get("request_id") == "r2"} == {sid2}
+
+
+def test_websocket_bounds_turns_in_flight(monkeypatch):
+    import main
+
+    active, peak = 0, 0
+
+    async def _ai_model(session_id: str, message: str):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        yield {"event": "on_chat_model_stream", "data": json.dumps(message)}
+
+    monkeypatch.setattr(batch, "ai_model", _ai_model)
+    monkeypatch.setattr(main, "WS_MAX_INFLIGHT", 2)
+    with TestClient(main.app) as client, client.websocket_connect("/ws") as ws:
+        for i in range(5):
+            ws.send_text(json.dumps({"session_id": str(uuid.uuid4()), "message": f"m{i}"}))
+        ends = 0
+        while ends < 5:
+            ends += json.loads(ws.receive_text())["event"] == "turn_end"
+    assert peak == 2
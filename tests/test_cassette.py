@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import threading
+import time
+
+import httpx
+import pytest
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from ai.cassette import MODEL, RECORD, REPLAY, Cassette, CassetteMiss, read_entries
+from ai.chat.tool_calls import CassetteToolMiddleware
+from ai.models import ModelRegistry, NodeModelConfig
+from ai.news.tools.feed_health import FeedHealthRegistry
+from ai.news.tools.rss_feed import RssFeedCollector
+
+_RSS = b"<rss><channel><item><title>t</title><link>l</link><guid>g</guid></item></channel></rss>"
+
+
+class _FakeModel(GenericFakeChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(**kwargs)
+
+
+def _no_network(*args, **kwargs):
+    raise AssertionError("replay must not build a real client")
+
+
+def _stream(cassette: Cassette, factory) -> list[str]:
+    agent = ModelRegistry(cassette.chat_model_factory(factory)).agent(NodeModelConfig("m"))
+
+    async def _run():
+        out = []
+        async for ev in agent._agent("m").astream_events(  # noqa: SLF001
+            {"messages": [HumanMessage("hi", id="random-1")]}, version="v2"
+        ):
+            if ev["event"] == "on_chat_model_stream":
+                out.append(ev["data"]["chunk"].content)
+        return out
+
+    return asyncio.run(_run())
+
+
+def test_model_stream_roundtrip(tmp_path):
+    path = tmp_path / "c.jsonl.gz"
+    recorder = Cassette(path, RECORD)
+    live = _stream(
+        recorder, lambda name, **o: _FakeModel(messages=iter([AIMessage("hello big world")]))
+    )
+    recorder.close()
+
+    player = Cassette(path, REPLAY, time_scale=0)
+    assert _stream(player, _no_network) == live and len(live) > 1
+    assert player.remaining() == 0
+    with pytest.raises(CassetteMiss):
+        _stream(player, _no_network)
+
+
+def test_replay_scales_recorded_timing(tmp_path):
+    path = tmp_path / "c.jsonl.gz"
+    recorder = Cassette(path, RECORD)
+    recorder.record(
+        MODEL, "k", chunks=[[0.1, {"type": "AIMessageChunk", "data": {"content": "a"}}]]
+    )
+    recorder.record(
+        MODEL, "k", chunks=[[0.1, {"type": "AIMessageChunk", "data": {"content": "b"}}]]
+    )
+    recorder.close()
+
+    model = Cassette(path, REPLAY, time_scale=0.5).chat_model_factory(_no_network)("m")
+    started = time.perf_counter()
+    first = asyncio.run(model._replay("k", "req"))  # noqa: SLF001
+    assert 0.04 <= time.perf_counter() - started < 0.09
+    assert first[0].content == "a"
+    assert asyncio.run(model._replay("k", "req"))[0].content == "b"  # noqa: SLF001
+
+
+@pytest.mark.parametrize("encoding", [None, "gzip"])
+def test_feed_http_roundtrip(tmp_path, encoding):
+    path = tmp_path / "c.jsonl.gz"
+    recorder = Cassette(path, RECORD)
+    if encoding == "gzip":
+        body, headers = gzip.compress(_RSS), {"content-encoding": "gzip"}
+    else:
+        body, headers = _RSS, {}
+    real = httpx.MockTransport(lambda r: httpx.Response(200, content=body, headers=headers))
+
+    def _fetch(cassette: Cassette, inner=None):
+        collector = RssFeedCollector(
+            ["https://feed.test/rss"], health=FeedHealthRegistry(), hedge=False
+        )
+
+        async def _run():
+            async with httpx.AsyncClient(transport=cassette.transport(inner)) as client:
+                return await collector.fetch_all(client)
+
+        return asyncio.run(_run())
+
+    live = _fetch(recorder, real)
+    recorder.close()
+    replayed = _fetch(Cassette(path, REPLAY, time_scale=0))
+    assert [i.title for i in replayed] == [i.title for i in live] == ["t"]
+
+
+def test_tool_results_roundtrip(tmp_path):
+    path = tmp_path / "c.jsonl.gz"
+    executions = []
+
+    @tool("web_search")
+    async def search(query: str) -> str:
+        """Search."""
+        executions.append(query)
+        return f"results for {query}"
+
+    def _turn(cassette: Cassette) -> list[str]:
+        ask = AIMessage("", tool_calls=[{"name": "web_search", "args": {"query": "q"}, "id": "c0"}])
+        model = _FakeModel(messages=iter([ask, AIMessage("done")]))
+        agent = create_agent(
+            model=model, tools=[search], middleware=[CassetteToolMiddleware(cassette)]
+        )
+        result = asyncio.run(agent.ainvoke({"messages": [HumanMessage("hi")]}))
+        return [m.text for m in result["messages"] if isinstance(m, ToolMessage)]
+
+    recorder = Cassette(path, RECORD)
+    live = _turn(recorder)
+    recorder.close()
+    assert _turn(Cassette(path, REPLAY, time_scale=0)) == live == ["results for q"]
+    assert executions == ["q"]
+
+
+def test_sync_invoke_roundtrip(tmp_path):
+    path = tmp_path / "c.jsonl.gz"
+    recorder = Cassette(path, RECORD)
+    live = recorder.chat_model_factory(
+        lambda name, **o: _FakeModel(messages=iter([AIMessage("sync hello")]))
+    )("m")
+    assert live.invoke([HumanMessage("hi")]).content == "sync hello"
+    recorder.close()
+
+    model = Cassette(path, REPLAY, time_scale=0).chat_model_factory(_no_network)("m")
+    assert model.invoke([HumanMessage("hi")]).content == "sync hello"
+
+
+def test_recording_flushes_off_the_event_loop(tmp_path):
+    writers = []
+
+    class _Recorder(Cassette):
+        def flush(self):
+            writers.append(threading.get_ident())
+            super().flush()
+
+    recorder = _Recorder(tmp_path / "c.jsonl.gz", RECORD)
+
+    async def _run():
+        for i in range(3):
+            recorder.record(MODEL, "k", n=i)
+
+    asyncio.run(_run())  # 기본 executor 종료까지 기다림
+    recorder.record(MODEL, "k", n=3)  # 루프 밖에서는 바로 씀
+    recorder.close()
+    assert writers[0] != threading.get_ident()
+    assert [e["n"] for e in read_entries(recorder.path)] == [0, 1, 2, 3]
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+
+from ai.models import ModelRegistry, NodeModelConfig
+from ai.news.tools.rss_feed import NewsItem
+from ai.state import AgentState
+from ai.summary.agent import SummaryAgent
+from ai.summary.digest import DigestRefresher, DigestStore, has_instructions
+
+_FEED = "https://feed.test/rss"
+
+
+def _items(*titles: str) -> list[NewsItem]:
+    published = datetime(2024, 10, 2, tzinfo=timezone.utc)
+    return [NewsItem(t, t, f"https://news.test/{t}", None, published, _FEED, "f") for t in titles]
+
+
+class _Summarizer:
+    def __init__(self) -> None:
+        self.inputs: list[str] = []
+
+    async def ainvoke(self, input):
+        text = input["messages"][-1].content
+        self.inputs.append(text)
+        return {"messages": [*input["messages"], AIMessage(f"요약 {len(self.inputs)}")]}
+
+
+def _agent(store: DigestStore) -> tuple[SummaryAgent, _Summarizer]:
+    model = _Summarizer()
+    registry = ModelRegistry(factory=lambda name: name, agent_factory=lambda **_: model)
+    return SummaryAgent(registry, NodeModelConfig("m"), digests=store), model
+
+
+def test_refresher_summarizes_only_changed_item_sets():
+    store, current, summaries = DigestStore(), [_items("a", "b")], []
+
+    async def fetch(url):
+        return current[0]
+
+    async def summarize(text):
+        summaries.append(text)
+        return f"digest {len(summaries)}"
+
+    refresher = DigestRefresher(store, summarize, feeds=[_FEED], fetch=fetch)
+    assert asyncio.run(refresher.refresh_all()) == 1
+    assert asyncio.run(refresher.refresh_all()) == 0
+    current[0] = _items("a", "b", "c")
+    assert asyncio.run(refresher.refresh_all()) == 1
+    assert len(summaries) == 2 and store.stats()["entries"] == 2
+
+
+def test_default_request_replays_stored_digest_as_tokens():
+    store = DigestStore()
+    agent, model = _agent(store)
+    graph = StateGraph(AgentState)
+    graph.add_node("summary_agent", agent.run)
+    graph.set_entry_point("summary_agent")
+    graph.add_edge("summary_agent", END)
+    app = graph.compile()
+    state = AgentState(messages=[HumanMessage("미국 뉴스 요약해줘")], news=_items("a", "b"))
+
+    async def _turn():
+        tokens = []
+        async for ev in app.astream_events(state, version="v2"):
+            if ev["event"] == "on_chat_model_stream":
+                tokens.append(ev["data"]["chunk"].content)
+        return [t for t in tokens if t]
+
+    assert asyncio.run(_turn()) == []  # 스텁 모델은 스트리밍하지 않음
+    assert len(model.inputs) == 1
+    tokens = asyncio.run(_turn())
+    assert "".join(tokens) == "요약 1" and len(tokens) == 2
+    assert len(model.inputs) == 1
+    assert store.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_user_instructions_bypass_digests():
+    store = DigestStore()
+    agent, model = _agent(store)
+    news = _items("a")
+    asyncio.run(agent.run(AgentState(messages=[HumanMessage("뉴스 요약")], news=news)))
+    result = asyncio.run(
+        agent.run(AgentState(messages=[HumanMessage("3줄로 요약해줘")], news=news))
+    )
+    assert len(model.inputs) == 2
+    assert model.inputs[1].endswith("사용자 요청: 3줄로 요약해줘")
+    assert result["messages"][-1].content == "요약 2"
+    assert has_instructions("in english please") and not has_instructions("한국 테크 뉴스 요약해줘")
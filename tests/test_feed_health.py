@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+
+from ai.news.tools.feed_health import CircuitBreaker, CircuitOpenError, FeedHealthRegistry
+from ai.news.tools.rss_feed import RssFeedCollector
+
+URL = "https://example.com/feed.xml"
+RSS = """<rss version="2.0"><channel><item><title>T</title><link>https://example.com/1</link>
+<guid>id-1</guid></item></channel></rss>"""
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def test_breaker_opens_and_half_opens(clock):
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    clock.now = 11
+    assert breaker.allow()  # single half-open probe
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_adaptive_timeout_and_hedge_delay_from_latency():
+    health = FeedHealthRegistry(min_samples=3, timeout_factor=3, min_timeout=0.5)
+    assert health.timeout_for(URL, 10.0) == 10.0
+    assert health.hedge_delay_for(URL) is None
+    for seconds in (0.3, 0.4, 0.5):
+        health.record_success(URL, seconds, [])
+    assert health.timeout_for(URL, 10.0) == pytest.approx(1.5)
+    assert health.hedge_delay_for(URL) == pytest.approx(0.5)
+
+
+def test_timeouts_count_as_samples_and_probes_get_the_default_timeout(clock):
+    health = FeedHealthRegistry(
+        min_samples=3,
+        timeout_factor=3,
+        min_timeout=0.1,
+        failure_threshold=1,
+        cooldown=10,
+        clock=clock,
+    )
+    for _ in range(3):
+        health.record_success(URL, 0.05, [])
+    assert health.timeout_for(URL, 10.0) == pytest.approx(0.15)
+    health.record_failure(URL, timeout=0.15)  # 시간 초과도 지연 표본으로 남김
+    assert health.timeout_for(URL, 10.0) == pytest.approx(0.45)
+    clock.now = 11
+    assert health.get(URL).breaker.allow()  # half-open 탐침
+    assert health.timeout_for(URL, 10.0) == 10.0
+
+
+def test_source_that_slowed_down_recovers_through_a_probe(clock):
+    health = FeedHealthRegistry(
+        min_samples=3,
+        timeout_factor=1,
+        min_timeout=0.05,
+        failure_threshold=1,
+        cooldown=10,
+        clock=clock,
+    )
+    for _ in range(3):
+        health.record_success(URL, 0.01, [])
+
+    async def handler(_request):
+        await asyncio.sleep(0.2)  # 학습된 타임아웃(0.05초)보다 느려짐
+        return httpx.Response(200, text=RSS)
+
+    async def _run():
+        async with _client(handler) as client:
+            collector = RssFeedCollector([URL], health=health, hedge=False, timeout=2.0)
+            assert await collector.fetch_all(client) == []
+            assert health.get(URL).breaker.state == "open"
+            clock.now = 11
+            return await collector.fetch_all(client)
+
+    assert [it.id for it in asyncio.run(_run())] == ["id-1"]
+    assert health.get(URL).breaker.state == "closed"
+
+
+def test_open_circuit_serves_last_good_copy():
+    health = FeedHealthRegistry(failure_threshold=1)
+    calls = 0
+
+    async def handler(_request):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return httpx.Response(200, text=RSS)
+        return httpx.Response(503)
+
+    async def _run():
+        async with _client(handler) as client:
+            collector = RssFeedCollector([URL], health=health)
+            first = await collector.fetch_all(client)
+            second = await collector.fetch_all(client)  # 503 → cached copy, circuit opens
+            third = await collector.fetch_all(client)  # open → no request at all
+            return first, second, third
+
+    first, second, third = asyncio.run(_run())
+    assert [it.id for it in first] == ["id-1"]
+    assert second == first and third == first
+    assert calls == 2
+    assert health.snapshot()[URL]["state"] == "open"
+
+
+def test_open_circuit_without_copy_raises():
+    health = FeedHealthRegistry(failure_threshold=1)
+    health.record_failure(URL)
+    collector = RssFeedCollector([URL], health=health)
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(collector._fetch_one(None, collector._sources[0]))  # noqa: SLF001
+
+
+def test_slow_fetch_is_hedged():
+    health = FeedHealthRegistry(min_samples=1, min_hedge_delay=0.01)
+    health.record_success(URL, 0.01, [])
+    calls = 0
+
+    async def handler(_request):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(1.0)  # 첫 요청만 느림
+        return httpx.Response(200, text=RSS)
+
+    async def _run():
+        async with _client(handler) as client:
+            return await RssFeedCollector([URL], health=health).fetch_all(client)
+
+    items = asyncio.run(asyncio.wait_for(_run(), timeout=0.5))
+    assert [it.id for it in items] == ["id-1"]
+    assert calls == 2
+
+
+def test_cancelled_half_open_probe_lets_next_call_probe(clock):
+    health = FeedHealthRegistry(failure_threshold=1, cooldown=10, clock=clock)
+    health.record_failure(URL)
+    clock.now = 11
+    started = asyncio.Event()
+
+    async def handler(_request):
+        started.set()
+        await asyncio.sleep(1.0)
+        return httpx.Response(200, text=RSS)
+
+    async def _run():
+        async with _client(handler) as client:
+            collector = RssFeedCollector([URL], health=health, hedge=False)
+            for fetch in (collector.fetch_all, lambda c: _drain(collector.stream(c))):
+                started.clear()
+                task = asyncio.create_task(fetch(client))
+                await started.wait()
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                assert health.get(URL).breaker.allow()  # 탐침이 풀려 다시 시도 가능
+                health.record_cancelled(URL)
+
+    asyncio.run(_run())
+
+
+async def _drain(stream):
+    return [item async for item in stream]
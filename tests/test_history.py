@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from ai.history import iter_json_array, snapshot_to_item
+
+
+def _snapshot(checkpoint_id: str, values: dict):
+    return SimpleNamespace(
+        values=values,
+        config={"configurable": {"thread_id": "t", "checkpoint_id": checkpoint_id}},
+        created_at=datetime(2025, 10, 29, 12, 0, tzinfo=timezone.utc),
+    )
+
+
+def test_snapshot_projection_last_message():
+    snap = _snapshot(
+        "c1",
+        {"messages": [HumanMessage("hi"), AIMessage("hello")], "route": "chat_agent", "news": None},
+    )
+    item = snapshot_to_item(snap, ["route", "last_message"])
+    assert item["checkpoint_id"] == "c1"
+    assert item["ts"] == "2025-10-29T12:00:00+00:00"
+    assert item["values"]["route"] == "chat_agent"
+    assert item["values"]["last_message"].content == "hello"
+    assert "messages" not in item["values"]
+
+
+def test_snapshot_without_projection_keeps_values():
+    values = {"messages": [], "route": None}
+    assert snapshot_to_item(_snapshot("c2", values))["values"] is values
+
+
+def test_iter_json_array_streams_valid_json():
+    async def _items():
+        for i in range(3):
+            yield snapshot_to_item(_snapshot(f"c{i}", {"messages": [HumanMessage(str(i))]}))
+
+    async def _collect():
+        return "".join([chunk async for chunk in iter_json_array(_items())])
+
+    body = json.loads(asyncio.run(_collect()))
+    assert [b["checkpoint_id"] for b in body] == ["c0", "c1", "c2"]
+    assert body[2]["values"]["messages"][0]["content"] == "2"
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import xml.etree.ElementTree as ET
+from contextvars import ContextVar
+
+import pytest
+
+import ai.loop as loop_module
+from ai.loop import LoopMonitor, approx_size, run_cpu
+from ai.news.tools.rss_feed import FeedSource, parse_feed
+
+_var: ContextVar[str] = ContextVar("_var", default="unset")
+_RSS = "<rss><channel>" + "<item><title>t</title><link>l</link></item>" * 200 + "</channel></rss>"
+
+
+def test_small_inputs_stay_inline_and_threads_keep_context(monkeypatch):
+    monkeypatch.setattr(loop_module, "OFFLOAD_MODE", "thread")
+
+    async def _run():
+        _var.set("turn")
+        inline = await run_cpu(_var.get, size=10)
+        threaded = await run_cpu(lambda: (_var.get(), threading.current_thread().name))
+        return inline, threaded
+
+    inline, (value, thread) = asyncio.run(_run())
+    assert inline == "turn" and value == "turn"
+    assert thread.startswith("offload")
+
+
+def test_feed_parsing_in_process_pool(monkeypatch):
+    monkeypatch.setattr(loop_module, "OFFLOAD_MODE", "process")
+    source = FeedSource("https://feed.test/rss", name="t")
+    try:
+        items = asyncio.run(run_cpu(parse_feed, _RSS, source, process_safe=True))
+        assert len(items) == 200 and items[0].source_name == "t"
+        with pytest.raises(ET.ParseError):
+            asyncio.run(run_cpu(parse_feed, "<rss", source, process_safe=True))
+    finally:
+        loop_module.shutdown_offload()
+    assert loop_module.offload_stats()["calls"]["process"] >= 2
+
+
+def test_monitor_reports_lag_and_slow_callbacks():
+    monitor = LoopMonitor(interval=0.005, slow_callback=0.02)
+
+    async def _run():
+        task = asyncio.create_task(monitor.run())
+        await asyncio.sleep(0.02)
+        time.sleep(0.05)  # 루프를 붙잡는 동기 작업
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+    monitor.install()
+    try:
+        asyncio.run(_run())
+    finally:
+        monitor.uninstall()
+    stats = monitor.stats()
+    assert stats["lag_ms"]["max"] >= 40
+    assert stats["slow_callbacks"] >= 1
+    assert "_run" in stats["recent_slow_callbacks"][0]["callback"]
+    assert asyncio.events.Handle._run is loop_module._original_run
+
+
+def test_approx_size_stops_at_limit():
+    assert approx_size({"a": "x" * 10}) < 100
+    assert approx_size(["x" * 1000] * 10_000, limit=5000) < 20_000  # 전체는 약 10MB
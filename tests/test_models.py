@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from langchain.agents.structured_output import StructuredOutputError
+
+from ai.models import ModelRegistry, NodeModelConfig, TieredAgent, node_model_config
+
+
+class _StubAgent:
+    def __init__(self, result=None, exc=None, delay=0.0):
+        self.result, self.exc, self.delay, self.calls = result, exc, delay, 0
+
+    async def ainvoke(self, _input):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.exc:
+            raise self.exc
+        return self.result
+
+
+def _tiered(config: NodeModelConfig, agents: dict[str, _StubAgent], **kwargs) -> TieredAgent:
+    registry = ModelRegistry(
+        factory=lambda name: name, agent_factory=lambda model, **_: agents[model]
+    )
+    return registry.agent(config, **kwargs)
+
+
+def test_registry_is_lazy_and_shared():
+    built: list[str] = []
+    registry = ModelRegistry(factory=lambda name: built.append(name) or object())
+    assert built == []
+    assert registry.get("a") is registry.get("a")
+    registry.get("b")
+    assert built == ["a", "b"]
+
+
+def test_node_model_config_env_override(monkeypatch):
+    monkeypatch.setenv("ROUTER_AGENT_MODEL", "small")
+    monkeypatch.setenv("ROUTER_AGENT_TIMEOUT", "0")
+    cfg = node_model_config(
+        "router_agent", default_model="x", default_escalation_model="big", default_timeout=5.0
+    )
+    assert cfg == NodeModelConfig(model="small", escalation_model="big", timeout=None)
+    # escalating to the same model is pointless
+    assert node_model_config("chat_agent", default_model="m", default_escalation_model="m") == (
+        NodeModelConfig(model="m")
+    )
+
+
+def test_escalates_on_structured_output_error():
+    small = _StubAgent(exc=StructuredOutputError("bad"))
+    big = _StubAgent(result={"structured_response": "ok"})
+    tiered = _tiered(
+        NodeModelConfig("small", "big"), {"small": small, "big": big}, response_format=dict
+    )
+    assert asyncio.run(tiered.ainvoke({}))["structured_response"] == "ok"
+    assert (small.calls, big.calls) == (1, 1)
+
+
+def test_escalates_on_missing_structured_response():
+    small = _StubAgent(result={"messages": []})
+    big = _StubAgent(result={"structured_response": "ok"})
+    tiered = _tiered(
+        NodeModelConfig("small", "big"), {"small": small, "big": big}, response_format=dict
+    )
+    assert asyncio.run(tiered.ainvoke({}))["structured_response"] == "ok"
+
+
+def test_no_escalation_without_response_format():
+    small = _StubAgent(exc=StructuredOutputError("bad"))
+    tiered = _tiered(NodeModelConfig("small", "big"), {"small": small})
+    with pytest.raises(StructuredOutputError):
+        asyncio.run(tiered.ainvoke({}))
+
+
+def test_timeout():
+    slow = _StubAgent(result={}, delay=1.0)
+    tiered = _tiered(NodeModelConfig("m", timeout=0.01), {"m": slow})
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(tiered.ainvoke({}))
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, StateGraph
+
+import ai.agent as agent_module
+import ai.news.agent as news_module
+import ai.news.tools.rss_feed as rss_module
+from ai.models import ModelRegistry, NodeModelConfig
+from ai.news.agent import NewsAgent
+from ai.news.tools.feed_health import FeedHealthRegistry
+from ai.news.tools.rss_feed import RssFeedCollector
+from ai.state import AgentState
+
+_HEAD = b"<rss><channel><title>f</title>"
+_ITEM = (
+    b"<item><title>%s</title><link>https://news.test/%s</link><guid>%s</guid>"
+    b"<pubDate>Wed, 02 Oct 2024 08:00:00 GMT</pubDate></item>"
+)
+
+
+def _slow_feed(delay: float) -> httpx.MockTransport:
+    async def _body():
+        yield _HEAD + _ITEM % (b"first", b"1", b"1")
+        await asyncio.sleep(delay)
+        yield _ITEM % (b"second", b"2", b"2") + b"</channel></rss>"
+
+    return httpx.MockTransport(lambda r: httpx.Response(200, content=_body()))
+
+
+def test_stream_yields_items_before_body_completes():
+    collector = RssFeedCollector(
+        ["https://feed.test/rss"], health=FeedHealthRegistry(), hedge=False
+    )
+
+    async def _run():
+        started, seen = time.perf_counter(), []
+        async with httpx.AsyncClient(transport=_slow_feed(0.2)) as client:
+            async for item in collector.stream(client):
+                seen.append((item.title, time.perf_counter() - started))
+        return seen
+
+    seen = asyncio.run(_run())
+    assert [t for t, _ in seen] == ["first", "second"]
+    assert seen[0][1] < 0.1 <= seen[1][1]
+
+
+def test_stream_falls_back_to_last_good_copy():
+    health = FeedHealthRegistry()
+    url = "https://feed.test/rss"
+    ok = httpx.MockTransport(
+        lambda r: httpx.Response(
+            200, content=_HEAD + _ITEM % (b"a", b"1", b"1") + b"</channel></rss>"
+        )
+    )
+    down = httpx.MockTransport(lambda r: httpx.Response(503))
+
+    async def _titles(transport):
+        async with httpx.AsyncClient(transport=transport) as client:
+            return [i.title async for i in RssFeedCollector([url], health=health).stream(client)]
+
+    assert asyncio.run(_titles(ok)) == ["a"]
+    assert asyncio.run(_titles(down)) == ["a"]
+
+
+def test_news_items_are_streamed_before_summary(monkeypatch):
+    monkeypatch.setattr(news_module, "NEWS_PROGRESSIVE", True)
+    monkeypatch.setattr(rss_module, "http_transport", lambda: _slow_feed(0.05))
+
+    class _Chooser:
+        async def ainvoke(self, _input):
+            return {"structured_response": SimpleNamespace(category=["america", "Technology"])}
+
+    registry = ModelRegistry(factory=lambda name: name, agent_factory=lambda **_: _Chooser())
+    news = NewsAgent(registry, NodeModelConfig("m"))
+
+    async def summary(state: AgentState):
+        return {"messages": [AIMessage(f"{len(state.news or [])} items")]}
+
+    g = StateGraph(AgentState)
+    g.add_node("news_agent", news.run)
+    g.add_node("summary_agent", summary)
+    g.set_entry_point("news_agent")
+    g.add_edge("news_agent", "summary_agent")
+    g.add_edge("summary_agent", END)
+    app = g.compile()
+    monkeypatch.setattr(agent_module, "get_ai_app", lambda: app)
+
+    async def _run():
+        return [ev async for ev in agent_module.ai_model("s1", "미국 테크 뉴스")]
+
+    events = asyncio.run(_run())
+    names = [ev["event"] for ev in events]
+    items = [json.loads(ev["data"]) for ev in events if ev["event"] == "news_item"]
+    assert [i["title"] for i in items] == ["first", "second"]
+    assert items[0]["link"] == "https://news.test/1"
+    assert items[0]["published_at"].startswith("2024-10-02T08:00:00")
+    # 인코딩된 이벤트에는 노드 이름이 없으므로 뉴스 노드의 첫 출력(on_chain_stream)을 경계로 봅니다.
+    node_output = names.index("on_chain_stream")
+    assert max(i for i, n in enumerate(names) if n == "news_item") < node_output
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from ai.models import ModelRegistry, NodeModelConfig
+from ai.prompt_cache import LocalCacheProvider, PromptCache
+from ai.scheduler import ModelCallPreempted
+from ai.usage import TokenBudgetExceeded
+
+
+def test_handle_shared_and_extended_by_ttl(clock):
+    provider = LocalCacheProvider()
+    cache = PromptCache(provider, ttl=100, refresh_margin=10, clock=clock)
+
+    async def _run():
+        first = await cache.get("m", "static prompt")
+        assert await cache.get("m", "static prompt") == first
+        clock.now = 95  # refresh_margin 안쪽 → TTL 연장, 이름 유지
+        assert await cache.get("m", "static prompt") == first
+        clock.now = 500  # 만료 → 재생성
+        return first, await cache.get("m", "static prompt")
+
+    first, second = asyncio.run(_run())
+    assert first != second
+    assert len(provider.created) == 2
+    assert provider.extended == [first]
+
+
+def test_concurrent_get_creates_once():
+    provider = LocalCacheProvider()
+    cache = PromptCache(provider)
+
+    async def _run():
+        return await asyncio.gather(*(cache.get("m", "p") for _ in range(10)))
+
+    assert len(set(asyncio.run(_run()))) == 1
+    assert len(provider.created) == 1
+
+
+def test_failure_backs_off_to_inline(clock):
+    provider = LocalCacheProvider(fail_create=True)
+    cache = PromptCache(provider, retry_after=60, clock=clock)
+    assert asyncio.run(cache.get("m", "p")) is None
+    provider.fail_create = False
+    assert asyncio.run(cache.get("m", "p")) is None  # still backing off
+    clock.now = 61
+    assert asyncio.run(cache.get("m", "p")) is not None
+
+
+def test_prompt_below_minimum_is_never_created():
+    provider = LocalCacheProvider()
+    cache = PromptCache(provider, min_tokens=1024)
+
+    async def _run():
+        return [await cache.get("m", "짧은 라우터 프롬프트") for _ in range(3)]
+
+    assert asyncio.run(_run()) == [None, None, None]
+    assert provider.created == []
+    assert asyncio.run(cache.get("m", "x" * 4096)) is not None
+
+
+class _Stub:
+    def __init__(self, exc=None):
+        self.exc, self.calls = exc, 0
+
+    async def ainvoke(self, _input):
+        self.calls += 1
+        if self.exc:
+            raise self.exc
+        return {"messages": []}
+
+
+def _registry(cache: PromptCache, cached: _Stub, inline: _Stub) -> ModelRegistry:
+    # client 는 cached content 이름(없으면 None) → 그에 맞는 stub agent
+    return ModelRegistry(
+        factory=lambda name, cached_content=None: cached_content,
+        agent_factory=lambda model, **_: cached if model else inline,
+        prompt_cache=cache,
+    )
+
+
+def test_tiered_agent_uses_cached_content_and_falls_back_inline():
+    provider = LocalCacheProvider()
+    cached, inline = _Stub(exc=RuntimeError("cache expired")), _Stub()
+    registry = _registry(PromptCache(provider), cached, inline)
+    tiered = registry.agent(NodeModelConfig("m", cache_prompt=True), system_prompt="static")
+
+    asyncio.run(tiered.ainvoke({}))
+    assert (cached.calls, inline.calls) == (1, 1)
+    assert provider.created[0][1:] == ("m", "static")
+
+
+@pytest.mark.parametrize(
+    "exc",
+    [ModelCallPreempted("preempted"), TokenBudgetExceeded("s", "session", 11, 10)],
+)
+def test_preemption_and_budget_errors_keep_the_cache_handle(exc):
+    provider = LocalCacheProvider()
+    cache = PromptCache(provider)
+    cached, inline = _Stub(exc=exc), _Stub()
+    registry = _registry(cache, cached, inline)
+    tiered = registry.agent(NodeModelConfig("m", cache_prompt=True), system_prompt="static")
+
+    with pytest.raises(type(exc)):
+        asyncio.run(tiered.ainvoke({}))
+    assert (cached.calls, inline.calls) == (1, 0)
+    assert asyncio.run(cache.get("m", "static")) == "cachedContents/local-0"
+    assert len(provider.created) == 1
+
+
+def test_tiered_agent_skips_cache_with_tools():
+    registry = ModelRegistry(prompt_cache=PromptCache(LocalCacheProvider()))
+    tiered = registry.agent(NodeModelConfig("m", cache_prompt=True), system_prompt="s", tools=[1])
+    assert tiered._prompt_cache is None  # noqa: SLF001
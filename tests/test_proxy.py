@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from proxy import create_app, owner, session_id_of
+
+
+def test_owner_is_stable_and_spread():
+    upstreams = [f"http://w{i}" for i in range(4)]
+    sids = [str(uuid.uuid4()) for _ in range(400)]
+    owners = [owner(s, upstreams) for s in sids]
+    assert owners == [owner(s, list(reversed(upstreams))) for s in sids]
+    assert all(owners.count(u) > 50 for u in upstreams)
+
+
+def test_owner_moves_only_removed_sessions():
+    upstreams = [f"http://w{i}" for i in range(4)]
+    sids = [str(uuid.uuid4()) for _ in range(200)]
+    before = {s: owner(s, upstreams) for s in sids}
+    after = {s: owner(s, upstreams[:3]) for s in sids}
+    assert all(after[s] == before[s] for s in sids if before[s] != "http://w3")
+
+
+def test_session_id_of():
+    sid = str(uuid.uuid4())
+    assert session_id_of(f"/{sid}") == sid
+    assert session_id_of(f"/{sid.upper()}/usage") == sid
+    assert session_id_of("/health") is None
+
+
+def _mock_client(workers: dict) -> httpx.AsyncClient:
+    async def _dispatch(request: httpx.Request) -> httpx.Response:
+        base = f"{request.url.scheme}://{request.url.host}"
+        transport = httpx.ASGITransport(app=workers[base])
+        return await transport.handle_async_request(request)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(_dispatch))
+
+
+def _session_for(target: str, upstreams: list[str]) -> str:
+    while True:
+        sid = str(uuid.uuid4())
+        if owner(sid, upstreams) == target:
+            return sid
+
+
+def test_forwards_to_session_owner():
+    def _worker(name: str):
+        async def echo(request):
+            return PlainTextResponse(f"{name}:{request.method}:{(await request.body()).decode()}")
+
+        return Starlette(routes=[Route("/{path:path}", echo, methods=["GET", "POST"])])
+
+    workers = {"http://a": _worker("a"), "http://b": _worker("b")}
+    with TestClient(create_app(list(workers), client=_mock_client(workers))) as tc:
+        sid = str(uuid.uuid4())
+        expected = owner(sid, list(workers))
+        r = tc.post(f"/{sid}", content=b"hi")
+        assert r.headers["x-session-owner"] == expected
+        assert r.text == f"{expected[-1]}:POST:hi"
+        assert tc.get("/health").headers["x-session-owner"] == "http://a"
+
+
+def test_batch_is_split_by_session_owner():
+    def _worker(name: str):
+        async def batch(request):
+            items = (await request.json())["items"]
+
+            async def _frames():
+                for it in items:
+                    data = {"session_id": it["session_id"], "event": "turn_end", "data": name}
+                    yield f"event: turn_end\r\ndata: {json.dumps(data)}\r\n\r\n".encode()
+
+            return StreamingResponse(_frames(), media_type="text/event-stream")
+
+        return Starlette(routes=[Route("/batch", batch, methods=["POST"])])
+
+    upstreams = ["http://a", "http://b"]
+    workers = {u: _worker(u[-1]) for u in upstreams}
+    sids = [_session_for(u, upstreams) for u in (*upstreams, "http://a")]
+    with TestClient(create_app(upstreams, client=_mock_client(workers))) as tc:
+        body = {"items": [{"session_id": s, "message": "hi"} for s in sids]}
+        r = tc.post("/batch", json=body)
+        frames = [json.loads(line[6:]) for line in r.text.splitlines() if line.startswith("data: ")]
+        # 워커마다 자기 세션 항목만 받음
+        assert sorted((f["session_id"], f["data"]) for f in frames) == sorted(
+            [(sids[0], "a"), (sids[1], "b"), (sids[2], "a")]
+        )
+        single = tc.post("/batch", json={"items": body["items"][1:2]})
+        assert single.headers["x-session-owner"] == "http://b"
+
+
+def test_websocket_frames_are_relayed_to_session_owner():
+    class _Conn:
+        def __init__(self, url: str) -> None:
+            self.url = url
+            self.inbox: asyncio.Queue[str] = asyncio.Queue()
+
+        async def send(self, text: str) -> None:
+            sid = json.loads(text)["session_id"]
+            await self.inbox.put(
+                json.dumps({"session_id": sid, "event": "turn_end", "data": self.url})
+            )
+
+        async def recv(self) -> str:
+            return await self.inbox.get()
+
+        async def close(self) -> None:
+            pass
+
+    opened: list[str] = []
+
+    async def _connect(url: str) -> _Conn:
+        opened.append(url)
+        return _Conn(url)
+
+    upstreams = ["http://a", "http://b"]
+    sids = [_session_for(u, upstreams) for u in (*upstreams, "http://b")]
+    app = create_app(upstreams, ws_connect=_connect)
+    with TestClient(app) as tc, tc.websocket_connect("/ws") as ws:
+        for sid in sids:
+            ws.send_text(json.dumps({"session_id": sid, "message": "hi"}))
+        frames = [json.loads(ws.receive_text()) for _ in sids]
+    assert {(f["session_id"], f["data"]) for f in frames} == {
+        (sids[0], "ws://a/ws"),
+        (sids[1], "ws://b/ws"),
+        (sids[2], "ws://b/ws"),
+    }
+    assert sorted(opened) == ["ws://a/ws", "ws://b/ws"]
+
+
+def _admin_worker(records: dict[str, dict]):
+    """Stand-in for a worker's /admin/sessions routes over an in-memory record table."""
+    from starlette.responses import JSONResponse
+
+    from ai.sessions import NDJSON, RecordReader, encode_stream
+
+    def _authorized(request) -> bool:
+        return request.headers.get("x-admin-token") == "secret"
+
+    async def stats(request):
+        if not _authorized(request):
+            return JSONResponse({"detail": "invalid admin token"}, 401)
+        return JSONResponse({"sessions": len(records), "limits": {"max_sessions": 0}})
+
+    async def export(request):
+        if not _authorized(request):
+            return JSONResponse({"detail": "invalid admin token"}, 401)
+        fmt = request.query_params.get("format", NDJSON)
+        ids = request.query_params.getlist("thread_id") or list(records)
+        return StreamingResponse(encode_stream([records[i] for i in ids if i in records], fmt))
+
+    async def import_(request):
+        if not _authorized(request):
+            return JSONResponse({"detail": "invalid admin token"}, 401)
+        reader = RecordReader(request.query_params.get("format", NDJSON))
+        imported = 0
+        async for chunk in request.stream():
+            for record in reader.feed(chunk):
+                records[record["thread_id"]] = record
+                imported += 1
+        reader.close()
+        return JSONResponse({"imported": imported})
+
+    return Starlette(
+        routes=[
+            Route("/admin/sessions", stats),
+            Route("/admin/sessions/export", export),
+            Route("/admin/sessions/import", import_, methods=["POST"]),
+        ]
+    )
+
+
+def _record(thread_id: str) -> dict:
+    return {"thread_id": thread_id, "checkpoints": [], "writes": [], "blobs": [], "sidecar": {}}
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "binary"])
+def test_admin_sessions_fan_out_to_every_worker(fmt):
+    from ai.sessions import RecordReader, encode_stream
+
+    upstreams = ["http://a", "http://b"]
+    tables: dict[str, dict] = {u: {} for u in upstreams}
+    workers = {u: _admin_worker(tables[u]) for u in upstreams}
+    sids = {u: [_session_for(u, upstreams) for _ in range(2)] for u in upstreams}
+    incoming = [_record(s) for u in upstreams for s in sids[u]]
+    auth = {"x-admin-token": "secret"}
+
+    def _decode(body: bytes) -> list[str]:
+        reader = RecordReader(fmt)
+        ids = [r["thread_id"] for r in reader.feed(body)]
+        reader.close()
+        return ids
+
+    with TestClient(create_app(upstreams, client=_mock_client(workers))) as tc:
+        body = b"".join(encode_stream(incoming, fmt))
+        r = tc.post(f"/admin/sessions/import?format={fmt}", content=body, headers=auth)
+        assert r.json() == {"imported": 4, "upstreams": {"http://a": 2, "http://b": 2}}
+        assert {u: sorted(tables[u]) for u in upstreams} == {u: sorted(sids[u]) for u in upstreams}
+
+        stats = tc.get("/admin/sessions", headers=auth).json()
+        assert stats["sessions"] == 4 and stats["upstreams"]["http://b"]["sessions"] == 2
+
+        exported = tc.get(f"/admin/sessions/export?format={fmt}", headers=auth)
+        assert sorted(_decode(exported.content)) == sorted(sids["http://a"] + sids["http://b"])
+        one = sids["http://b"][0]
+        exported = tc.get(f"/admin/sessions/export?format={fmt}&thread_id={one}", headers=auth)
+        assert _decode(exported.content) == [one]
+        assert exported.headers["x-session-owner"] == "http://b"
+
+        assert tc.get("/admin/sessions/export").status_code == 401
+        denied = tc.post(f"/admin/sessions/import?format={fmt}", content=body)
+        assert denied.status_code == 401
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from ai.models import ModelRegistry, NodeModelConfig
+from ai.scheduler import ModelCallPreempted, ModelScheduler, Priority, background
+
+
+async def _call(scheduler, order, name, priority, session=None, weight=1.0, hold=0.0):
+    async with scheduler.slot(priority, session, weight=weight):
+        order.append(name)
+        await asyncio.sleep(hold)
+
+
+def _run_behind_blocker(scheduler: ModelScheduler, calls: list[tuple]) -> list[str]:
+    """Queue `calls` while one interactive call holds the only slot; return service order."""
+
+    async def _main():
+        order: list[str] = []
+        blocker = asyncio.create_task(
+            _call(scheduler, [], "blocker", Priority.INTERACTIVE, hold=0.05)
+        )
+        await asyncio.sleep(0)
+        tasks = []
+        for args in calls:
+            tasks.append(asyncio.create_task(_call(scheduler, order, *args)))
+            await asyncio.sleep(0)
+        await blocker
+        await asyncio.gather(*tasks)
+        return order
+
+    return asyncio.run(_main())
+
+
+def test_priority_then_weighted_fair_order():
+    calls = [
+        ("a1", Priority.INTERACTIVE, "a"),
+        ("a2", Priority.INTERACTIVE, "a"),
+        ("a3", Priority.INTERACTIVE, "a"),
+        ("b1", Priority.INTERACTIVE, "b"),
+        ("b2", Priority.INTERACTIVE, "b"),
+        ("r1", Priority.ROUTING, "c"),
+    ]
+    assert _run_behind_blocker(ModelScheduler(1), calls) == ["r1", "a1", "b1", "a2", "b2", "a3"]
+
+    weighted = [
+        ("x1", Priority.INTERACTIVE, "x", 0.5),
+        ("x2", Priority.INTERACTIVE, "x", 0.5),
+        ("y1", Priority.INTERACTIVE, "y"),
+        ("y2", Priority.INTERACTIVE, "y"),
+        ("y3", Priority.INTERACTIVE, "y"),
+    ]
+    assert _run_behind_blocker(ModelScheduler(1), weighted) == ["y1", "x1", "y2", "y3", "x2"]
+
+
+def test_background_is_capped_and_preempted_by_interactive_waiters():
+    scheduler = ModelScheduler(2, background_share=0.5)
+
+    async def _main():
+        order: list[str] = []
+        bg1 = asyncio.create_task(_call(scheduler, order, "bg1", Priority.BACKGROUND, hold=0.05))
+        bg2 = asyncio.create_task(_call(scheduler, order, "bg2", Priority.BACKGROUND))
+        await asyncio.sleep(0)
+        assert order == ["bg1"]  # 두 번째 슬롯은 대화 턴 몫
+        assert scheduler.stats()["queued"]["background"] == 1
+        chat = asyncio.create_task(_call(scheduler, order, "chat", Priority.INTERACTIVE, hold=0.05))
+        await asyncio.sleep(0)
+        assert order == ["bg1", "chat"]
+        # 슬롯이 모두 찬 상태에서 대화 턴이 기다리면 대기 중인 백그라운드 호출은 밀려남
+        waiting = asyncio.create_task(_call(scheduler, order, "chat2", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        with pytest.raises(ModelCallPreempted):
+            await bg2
+        await asyncio.gather(bg1, chat, waiting)
+        return order
+
+    assert asyncio.run(_main()) == ["bg1", "chat", "chat2"]
+    assert scheduler.stats()["preempted"] == 1 and scheduler.stats()["running"] == 0
+
+
+def test_tiered_agent_model_calls_take_scheduler_slots():
+    scheduler = ModelScheduler(4)
+    registry = ModelRegistry(
+        factory=lambda name, **o: GenericFakeChatModel(messages=iter([AIMessage("ok")] * 4)),
+        scheduler=scheduler,
+    )
+    router = registry.agent(NodeModelConfig("m", priority=Priority.ROUTING))
+    chat = registry.agent(NodeModelConfig("m2"))
+
+    async def _main():
+        await router.ainvoke({"messages": [HumanMessage("hi")]})
+        await chat.ainvoke({"messages": [HumanMessage("hi")]})
+        with background():
+            await chat.ainvoke({"messages": [HumanMessage("hi")]})
+
+    asyncio.run(_main())
+    assert scheduler.stats()["admitted"] == {"routing": 1, "interactive": 1, "background": 1}
+
+
+def test_background_waiters_are_kept_when_only_interactive_work_holds_slots():
+    scheduler = ModelScheduler(1)
+
+    async def _main():
+        order: list[str] = []
+        chat = asyncio.create_task(_call(scheduler, order, "chat", Priority.INTERACTIVE, hold=0.02))
+        await asyncio.sleep(0)
+        bg = asyncio.create_task(_call(scheduler, order, "bg", Priority.BACKGROUND))
+        chat2 = asyncio.create_task(_call(scheduler, order, "chat2", Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        await asyncio.gather(chat, bg, chat2)  # bg 가 선점되면 ModelCallPreempted
+        return order
+
+    assert asyncio.run(_main()) == ["chat", "chat2", "bg"]
+    assert scheduler.stats()["preempted"] == 0
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Annotated, List
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+from pydantic import Field
+
+from ai.sessions import BINARY, NDJSON, RecordReader, SessionStore, encode_stream, export_stream
+from ai.state import AgentState, messages_channel
+
+
+class _DeltaState(AgentState):
+    messages: Annotated[List[AnyMessage], messages_channel(delta=True, snapshot_every=3)] = Field(
+        default_factory=list
+    )
+
+
+def _app(store: SessionStore, state_schema: type[AgentState] = AgentState):
+    async def echo(state):
+        return {"messages": [AIMessage(f"echo {len(state.messages)}")], "route": "chat_agent"}
+
+    g = StateGraph(state_schema)
+    g.add_node("echo", echo)
+    g.set_entry_point("echo")
+    g.add_edge("echo", END)
+    return g.compile(checkpointer=store)
+
+
+def _say(app, thread_id: str, text: str) -> None:
+    cfg = {"configurable": {"thread_id": thread_id}}
+    asyncio.run(app.ainvoke({"messages": [HumanMessage(text)]}, config=cfg))
+
+
+def _messages(app, thread_id: str) -> list:
+    state = asyncio.run(app.aget_state({"configurable": {"thread_id": thread_id}}))
+    return state.values.get("messages", [])
+
+
+def test_lru_cap_and_idle_ttl(clock):
+    store = SessionStore(max_sessions=2, idle_ttl=10, clock=clock)
+    app = _app(store)
+    _say(app, "a", "hi")
+    clock.now = 1
+    _say(app, "b", "hi")
+    clock.now = 2
+    _messages(app, "a")  # 읽기도 사용으로 간주
+    _say(app, "c", "hi")
+    assert store.threads() == ["a", "c"] and store.evicted == 1
+    assert {key[0] for key in store.blobs} == {"a", "c"}
+
+    clock.now = 5
+    _messages(app, "c")
+    clock.now = 12.5
+    assert store.expire() == 1
+    assert store.threads() == ["c"]
+
+
+def test_compaction_keeps_latest_state():
+    store = SessionStore(keep_checkpoints=2)
+    app = _app(store)
+    for i in range(4):
+        _say(app, "t", f"hi {i}")
+    before = store.stats()
+    assert store.compact() > 0
+    after = store.stats()
+    assert after["checkpoints"] == 2 and after["blobs"] < before["blobs"]
+    assert len(_messages(app, "t")) == 8
+    _say(app, "t", "again")
+    assert len(_messages(app, "t")) == 10
+
+
+def test_delta_checkpoints_rebuild_messages_and_survive_compaction():
+    full, delta = SessionStore(), SessionStore(keep_checkpoints=2, delta_channels=("messages",))
+    full_app, delta_app = _app(full), _app(delta, _DeltaState)
+    for i in range(13):  # 마지막 checkpoint 들이 스냅샷이 아닌 길이
+        _say(full_app, "t", f"hi {i}")
+        _say(delta_app, "t", f"hi {i}")
+    expected = [m.content for m in _messages(full_app, "t")]
+    assert [m.content for m in _messages(delta_app, "t")] == expected
+    assert delta.stats()["blob_bytes"] * 2 < full.stats()["blob_bytes"]
+
+    history = asyncio.run(_history(delta_app, "t"))
+    assert [len(s.values["messages"]) for s in history[:3]] == [26, 25, 24]
+
+    assert delta.compact() > 0
+    assert 2 <= delta.stats()["checkpoints"] <= 2 + 3 * 2  # 스냅샷까지는 남김
+    assert [m.content for m in _messages(delta_app, "t")] == expected
+    _say(delta_app, "t", "again")
+    assert len(_messages(delta_app, "t")) == 28
+
+
+async def _history(app, thread_id: str) -> list:
+    return [s async for s in app.aget_state_history({"configurable": {"thread_id": thread_id}})]
+
+
+@pytest.mark.parametrize("fmt", [NDJSON, BINARY])
+def test_export_import_roundtrip_in_small_chunks(fmt):
+    src = SessionStore()
+    _say(_app(src), "t", "hi")
+
+    async def _export():
+        return b"".join([chunk async for chunk in export_stream(src, fmt=fmt, evict=True)])
+
+    data = asyncio.run(_export())
+    assert src.threads() == []
+
+    reader, records = RecordReader(fmt), []
+    for i in range(0, len(data), 5):
+        records += reader.feed(data[i : i + 5])
+    reader.close()
+
+    dst = SessionStore()
+    for record in records:
+        dst.import_thread(record)
+    app = _app(dst)
+    assert [m.content for m in _messages(app, "t")] == ["hi", "echo 1"]
+    _say(app, "t", "more")
+    assert len(_messages(app, "t")) == 4
+
+
+def test_truncated_stream_is_rejected():
+    src = SessionStore()
+    _say(_app(src), "t", "hi")
+    data = b"".join(encode_stream(src.export_threads(), BINARY))
+    reader = RecordReader(BINARY)
+    reader.feed(data[:-3])
+    with pytest.raises(ValueError):
+        reader.close()
+
+
+def test_admin_endpoints_require_token(monkeypatch):
+    import main
+
+    with TestClient(main.app) as client:
+        monkeypatch.setattr(main, "ADMIN_TOKEN", "")
+        assert client.get("/admin/sessions").status_code == 403
+        monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+        assert client.get("/admin/sessions").status_code == 401
+        ok = client.get("/admin/sessions", headers={"X-Admin-Token": "secret"})
+        assert ok.status_code == 200 and "sessions" in ok.json()
+        export = client.get("/admin/sessions/export", headers={"X-Admin-Token": "secret"})
+        assert export.status_code == 200
+        assert client.get("/admin/sessions", headers={"X-Admin-Token": "secre"}).status_code == 401
+        bad = client.post(
+            "/admin/sessions/import",
+            content=b"{not json}\n",
+            headers={"X-Admin-Token": "secret"},
+        )
+        assert bad.status_code == 400
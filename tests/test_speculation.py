@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from ai.news.agent import guess_feed_url
+from ai.speculation import Speculator
+from ai.state import AgentState
+
+
+def _state(text: str) -> AgentState:
+    return AgentState(messages=[HumanMessage(text, id="m-1")])
+
+
+class _Feeds:
+    def __init__(self) -> None:
+        self.started: list[str] = []
+        self.cancelled = 0
+
+    async def fetch(self, url: str):
+        self.started.append(url)
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return [url]
+
+
+def _router(route: str):
+    async def run(_state):
+        await asyncio.sleep(0.02)
+        return {"route": route}
+
+    return run
+
+
+def test_news_route_reuses_prefetch():
+    feeds = _Feeds()
+    spec = Speculator(guess_feed=lambda _t: "u1", fetch_feed=feeds.fetch)
+
+    async def _run():
+        state = _state("뉴스")
+        await spec.wrap_router(_router("news_agent"))(state)
+        return await spec.take_feed(state, "u1")
+
+    assert asyncio.run(_run()) == ["u1"]
+    assert feeds.started == ["u1"]
+    assert spec._turns == {}  # noqa: SLF001
+
+
+def test_mismatched_feed_is_discarded():
+    feeds = _Feeds()
+    spec = Speculator(guess_feed=lambda _t: "u1", fetch_feed=feeds.fetch)
+
+    async def _run():
+        state = _state("뉴스")
+        await spec.wrap_router(_router("news_agent"))(state)
+        return await spec.take_feed(state, "u2")
+
+    assert asyncio.run(_run()) is None
+
+
+def test_unusable_feed_choice_releases_prefetch():
+    feeds = _Feeds()
+    spec = Speculator(guess_feed=lambda _t: "u1", fetch_feed=feeds.fetch)
+
+    async def _run():
+        state = _state("뉴스")
+        await spec.wrap_router(_router("news_agent"))(state)
+        spec.release_feed(state)
+        await asyncio.sleep(0)
+
+    asyncio.run(_run())
+    assert feeds.cancelled == 1
+    assert spec._turns == {}  # noqa: SLF001
+
+
+def test_chat_route_cancels_feed_and_uses_speculative_chat():
+    feeds = _Feeds()
+    chat_calls: list[str] = []
+
+    async def chat(state):
+        chat_calls.append(state.messages[-1].content)
+        return {"messages": ["answer"]}
+
+    async def never(_state):
+        raise AssertionError("chat should not run twice")
+
+    spec = Speculator(guess_feed=lambda _t: "u1", fetch_feed=feeds.fetch, chat=chat)
+
+    async def _run():
+        state = _state("hello")
+        await spec.wrap_router(_router("chat_agent"))(state)
+        result = await spec.wrap_chat(never)(state)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(_run()) == {"messages": ["answer"]}
+    assert chat_calls == ["hello"]
+    assert feeds.cancelled == 1
+
+
+def test_waste_budget_stops_speculation():
+    feeds = _Feeds()
+    spec = Speculator(guess_feed=lambda _t: "u1", fetch_feed=feeds.fetch, feed_budget=1)
+
+    async def _run():
+        for i in range(3):
+            state = AgentState(messages=[HumanMessage("hi", id=f"m-{i}")])
+            await spec.wrap_router(_router("chat_agent"))(state)
+
+    asyncio.run(_run())
+    assert feeds.started == ["u1"]
+
+
+def test_guess_feed_url_matches_router_examples():
+    assert guess_feed_url("한국 경제 소식 요약").endswith("/k/economy.xml")
+    assert guess_feed_url("미국 테크 뉴스 3개만 요약해줘").endswith("/Technology.xml")
+    assert guess_feed_url("최근 미국뉴스에 대해 알려줘").endswith("/HomePage.xml")
+    assert guess_feed_url("Business news please").endswith("/Business.xml")
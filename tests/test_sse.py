@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import zlib
+from datetime import datetime, timezone
+
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
+from ai.news.tools.rss_feed import NewsItem
+from ai.sse import _compressed, choose_encoding, coalesce_tokens, encode_event, frame_bytes
+from ai.state import AgentState
+
+
+def _token(text: str, run_id: str = "r1") -> dict:
+    return {
+        "event": "on_chat_model_stream",
+        "run_id": run_id,
+        "data": {"chunk": AIMessageChunk(content=text, id=f"run-{run_id}")},
+    }
+
+
+async def _collect(aiter_):
+    return [x async for x in aiter_]
+
+
+def test_encode_known_shapes_without_str_fallback():
+    ev = encode_event(_token("안녕"))
+    assert ev["event"] == "on_chat_model_stream"
+    assert json.loads(ev["data"]) == {
+        "chunk": {"type": "AIMessageChunk", "content": "안녕", "id": "run-r1"}
+    }
+
+    item = NewsItem(
+        id="1",
+        title="t",
+        link="l",
+        summary=None,
+        published_at=datetime(2025, 10, 29, tzinfo=timezone.utc),
+        source_url="u",
+        source_name=None,
+    )
+    state = AgentState(news=[item], route="news_agent")
+    end = encode_event({"event": "on_chain_end", "data": {"output": state}})
+    out = json.loads(end["data"])["output"]
+    assert out["route"] == "news_agent"
+    assert out["news"][0]["title"] == "t"
+    assert out["news"][0]["published_at"].startswith("2025-10-29T00:00:00")
+
+    tool = encode_event(
+        {"event": "on_tool_end", "data": {"output": ToolMessage("ok", tool_call_id="c1")}}
+    )
+    assert json.loads(tool["data"])["output"]["tool_call_id"] == "c1"
+
+
+def test_frame_bytes_is_a_single_sse_frame():
+    raw = frame_bytes({"event": "e", "data": json.dumps({"text": "a\nb"})})
+    assert raw == b'event: e\r\ndata: {"text": "a\\nb"}\r\n\r\n'
+
+
+def test_coalesce_merges_within_window_and_flushes_on_other_events():
+    async def events():
+        for t in ("a", "b", "c"):
+            yield _token(t)
+        yield _token("x", run_id="r2")
+        yield {"event": "on_chain_end", "data": {}}
+
+    out = asyncio.run(_collect(coalesce_tokens(events(), window=10.0)))
+    assert [e["event"] for e in out] == ["on_chat_model_stream"] * 2 + ["on_chain_end"]
+    assert out[0]["data"]["chunk"].content == "abc"
+    assert out[1]["data"]["chunk"].content == "x"
+
+
+def test_coalesce_flushes_when_window_elapses():
+    async def run():
+        arrivals: list[tuple[str, bool]] = []
+        gate = asyncio.Event()
+
+        async def events():
+            yield _token("a")
+            yield _token("b")
+            await gate.wait()
+            yield _token("c")
+
+        async for ev in coalesce_tokens(events(), window=0.01):
+            arrivals.append((ev["data"]["chunk"].content, gate.is_set()))
+            gate.set()
+        return arrivals
+
+    # "ab" 는 다음 청크를 기다리지 않고 window 경과 후 먼저 전달됩니다.
+    assert asyncio.run(run()) == [("ab", False), ("c", True)]
+
+
+def test_negotiation_and_gzip_stream():
+    assert choose_encoding("gzip, deflate", ("gzip",)) == "gzip"
+    assert choose_encoding("gzip;q=0", ("gzip",)) is None
+    assert choose_encoding("gzip", ()) is None
+
+    async def frames():
+        yield frame_bytes({"event": "a", "data": "1"})
+        yield frame_bytes({"event": "b", "data": "2"})
+
+    parts = asyncio.run(_collect(_compressed(frames(), "gzip")))
+    d = zlib.decompressobj(31)
+    # 각 조각은 flush 되어 있어 도착 즉시 풀 수 있어야 합니다.
+    assert d.decompress(parts[0]) == b"event: a\r\ndata: 1\r\n\r\n"
+    assert d.decompress(b"".join(parts[1:])) == b"event: b\r\ndata: 2\r\n\r\n"
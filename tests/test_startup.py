@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_import_main_is_cold_and_needs_no_credentials(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ("GOOGLE_API_KEY", "GOOGLE_CSE_ID")}
+    probe = (
+        "import main\n"
+        "from ai.graph import is_warm\n"
+        "from ai.models import model_registry\n"
+        "assert not is_warm()\n"
+        "assert model_registry.loaded() == []\n"
+    )
+    # tmp_path 를 cwd 로 써서 로컬 .env 가 로드되지 않게 합니다.
+    subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=tmp_path,
+        env={**env, "PYTHONPATH": str(ROOT)},
+        check=True,
+    )
+
+
+def test_dotenv_is_loaded_before_ai_modules_read_settings(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k not in ("ADMIN_TOKEN", "SESSION_MAX")}
+    (tmp_path / ".env").write_text("ADMIN_TOKEN=from-dotenv\nSESSION_MAX=7\n")
+    probe = (
+        "import main\n"
+        "from ai import sessions\n"
+        "assert main.ADMIN_TOKEN == 'from-dotenv', main.ADMIN_TOKEN\n"
+        "assert sessions.MAX_SESSIONS == 7, sessions.MAX_SESSIONS\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=tmp_path,
+        env={**env, "PYTHONPATH": str(ROOT)},
+        check=True,
+    )
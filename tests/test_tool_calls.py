@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import Counter
+
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from ai.chat.tool_calls import ToolCallMiddleware, ToolPolicy, ToolResultCache
+
+calls: Counter[str] = Counter()
+
+
+@tool("web_search")
+async def _search(query: str) -> str:
+    """Search."""
+    calls[query] += 1
+    await asyncio.sleep(0.1)
+    return f"results for {query}"
+
+
+@tool("ip_info")
+async def _ip(request_ip: str) -> str:
+    """IP lookup."""
+    calls[request_ip] += 1
+    await asyncio.sleep(0.1)
+    return f"tz of {request_ip}"
+
+
+class _ToolModel(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+def _step(*tool_calls: tuple[str, dict]) -> list[BaseMessage]:
+    ask = AIMessage(
+        "",
+        tool_calls=[{"name": n, "args": a, "id": f"c{i}"} for i, (n, a) in enumerate(tool_calls)],
+    )
+    return [ask, AIMessage("done")]
+
+
+def _agent(middleware: ToolCallMiddleware, responses: list[BaseMessage]):
+    model = _ToolModel(responses=responses)
+    return create_agent(model=model, tools=[_search, _ip], middleware=[middleware])
+
+
+def _turn(agent, session_id: str) -> tuple[float, list]:
+    async def _run():
+        started = time.perf_counter()
+        result = await agent.ainvoke(
+            {"messages": [HumanMessage("hi")]}, config={"configurable": {"thread_id": session_id}}
+        )
+        return time.perf_counter() - started, result["messages"]
+
+    return asyncio.run(_run())
+
+
+_MULTI = (
+    ("web_search", {"query": "a"}),
+    ("web_search", {"query": "b"}),
+    ("ip_info", {"request_ip": "1.1.1.1"}),
+)
+_POLICIES = {
+    "web_search": ToolPolicy(concurrency=4, ttl=60, shared=True),
+    "ip_info": ToolPolicy(concurrency=4, ttl=60),
+}
+
+
+def test_multi_tool_step_runs_concurrently_unless_sequential():
+    parallel, _ = _turn(_agent(ToolCallMiddleware(_POLICIES, mode="parallel"), _step(*_MULTI)), "p")
+    sequential, _ = _turn(
+        _agent(ToolCallMiddleware(_POLICIES, mode="sequential"), _step(*_MULTI)), "s"
+    )
+    assert parallel < 0.25 <= sequential
+
+
+def test_results_are_memoized_per_session_or_shared():
+    calls.clear()
+    middleware = ToolCallMiddleware(_POLICIES)
+    _turn(_agent(middleware, _step(*_MULTI)), "s1")
+    elapsed, messages = _turn(_agent(middleware, _step(*_MULTI)), "s2")
+    # 검색은 세션 간 공유, ip_info 는 세션별
+    assert calls == {"a": 1, "b": 1, "1.1.1.1": 2}
+    tool_messages = [m for m in messages if isinstance(m, ToolMessage)]
+    assert [m.content for m in tool_messages] == ["results for a", "results for b", "tz of 1.1.1.1"]
+    assert [m.tool_call_id for m in tool_messages] == ["c0", "c1", "c2"]
+    assert middleware.cache.stats()["hits"] == 2
+
+
+def test_identical_concurrent_calls_share_one_execution():
+    calls.clear()
+    middleware = ToolCallMiddleware(_POLICIES)
+    same = (("web_search", {"query": "x"}),) * 3
+    _, messages = _turn(_agent(middleware, _step(*same)), "s1")
+    assert calls["x"] == 1
+    assert sum(isinstance(m, ToolMessage) for m in messages) == 3
+
+
+def test_cancelled_owner_does_not_cancel_waiters():
+    cache, runs = ToolResultCache(), []
+
+    async def _run():
+        runs.append(1)
+        await asyncio.sleep(0.05)
+        return {"content": "ok"}
+
+    async def _main():
+        owner = asyncio.create_task(cache.get_or_run(("*", "web_search", "x"), 60, _run))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_run(("*", "web_search", "x"), 60, _run))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        return await waiter
+
+    assert asyncio.run(_main()) == ({"content": "ok"}, False)
+    assert len(runs) == 2  # 기다리던 호출이 다시 실행
+
+
+def test_timeout_and_concurrency_limit():
+    policies = {
+        "web_search": ToolPolicy(concurrency=1, timeout=0.15),
+        "ip_info": ToolPolicy(timeout=0.01),
+    }
+    elapsed, messages = _turn(_agent(ToolCallMiddleware(policies), _step(*_MULTI)), "s1")
+    by_id = {m.tool_call_id: m for m in messages if isinstance(m, ToolMessage)}
+    assert by_id["c2"].status == "error" and "timed out" in by_id["c2"].content
+    # 검색 두 건은 동시성 1 이라 순서대로 실행(타임아웃은 호출별로 적용)
+    assert by_id["c0"].status == by_id["c1"].status == "success"
+    assert elapsed >= 0.2
+
+
+def test_timed_out_sync_tool_keeps_its_slot_until_the_thread_returns():
+    running, peak = [0], [0]
+
+    @tool("web_search")
+    def slow_search(query: str) -> str:
+        """Search."""
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        time.sleep(0.15)
+        running[0] -= 1
+        return query
+
+    middleware = ToolCallMiddleware({"web_search": ToolPolicy(concurrency=1, timeout=0.05)})
+    model = _ToolModel(responses=_step(*_MULTI[:2]))
+    agent = create_agent(model=model, tools=[slow_search], middleware=[middleware])
+    elapsed, messages = _turn(agent, "s1")
+    statuses = [m.status for m in messages if isinstance(m, ToolMessage)]
+    assert statuses == ["error", "error"]
+    # 첫 스레드가 끝난 뒤에야 두 번째 호출이 시작됨
+    assert peak[0] == 1 and elapsed >= 0.15
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+from langchain_core.messages import AIMessage
+from langgraph.graph import END, StateGraph
+
+import ai.agent as agent_module
+import ai.trace as trace_module
+from ai.news.tools.feed_health import FeedHealthRegistry
+from ai.news.tools.rss_feed import RssFeedCollector
+from ai.state import AgentState
+from ai.trace import Trace, span, trace_from_request
+
+_RSS = b"<rss><channel><item><title>t</title><link>l</link><guid>g</guid></item></channel></rss>"
+
+
+def _collector() -> RssFeedCollector:
+    return RssFeedCollector(["https://feed.test/rss"], health=FeedHealthRegistry(), hedge=False)
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda r: httpx.Response(200, content=_RSS))
+    )
+
+
+def _app():
+    async def news(state: AgentState):
+        async with _client() as client:
+            items = await _collector().fetch_all(client)
+        with span("format", items=len(items)):
+            time.sleep(0.002)
+        return {"messages": [AIMessage(items[0].title)]}
+
+    g = StateGraph(AgentState)
+    g.add_node("news", news)
+    g.set_entry_point("news")
+    g.add_edge("news", END)
+    return g.compile()
+
+
+def _find(spans: list[dict], name: str) -> dict:
+    for s in spans:
+        if s["name"] == name:
+            return s
+        found = _find(s["children"], name)
+        if found:
+            return found
+    return {}
+
+
+def test_trace_event_nests_feed_spans_under_graph_node(monkeypatch):
+    monkeypatch.setattr(agent_module, "get_ai_app", _app)
+
+    async def _run():
+        return [ev async for ev in agent_module.ai_model("s1", "hi", trace=Trace())]
+
+    events = asyncio.run(_run())
+    assert events[-1]["event"] == "trace"
+    data = json.loads(events[-1]["data"])
+    node = _find(data["spans"], "news")
+    assert node["args"] == {"node": "news"}
+    names = {c["name"] for c in node["children"]}
+    assert {"rss.fetch", "rss.parse", "format"} <= names
+    assert _find(node["children"], "format")["duration_ms"] >= 2
+
+
+def test_profiler_starts_only_once_the_turn_runs(monkeypatch):
+    monkeypatch.setattr(agent_module, "get_ai_app", _app)
+
+    def _profilers() -> int:
+        return sum(t.name == "trace-profiler" for t in threading.enumerate())
+
+    before = _profilers()
+    trace = Trace(profile=True)
+    agent_module.ai_model("s1", "hi", trace=trace)  # 클라이언트가 본문 전에 끊긴 경우
+    assert _profilers() == before
+
+    async def _run():
+        return [ev async for ev in agent_module.ai_model("s1", "hi", trace=trace)]
+
+    asyncio.run(_run())
+    assert _profilers() == before and trace.ended is not None
+
+
+def test_span_is_noop_without_trace():
+    with span("anything"):
+        pass
+    assert asyncio.run(_collector().fetch_all(_client()))[0].title == "t"
+
+
+def test_chrome_export_and_profile(tmp_path):
+    trace = Trace(profile=True)
+    assert trace.profiler is not None
+    trace.profiler.interval = 0.001
+    trace.start()
+    with_trace = trace_module.current_trace.set(trace)
+    try:
+        with span("outer"), span("inner"):
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+    finally:
+        trace_module.current_trace.reset(with_trace)
+    trace.finish()
+
+    path = trace.write_chrome(str(tmp_path))
+    with open(path) as f:
+        chrome = json.load(f)
+    spans = {e["name"]: e for e in chrome["traceEvents"]}
+    # 중첩된 span 은 같은 트랙에 있어야 Chrome 이 올바르게 그립니다.
+    assert spans["outer"]["tid"] == spans["inner"]["tid"]
+    assert chrome["samples"] and chrome["stackFrames"]
+    assert trace.summary()["profile"]["samples"] > 0
+
+
+def test_request_flag_requires_config(monkeypatch):
+    request = SimpleNamespace(headers={"x-debug-trace": "profile"}, query_params={})
+    monkeypatch.setattr(trace_module, "TRACE_ENABLED", False)
+    assert trace_from_request(request) is None
+    monkeypatch.setattr(trace_module, "TRACE_ENABLED", True)
+    trace = trace_from_request(request)
+    assert trace is not None and trace.profiler is not None
+    trace.finish()
+    query = SimpleNamespace(headers={}, query_params={"trace": "1"})
+    assert trace_from_request(query).profiler is None
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+
+import ai.agent as agent_module
+from ai.models import ModelRegistry, NodeModelConfig
+from ai.sessions import SessionStore
+from ai.state import AgentState
+from ai.usage import TokenBudgetExceeded, TurnUsage, UsageLedger, new_messages
+
+
+class _StubAgent:
+    async def ainvoke(self, input):
+        reply = AIMessage(
+            "ok", usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10}
+        )
+        return {"messages": [*input["messages"], reply]}
+
+
+def _setup(**budgets):
+    store = SessionStore()
+    ledger = UsageLedger(store, **budgets)
+    registry = ModelRegistry(
+        factory=lambda name: name, agent_factory=lambda **_: _StubAgent(), usage=ledger
+    )
+    tiered = registry.agent(NodeModelConfig("m"))
+
+    async def talk(state: AgentState):
+        result = await tiered.ainvoke({"messages": state.messages})
+        return {"messages": result["messages"]}
+
+    g = StateGraph(AgentState)
+    g.add_node("talk", ledger.guard(talk))
+    g.set_entry_point("talk")
+    g.add_edge("talk", END)
+    return g.compile(checkpointer=store), ledger
+
+
+async def _events(session_id: str, text: str):
+    return [
+        (ev["event"], json.loads(ev["data"]))
+        async for ev in agent_module.ai_model(session_id, text)
+    ]
+
+
+@pytest.fixture
+def wire(monkeypatch):
+    def _wire(**budgets):
+        app, ledger = _setup(**budgets)
+        monkeypatch.setattr(agent_module, "get_ai_app", lambda: app)
+        monkeypatch.setattr(agent_module, "usage_ledger", ledger)
+        return ledger
+
+    return _wire
+
+
+def test_usage_is_charged_per_node_and_reported_last(wire):
+    ledger = wire()
+    events = asyncio.run(_events("s1", "hi"))
+    name, data = events[-1]
+    assert name == "usage"
+    assert data["turn"]["total"]["total_tokens"] == 10
+    assert data["turn"]["by_node"]["talk"]["calls"] == 1
+
+    asyncio.run(_events("s1", "again"))
+    usage = ledger.usage("s1")
+    # 이전 턴의 AIMessage 는 입력에 포함되므로 다시 집계되지 않습니다.
+    assert usage["total"] == {
+        "input_tokens": 14,
+        "output_tokens": 6,
+        "total_tokens": 20,
+        "calls": 2,
+    }
+
+
+def test_session_budget_stops_before_nodes_run(wire):
+    wire(session_budget=10)
+    asyncio.run(_events("s1", "hi"))
+    events = asyncio.run(_events("s1", "more"))
+    assert [name for name, _ in events] == ["budget_exceeded", "usage"]
+    assert events[0][1] == {"budget": "session", "used": 10, "limit": 10}
+
+
+def test_per_minute_budget_window():
+    now = [0.0]
+    store = SessionStore()
+    ledger = UsageLedger(store, per_minute_budget=15, clock=lambda: now[0])
+    turn = TurnUsage("s1")
+    ledger.record(turn, "n", {"total_tokens": 20})
+    with pytest.raises(TokenBudgetExceeded):
+        ledger.check("s1")
+    now[0] = 61
+    ledger.check("s1")
+    assert ledger.usage("s1")["last_minute_tokens"] == 0
+
+
+def test_usage_travels_with_session_export():
+    store = SessionStore()
+    store.put(
+        {"configurable": {"thread_id": "s1", "checkpoint_ns": ""}},
+        {
+            "id": "c1",
+            "channel_values": {},
+            "channel_versions": {},
+            "v": 1,
+            "ts": "",
+            "versions_seen": {},
+        },
+        {},
+        {},
+    )
+    store.sidecar("s1")["usage"] = {"talk": {"total_tokens": 5}}
+    record = next(store.export_threads())
+    other = SessionStore()
+    other.import_thread(record)
+    assert other.peek_sidecar("s1") == {"usage": {"talk": {"total_tokens": 5}}}
+    store.delete_thread("s1")
+    assert store.peek_sidecar("s1") is None
+
+
+def test_history_input_messages_are_not_counted_twice():
+    old = AIMessage(
+        "a", id="1", usage_metadata={"input_tokens": 1, "output_tokens": 1, "total_tokens": 2}
+    )
+    human = HumanMessage("b", id="2")
+    new = AIMessage("c", id="3")
+    assert new_messages({"messages": [old, human, new]}, {"messages": [old, human]}) == [new]